@@ -0,0 +1,212 @@
+# src/backtest.py
+
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .portfolio_optimizer import _sharpe_slsqp_starts
+except ImportError:
+    from portfolio_optimizer import _sharpe_slsqp_starts
+
+
+def rolling_moments(returns, window, end_indices):
+    """
+    میانگین و کوواریانس سالانه پنجره غلتان با به‌روزرسانی افزایشی
+    Annualized mean and covariance of the trailing window ending before each index
+
+    The window sums Σr and Σrrᵀ are updated by adding the newest row and
+    removing the oldest one, so each step costs O(n_assets²) instead of a
+    full re-estimation over the window.
+
+    پارامترها / Parameters:
+    -----------
+    returns : np.array
+        بازده روزانه / Daily returns (T, n)
+    window : int
+        طول پنجره / Window length in rows
+    end_indices : sequence
+        اندیس‌های صعودی؛ پنجره شامل returns[t-window:t] است /
+        Increasing indices t >= window; the window is returns[t-window:t]
+
+    بازگشت / Returns:
+    --------
+    tuple : (means, covs) با شکل (k, n) و (k, n, n)
+    """
+    returns = np.asarray(returns, dtype=float)
+    n = returns.shape[1]
+    end_indices = list(end_indices)
+    means = np.empty((len(end_indices), n))
+    covs = np.empty((len(end_indices), n, n))
+
+    sum_r = returns[:window].sum(axis=0)
+    sum_rr = returns[:window].T @ returns[:window]
+    t = window
+    for k, end in enumerate(end_indices):
+        while t < end:
+            new, old = returns[t], returns[t - window]
+            sum_r += new - old
+            sum_rr += np.outer(new, new) - np.outer(old, old)
+            t += 1
+        means[k] = sum_r / window * 252
+        covs[k] = (sum_rr - np.outer(sum_r, sum_r) / window) / (window - 1) * 252
+    return means, covs
+
+
+def _solve_rebalance_chunk(means, covs, lo, hi, linear_constraints, initial_weights, risk_free_rate):
+    """
+    حل پشت‌سرهم یک بخش از تاریخ‌های بازتنظیم با شروع گرم
+    Solve consecutive rebalance dates, warm-starting each from the previous weights
+
+    Each date is one SLSQP solve with the analytic gradient (about a
+    millisecond for a few assets); a date whose solve fails keeps the
+    previous weights.
+    """
+    weights = np.empty_like(means)
+    previous = initial_weights
+    for k in range(len(means)):
+        solved, _, success, _ = _sharpe_slsqp_starts(means[k], covs[k], lo, hi, linear_constraints,
+                                                     previous, risk_free_rate)
+        if success[0]:
+            previous = solved[0]
+        weights[k] = previous
+    return weights
+
+
+class WalkForwardBacktest:
+    """
+    بک‌تست غلتان (walk-forward) بهینه‌ساز برای یک پروفایل ریسک
+    Rolling walk-forward backtest of the max-Sharpe optimizer for a risk profile
+
+    At every rebalance date the mean and covariance are re-estimated on the
+    trailing window and the profile's optimize_sharpe problem is re-solved;
+    the weights are then held (and drift with prices) until the next date.
+    """
+
+    def __init__(self, optimizer, risk_profile='Moderate', window=252, rebalance_every=21,
+                 risk_free_rate=0.02):
+        """
+        پارامترها / Parameters:
+        -----------
+        optimizer : PortfolioOptimizer
+            منبع بازده‌ها و محدودیت‌های پروفایل / Source of returns and profile constraints
+        risk_profile : str
+            'Conservative', 'Moderate', or 'Aggressive'
+        window : int
+            طول پنجره تخمین (روز) / Estimation window in trading days
+        rebalance_every : int
+            فاصله بازتنظیم (روز) / Days between rebalances
+        risk_free_rate : float
+            نرخ بدون ریسک / Risk-free rate
+        """
+        if window < 2 or window >= len(optimizer.returns):
+            raise ValueError("window باید بین 2 و تعداد روزهای داده باشد.")
+        if rebalance_every < 1:
+            raise ValueError("rebalance_every باید حداقل 1 باشد.")
+
+        self.optimizer = optimizer
+        self.risk_profile = risk_profile
+        self.window = window
+        self.rebalance_every = rebalance_every
+        self.risk_free_rate = risk_free_rate
+
+    def run(self, n_workers=None):
+        """
+        اجرای بک‌تست
+        Run the backtest
+
+        Rebalance dates are split into contiguous chunks, one per worker
+        process; inside a chunk each solve is warm-started from the previous
+        date's weights.
+
+        پارامترها / Parameters:
+        -----------
+        n_workers : int or None
+            تعداد پردازش‌ها (None = تعداد هسته‌ها، 1 = بدون pool) /
+            Worker processes (None = CPU count, 1 = in-process)
+
+        بازگشت / Returns:
+        --------
+        dict : weights (DataFrame), portfolio_returns, equity_curve (Series)
+            و معیارهای عملکرد / and realised performance metrics
+        """
+        optimizer = self.optimizer
+        returns = optimizer.returns.values
+        n_rows = len(returns)
+
+        rebalance_indices = list(range(self.window, n_rows, self.rebalance_every))
+        means, covs = rolling_moments(returns, self.window, rebalance_indices)
+
+        lo, hi = np.array(optimizer._profile_bounds(self.risk_profile), dtype=float).T
+        linear_constraints = optimizer._profile_linear_constraints(self.risk_profile)
+        if self.risk_profile in optimizer.profile_weights:
+            initial_weights = optimizer.get_profile_weights(self.risk_profile)
+        else:
+            initial_weights = np.full(optimizer.n_assets, 1.0 / optimizer.n_assets)
+
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_workers = max(1, min(n_workers, len(rebalance_indices)))
+        chunks = np.array_split(np.arange(len(rebalance_indices)), n_workers)
+        args = [(means[c], covs[c], lo, hi, linear_constraints, initial_weights, self.risk_free_rate)
+                for c in chunks]
+
+        if n_workers == 1:
+            weights = _solve_rebalance_chunk(*args[0])
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(_solve_rebalance_chunk, *a) for a in args]
+                weights = np.vstack([future.result() for future in futures])
+
+        portfolio_returns, turnover = self._realised_returns(returns, rebalance_indices, weights)
+
+        index = optimizer.returns.index
+        weights_df = pd.DataFrame(weights, index=index[rebalance_indices], columns=optimizer.assets)
+        portfolio_returns = pd.Series(portfolio_returns, index=index[self.window:])
+        equity_curve = (1 + portfolio_returns).cumprod()
+
+        return {
+            'weights': weights_df,
+            'portfolio_returns': portfolio_returns,
+            'equity_curve': equity_curve,
+            **self._performance(portfolio_returns.values, equity_curve.values),
+            'turnover': turnover
+        }
+
+    @staticmethod
+    def _realised_returns(returns, rebalance_indices, weights):
+        """
+        بازده روزانه سبد با وزن‌های شناور بین تاریخ‌های بازتنظیم
+        Daily portfolio returns with weights drifting between rebalances,
+        plus total one-way turnover
+        """
+        bounds = list(rebalance_indices) + [len(returns)]
+        pieces = []
+        turnover = 0.0
+        drifted = None
+        for k, w in enumerate(weights):
+            growth = np.cumprod(1 + returns[bounds[k]:bounds[k + 1]], axis=0)
+            values = growth @ w
+            pieces.append(np.diff(np.concatenate([[1.0], values])) / np.concatenate([[1.0], values[:-1]]))
+            if drifted is not None:
+                turnover += np.abs(w - drifted).sum() / 2
+            drifted = growth[-1] * w / values[-1]
+        return np.concatenate(pieces), turnover
+
+    def _performance(self, portfolio_returns, equity_curve):
+        """
+        معیارهای عملکرد تحقق‌یافته / Realised performance metrics
+        """
+        annual_return = portfolio_returns.mean() * 252
+        annual_volatility = portfolio_returns.std() * np.sqrt(252)
+        sharpe_ratio = (annual_return - self.risk_free_rate) / annual_volatility if annual_volatility != 0 else 0
+        running_max = np.maximum.accumulate(equity_curve)
+        max_drawdown = ((equity_curve - running_max) / running_max).min()
+        return {
+            'total_return': equity_curve[-1] - 1,
+            'annual_return': annual_return,
+            'annual_volatility': annual_volatility,
+            'sharpe_ratio': sharpe_ratio,
+            'max_drawdown': max_drawdown
+        }
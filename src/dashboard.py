@@ -678,6 +678,15 @@ def show_portfolio_results_page():
     # Section 2: Performance Metrics (ALL REAL DATA)
     st.markdown("## 📈 معیارهای عملکرد (داده‌های واقعی)")
     
+    # بازه اطمینان ۹۵٪ بوت‌استرپ در راهنمای هر معیار / 95% bootstrap interval in each metric's help
+    intervals = report.get('confidence_intervals', {})
+    
+    def with_interval(text, key, scale=1, fmt=".3f", suffix=""):
+        if key not in intervals:
+            return text
+        lower, upper = sorted(v * scale for v in intervals[key])
+        return f"{text} — بازه اطمینان ۹۵٪: [{lower:{fmt}}{suffix}, {upper:{fmt}}{suffix}]"
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
@@ -698,14 +707,14 @@ def show_portfolio_results_page():
         st.metric(
             "نسبت شارپ",
             f"{report.get('sharpe_ratio', 0):.3f}",
-            help="بازده به ازای واحد ریسک (محاسبه شده از داده‌های واقعی)"
+            help=with_interval("بازده به ازای واحد ریسک (محاسبه شده از داده‌های واقعی)", 'sharpe_ratio')
         )
     
     with col4:
         st.metric(
             "نسبت سورتینو",
             f"{report.get('sortino_ratio', 0):.3f}",
-            help="نسبت بازده به ریسک نزولی"
+            help=with_interval("نسبت بازده به ریسک نزولی", 'sortino_ratio')
         )
     
     col1, col2, col3 = st.columns(3)
@@ -715,14 +724,14 @@ def show_portfolio_results_page():
             "حداکثر افت",
             f"{report.get('max_drawdown_pct', 0):.2f}%",
             delta_color="inverse",
-            help="بیشترین افت تاریخی"
+            help=with_interval("بیشترین افت تاریخی", 'max_drawdown', 100, ".2f", "%")
         )
     
     with col2:
         st.metric(
             "نسبت کالمار",
             f"{report.get('calmar_ratio', 0):.3f}",
-            help="بازده تقسیم بر حداکثر افت"
+            help=with_interval("بازده تقسیم بر حداکثر افت", 'calmar_ratio')
         )
     
     st.markdown("---")
@@ -3,6 +3,8 @@ import pandas as pd
 from datetime import datetime, timedelta
 import requests
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # Asset symbols for Yahoo Finance - استفاده از قیمت اونس برای طلا و نقره
 SYMBOLS = [
@@ -36,9 +38,13 @@ def get_usd_to_toman_rate():
         print(f"⚠️ Error: {e}, using fallback 173,000")
         return 173000
 
-def fetch_asset_data(symbol, years=3, progress_callback=None):
+def fetch_asset_data(symbol, years=3, progress_callback=None, use_download=True):
     """
     Fetch real asset data from Yahoo Finance.
+    With use_download=False the request goes straight to
+    yf.Ticker(symbol).history, which keeps its state on the Ticker object;
+    yf.download (yfinance 0.2.x) collects results in module-level globals
+    and must not run in several threads at once.
     Returns a pandas Series of close prices, or None if failed.
     """
     try:
@@ -49,7 +55,7 @@ def fetch_asset_data(symbol, years=3, progress_callback=None):
         start_date = end_date - timedelta(days=years*365)
         
         # استفاده از yf.download (پایدارتر)
-        data = yf.download(symbol, start=start_date, end=end_date, progress=False)
+        data = yf.download(symbol, start=start_date, end=end_date, progress=False) if use_download else pd.DataFrame()
         
         # اگر خالی بود، روش دوم: Ticker.history
         if data.empty:
@@ -60,23 +66,124 @@ def fetch_asset_data(symbol, years=3, progress_callback=None):
             print(f"    ⚠️ No data for {symbol}")
             return None
         
-        close_prices = data['Close'].squeeze()
-        close_prices = close_prices.dropna()
-        
-        if len(close_prices) < 100:
-            print(f"    ⚠️ Insufficient data for {symbol} (only {len(close_prices)} days)")
-            return None
-        
-        print(f"    ✅ {symbol}: {len(close_prices)} days, Last price: ${close_prices.iloc[-1]:,.2f}")
-        return close_prices
+        return _validate_close(data['Close'].squeeze(), symbol)
         
     except Exception as e:
         print(f"    ❌ Error fetching {symbol}: {str(e)}")
         return None
 
-def fetch_all_assets(years=3, progress_callback=None):
+def _validate_close(close_prices, symbol):
+    """
+    Drop missing closes and reject series shorter than 100 days.
+    Returns the cleaned Series, or None.
+    """
+    close_prices = close_prices.dropna()
+    
+    if len(close_prices) < 100:
+        print(f"    ⚠️ Insufficient data for {symbol} (only {len(close_prices)} days)")
+        return None
+    
+    print(f"    ✅ {symbol}: {len(close_prices)} days, Last price: ${close_prices.iloc[-1]:,.2f}")
+    return close_prices
+
+def fetch_assets_batch(symbols, years=3, progress_callback=None):
+    """
+    Fetch several symbols with one multi-ticker yf.download and split the
+    Close columns locally. Only tickers that come back empty are retried
+    one by one through fetch_asset_data.
+    Returns {symbol: Series or None}.
+    """
+    symbols = list(symbols)
+    if progress_callback:
+        progress_callback(f"📥 Downloading {', '.join(symbols)}...")
+    
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=years*365)
+    
+    try:
+        data = yf.download(symbols, start=start_date, end=end_date, progress=False, group_by='column')
+        close = data['Close'] if not data.empty else pd.DataFrame()
+        # یک نماد: yfinance ممکن است Series برگرداند / a single ticker may come back as a Series
+        if isinstance(close, pd.Series):
+            close = close.to_frame(symbols[0])
+    except Exception as e:
+        print(f"    ❌ Batch download failed: {str(e)}")
+        close = pd.DataFrame()
+    
+    results = {}
+    for symbol in symbols:
+        # تاریخ‌های مشترک دانلود گروهی برای هر نماد جداگانه پاک می‌شود /
+        # the batch index is the union of all calendars, so each column is cleaned on its own
+        prices = close[symbol].dropna() if symbol in close.columns else pd.Series(dtype=float)
+        if prices.empty:
+            print(f"    ↩️ {symbol} empty in batch, fetching individually")
+            results[symbol] = fetch_asset_data(symbol, years, progress_callback)
+        else:
+            results[symbol] = _validate_close(prices, symbol)
+    return results
+
+def fetch_assets_concurrent(symbols, years=3, progress_callback=None, max_workers=None,
+                            symbol_timeout=30, total_timeout=60):
+    """
+    Fetch symbols concurrently in a thread pool; each worker uses
+    yf.Ticker(symbol).history (fetch_asset_data with use_download=False)
+    because yf.download is not thread-safe.
+    Each symbol must finish within symbol_timeout seconds of being
+    submitted (so a symbol still queued behind busy workers has the same
+    deadline and is cancelled when it passes), and the whole fetch gets
+    total_timeout seconds; whatever has arrived by then is returned.
+    Requests already running cannot be interrupted: they are abandoned
+    and their threads finish in the background. progress_callback is
+    called from the calling thread as each symbol completes (Streamlit
+    elements cannot be updated from worker threads).
+    Returns ({symbol: Series or None}, {symbol: 'ok' | 'failed' | 'timeout'}).
+    """
+    symbols = list(symbols)
+    results = {symbol: None for symbol in symbols}
+    status = {symbol: 'timeout' for symbol in symbols}
+    
+    budget_end = time.monotonic() + total_timeout
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(symbols) or 1)
+    try:
+        pending = {}
+        for symbol in symbols:
+            future = executor.submit(fetch_asset_data, symbol, years, None, False)
+            pending[future] = (symbol, min(time.monotonic() + symbol_timeout, budget_end))
+        completed = 0
+        while pending:
+            done, _ = wait(list(pending), timeout=max(min(d for _, d in pending.values()) - time.monotonic(), 0),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol, _ = pending.pop(future)
+                results[symbol] = future.result()
+                status[symbol] = 'ok' if results[symbol] is not None else 'failed'
+                completed += 1
+                if progress_callback:
+                    mark = '✅' if status[symbol] == 'ok' else '⚠️'
+                    progress_callback(f"{mark} {symbol} ({completed}/{len(symbols)})")
+            
+            # نمادهایی که از مهلت خود گذشته‌اند رها یا لغو می‌شوند / abandon or cancel symbols past their deadline
+            now = time.monotonic()
+            for future, (symbol, deadline) in list(pending.items()):
+                if now >= deadline:
+                    future.cancel()
+                    print(f"    ⏱️ {symbol} did not finish within its deadline")
+                    del pending[future]
+    finally:
+        # منتظر درخواست‌های کند نمی‌مانیم / do not block on abandoned requests
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return results, status
+
+def fetch_all_assets(years=3, progress_callback=None, batch=True, max_workers=None,
+                     symbol_timeout=30, total_timeout=60):
     """
     Fetch all asset data and combine into DataFrame with aligned indices.
+    With batch=True all symbols are requested in one multi-ticker download
+    (see fetch_assets_batch); batch=False issues one request per symbol,
+    concurrently and with deadlines (see fetch_assets_concurrent).
+    Per-symbol status ('ok', 'failed', 'timeout') is kept in
+    df.attrs['fetch_status'].
     """
     print("="*60)
     print("📥 FETCHING REAL DATA FROM YAHOO FINANCE")
@@ -85,12 +192,20 @@ def fetch_all_assets(years=3, progress_callback=None):
     data_dict = {}
     successful = 0
     
+    symbols = [info['symbol'] for info in SYMBOLS]
+    if batch:
+        fetched = fetch_assets_batch(symbols, years, progress_callback)
+        fetch_status = {symbol: 'ok' if prices is not None else 'failed' for symbol, prices in fetched.items()}
+    else:
+        fetched, fetch_status = fetch_assets_concurrent(symbols, years, progress_callback, max_workers,
+                                                        symbol_timeout, total_timeout)
+    
     for asset_info in SYMBOLS:
         asset_name = asset_info['name']
         symbol = asset_info['symbol']
         
-        print(f"\n{asset_name} ({symbol}):")
-        prices = fetch_asset_data(symbol, years, progress_callback)
+        print(f"\n{asset_name} ({symbol}): {fetch_status[symbol]}")
+        prices = fetched[symbol]
         
         if prices is not None and isinstance(prices, pd.Series) and len(prices) > 100:
             data_dict[asset_name] = prices
@@ -140,6 +255,7 @@ def fetch_all_assets(years=3, progress_callback=None):
     for col in df.columns:
         df[col] = df[col] * usd_rate
     
+    df.attrs['fetch_status'] = fetch_status
     print(f"\n✅ DataFrame ready: {df.shape}")
     print("💵 Current Prices (Toman per ounce for Gold/Silver):")
     for asset in df.columns:
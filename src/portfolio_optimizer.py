@@ -1,35 +1,1064 @@
 # src/portfolio_optimizer.py
 
+import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.optimize import minimize
+from scipy.optimize import linprog, minimize
+from scipy import sparse
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
 import warnings
 import streamlit as st
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 warnings.filterwarnings('ignore')
 
+
+def project_capped_simplex(v, lo, hi):
+    """
+    تصویر اقلیدسی روی سیمپلکس کران‌دار
+    Euclidean projection onto {w : sum(w) = 1, lo <= w <= hi}
+
+    The solution is clip(v - tau, lo, hi) for a scalar tau.  The sum of
+    the clipped vector is piecewise linear and non-increasing in tau with
+    breakpoints at v - hi and v - lo, so one sort of the 2n breakpoints
+    locates tau exactly in O(n log n).  Rows of a 2-D ``v`` are projected
+    independently (batch mode).
+
+    پارامترها / Parameters:
+    -----------
+    v : np.array
+        نقطه یا دسته نقاط / Point (n,) or batch of points (m, n)
+    lo, hi : np.array
+        کران پایین و بالای وزن‌ها / Lower and upper weight bounds,
+        broadcastable to the shape of ``v``
+
+    بازگشت / Returns:
+    --------
+    np.array : نقطه تصویرشده / Projected point(s), same shape as ``v``
+    """
+    v = np.asarray(v, dtype=float)
+    V = np.atleast_2d(v)
+    m, n = V.shape
+    lo = np.broadcast_to(np.asarray(lo, dtype=float), V.shape)
+    hi = np.broadcast_to(np.asarray(hi, dtype=float), V.shape)
+
+    if np.any(lo > hi) or np.any(lo.sum(axis=1) > 1 + 1e-12) or np.any(hi.sum(axis=1) < 1 - 1e-12):
+        raise ValueError("کران‌ها ناسازگارند: باید sum(lo) <= 1 <= sum(hi) و lo <= hi باشد.")
+
+    # نقاط شکست: در v-hi مؤلفه از کران بالا جدا و در v-lo به کران پایین می‌رسد
+    breakpoints = np.concatenate([V - hi, V - lo], axis=1)
+    events = np.concatenate([np.ones((m, n)), -np.ones((m, n))], axis=1)
+    order = np.argsort(breakpoints, axis=1, kind='stable')
+    breakpoints = np.take_along_axis(breakpoints, order, axis=1)
+    events = np.take_along_axis(events, order, axis=1)
+
+    # تعداد مؤلفه‌های آزاد بین دو نقطه شکست متوالی و مقدار sum در هر نقطه
+    active = np.cumsum(events, axis=1)
+    drops = active[:, :-1] * np.diff(breakpoints, axis=1)
+    totals = hi.sum(axis=1, keepdims=True) - np.concatenate(
+        [np.zeros((m, 1)), np.cumsum(drops, axis=1)], axis=1)
+
+    # تحمل گرد کردن: وقتی sum(lo) فقط با خطای گرد کردن بیش از 1 است، آخرین نقطه انتخاب می‌شود /
+    # the tolerance keeps rounding error in sum(lo) from leaving no breakpoint with total <= 1
+    k = np.argmax(totals <= 1 + 1e-12, axis=1)
+    rows = np.arange(m)
+    prev = np.maximum(k - 1, 0)
+    slope = active[rows, prev]
+    safe_slope = np.where(slope > 0, slope, 1)
+    tau = np.where(
+        (k > 0) & (slope > 0),
+        breakpoints[rows, prev] + (totals[rows, prev] - 1) / safe_slope,
+        breakpoints[rows, k]
+    )
+
+    W = np.clip(V - tau[:, None], lo, hi)
+    # کران‌های پایین تنگ (sum(lo) = 1): تنها نقطه شدنی خود lo است / tight lower bounds leave lo as the only feasible point
+    tight = lo.sum(axis=1) >= 1 - 1e-12
+    W = np.where(tight[:, None], lo, W)
+    return W[0] if v.ndim == 1 else W
+
+
+def _project_one_constraint(V, lo, hi, a, b, kind, max_iter=200):
+    """
+    تصویر دقیق با یک قید خطی از طریق ضریب لاگرانژ آن
+    Exact projection with a single extra constraint: w(λ) = P(v - λ·a) is
+    the capped-simplex projection of the shifted point and a·w(λ) is
+    non-increasing in λ, so each row's multiplier is found by bisection.
+    Unlike Dykstra's iteration the cost does not grow with the distance
+    of V from the feasible set.
+    """
+    V = np.atleast_2d(np.asarray(V, dtype=float))
+    a = np.asarray(a, dtype=float)
+    m = len(V)
+
+    def excess(lam):
+        W = project_capped_simplex(V - lam[:, None] * a, lo, hi)
+        return W @ a - b
+
+    # کران‌های ضریب / brackets: a·w(lower) >= b >= a·w(upper)
+    lower = np.zeros(m) if kind == 'ineq' else -np.ones(m)
+    upper = np.ones(m)
+    for _ in range(64):
+        grow = excess(upper) > 0
+        if not grow.any():
+            break
+        lower[grow] = upper[grow]
+        upper[grow] *= 2
+    if kind != 'ineq':
+        for _ in range(64):
+            grow = excess(lower) < 0
+            if not grow.any():
+                break
+            upper[grow] = lower[grow]
+            lower[grow] *= 2
+    for _ in range(max_iter):
+        mid = (lower + upper) / 2
+        above = excess(mid) > 0
+        lower = np.where(above, mid, lower)
+        upper = np.where(above, upper, mid)
+        if np.all(upper - lower <= 1e-15 * (1 + np.abs(upper))):
+            break
+    return project_capped_simplex(V - upper[:, None] * a, lo, hi)
+
+
+def _project_feasible(V, lo, hi, linear_constraints=(), max_iter=200, tol=1e-10):
+    """
+    تصویر روی سیمپلکس کران‌دار به همراه قیدهای خطی اضافه (الگوریتم Dykstra)
+    Projection onto the capped simplex intersected with extra linear
+    constraints ``(a, b, kind)`` meaning a·w <= b ('ineq') or a·w = b ('eq').
+    """
+    W = project_capped_simplex(V, lo, hi)
+    if not linear_constraints:
+        return W
+
+    # اگر تصویر روی سیمپلکس قیدها را نقض نکند، همان جواب نهایی است
+    satisfied = all(
+        np.all(W @ a <= b + tol) if kind == 'ineq' else np.all(np.abs(W @ a - b) <= tol)
+        for a, b, kind in linear_constraints
+    )
+    if satisfied:
+        return W
+    if len(linear_constraints) == 1:
+        W = _project_one_constraint(V, lo, hi, *linear_constraints[0])
+        return W[0] if np.ndim(V) == 1 else W
+
+    X = np.array(V, dtype=float)
+    P = np.zeros_like(X)
+    Q = [np.zeros_like(X) for _ in linear_constraints]
+    for _ in range(max_iter):
+        Y = project_capped_simplex(X + P, lo, hi)
+        P = X + P - Y
+        X = Y
+        for j, (a, b, kind) in enumerate(linear_constraints):
+            Z = X + Q[j]
+            excess = Z @ a - b
+            if kind == 'ineq':
+                excess = np.maximum(excess, 0)
+            X_new = Z - np.multiply.outer(excess, a) / np.dot(a, a)
+            Q[j] = Z - X_new
+            X = X_new
+        if np.max(np.abs(X - Y)) < tol:
+            break
+    return project_capped_simplex(X, lo, hi)
+
+
+def solve_mean_variance_pg(mean_returns, cov_matrix, lo, hi, objective='sharpe',
+                           risk_free_rate=0.02, x0=None, linear_constraints=(),
+                           max_iter=1000, tol=1e-9):
+    """
+    حل‌کننده گرادیان تصویری برای مسائل میانگین-واریانس (دسته‌ای)
+    Batched projected-gradient mean-variance solver
+
+    'volatility' minimizes w'Σw with FISTA and a constant 1/L step
+    (L = 2·λmax(Σ)); 'sharpe' maximizes the Sharpe ratio by projected
+    gradient ascent with per-problem Armijo backtracking.  Every iteration
+    costs one (m, n) @ (n, n) product plus the O(n log n) projection, so
+    hundreds of problems sharing Σ are solved together.
+
+    پارامترها / Parameters:
+    -----------
+    mean_returns : np.array
+        بازده سالانه دارایی‌ها / Annualized asset returns (n,)
+    cov_matrix : np.array or FactorCovariance
+        ماتریس کوواریانس سالانه / Annualized covariance (n, n)
+    lo, hi : np.array
+        کران وزن‌ها / Weight bounds, (n,) or one row per problem (m, n)
+    objective : str
+        'sharpe' or 'volatility'
+    risk_free_rate : float
+        نرخ بدون ریسک / Risk-free rate
+    x0 : np.array or None
+        نقطه شروع / Starting weights, (n,) or (m, n)
+    linear_constraints : sequence
+        قیدهای خطی اضافه / Extra constraints ``(a, b, 'ineq'|'eq')``
+
+    بازگشت / Returns:
+    --------
+    tuple : (weights, info) - weights has shape (m, n); info holds
+        'iterations', 'converged' (per problem) and 'objective'
+    """
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = cov_matrix if isinstance(cov_matrix, FactorCovariance) else np.asarray(cov_matrix, dtype=float)
+    n = len(mu)
+    lo = np.atleast_2d(np.asarray(lo, dtype=float))
+    hi = np.atleast_2d(np.asarray(hi, dtype=float))
+    m = max(lo.shape[0], hi.shape[0], 1 if x0 is None else np.atleast_2d(x0).shape[0])
+    lo = np.broadcast_to(lo, (m, n))
+    hi = np.broadcast_to(hi, (m, n))
+
+    def project(V, rows=slice(None)):
+        return _project_feasible(V, lo[rows], hi[rows], linear_constraints)
+
+    start = np.full((m, n), 1.0 / n) if x0 is None else np.broadcast_to(np.asarray(x0, dtype=float), (m, n))
+    X = project(start)
+    converged = np.zeros(m, dtype=bool)
+
+    if objective == 'volatility':
+        L = 2 * (cov.max_eigenvalue_bound() if isinstance(cov, FactorCovariance) else np.linalg.eigvalsh(cov)[-1])
+        Y = X.copy()
+        t = 1.0
+        for iteration in range(1, max_iter + 1):
+            X_new = project(Y - 2 * covariance_product(cov, Y) / L)
+            t_new = (1 + np.sqrt(1 + 4 * t * t)) / 2
+            Y = X_new + ((t - 1) / t_new) * (X_new - X)
+            converged = np.max(np.abs(X_new - X), axis=1) < tol
+            X, t = X_new, t_new
+            if converged.all():
+                break
+        value = np.sqrt(portfolio_variance(cov, X))
+
+    elif objective == 'sharpe':
+        def sharpe(W):
+            vol = np.sqrt(portfolio_variance(cov, W))
+            return (W @ mu - risk_free_rate) / vol, vol
+
+        step = np.ones(m)
+        value, vol = sharpe(X)
+        for iteration in range(1, max_iter + 1):
+            excess = X @ mu - risk_free_rate
+            grad = mu / vol[:, None] - (excess / vol ** 3)[:, None] * covariance_product(cov, X)
+
+            candidate = X.copy()
+            accepted = converged.copy()
+            for _ in range(40):
+                pending = ~accepted
+                if not pending.any():
+                    break
+                trial = project(X[pending] + step[pending, None] * grad[pending], pending)
+                trial_value, _ = sharpe(trial)
+                gain = np.einsum('ij,ij->i', grad[pending], trial - X[pending])
+                ok = trial_value >= value[pending] + 1e-4 * gain
+                idx = np.flatnonzero(pending)
+                candidate[idx[ok]] = trial[ok]
+                accepted[idx[ok]] = True
+                step[idx[~ok]] *= 0.5
+
+            moved = np.max(np.abs(candidate - X), axis=1)
+            X = candidate
+            value, vol = sharpe(X)
+            converged = converged | (moved < tol)
+            step = np.minimum(step * 2, 1e6)
+            if converged.all():
+                break
+
+    else:
+        raise ValueError("objective باید 'sharpe' یا 'volatility' باشد.")
+
+    return X, {'iterations': iteration, 'converged': converged, 'objective': value}
+
+
+def _sharpe_slsqp_starts(mean_returns, cov_matrix, lo, hi, linear_constraints, starts,
+                         risk_free_rate=0.02, maxiter=1000):
+    """
+    اجرای SLSQP بیشینه‌سازی شارپ از چند نقطه شروع (کارگر multi-start)
+    Run the max-Sharpe SLSQP problem from each row of ``starts`` with the
+    analytic gradient; the unit of work of one multi-start worker.
+
+    بازگشت / Returns:
+    --------
+    tuple : (weights (k, n), sharpe (k,), success (k,), iterations (k,))
+    """
+    mu = np.asarray(mean_returns, dtype=float)
+    constraints = [{'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)}]
+    for a, b, kind in linear_constraints:
+        a = np.asarray(a, dtype=float)
+        if kind == 'ineq':
+            constraints.append({'type': 'ineq', 'fun': lambda x, a=a, b=b: b - a @ x, 'jac': lambda x, a=a: -a})
+        else:
+            constraints.append({'type': 'eq', 'fun': lambda x, a=a, b=b: a @ x - b, 'jac': lambda x, a=a: a})
+
+    def negative_sharpe(w):
+        vol = np.sqrt(portfolio_variance(cov_matrix, w))
+        excess = w @ mu - risk_free_rate
+        grad = mu / vol - excess / vol ** 3 * covariance_product(cov_matrix, w)
+        return -excess / vol, -grad
+
+    starts = np.atleast_2d(starts)
+    weights = np.empty_like(starts, dtype=float)
+    sharpe = np.full(len(starts), -np.inf)
+    success = np.zeros(len(starts), dtype=bool)
+    iterations = np.zeros(len(starts), dtype=int)
+    for k, x0 in enumerate(starts):
+        try:
+            result = minimize(negative_sharpe, x0, jac=True, method='SLSQP',
+                              bounds=list(zip(lo, hi)), constraints=constraints,
+                              options={'maxiter': maxiter})
+        except (ValueError, np.linalg.LinAlgError):
+            weights[k] = x0
+            continue
+        weights[k] = np.clip(result.x, lo, hi)
+        sharpe[k] = -result.fun
+        success[k] = result.success
+        iterations[k] = result.nit
+    return weights, sharpe, success, iterations
+
+
+def solve_frontier(mean_returns, cov_matrix, lo, hi, linear_constraints=(), n_points=20):
+    """
+    وزن‌های مرز کارا با محدودیت‌ها، از کمترین واریانس تا بیشترین بازده
+    Constrained efficient frontier from the minimum-variance to the
+    maximum-return portfolio
+
+    The end points come from the projected-gradient minimum-variance solve
+    and a linear program; the interior points minimize w'Σw at evenly
+    spaced target returns with SLSQP, each warm-started from its neighbour.
+
+    بازگشت / Returns:
+    --------
+    np.array : وزن‌ها به ترتیب بازده / Weights ordered by return (n_points, n)
+    """
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = np.asarray(cov_matrix, dtype=float)
+    n = len(mu)
+    min_variance, _ = solve_mean_variance_pg(mu, cov, lo, hi, objective='volatility',
+                                             linear_constraints=linear_constraints)
+    min_variance = min_variance[0]
+
+    G = [a for a, _, kind in linear_constraints if kind == 'ineq']
+    E = [a for a, _, kind in linear_constraints if kind != 'ineq']
+    result = linprog(-mu, A_ub=np.array(G).reshape(-1, n) if G else None,
+                     b_ub=[b for _, b, kind in linear_constraints if kind == 'ineq'] or None,
+                     A_eq=np.vstack([np.ones(n)] + E), b_eq=[1.0] + [b for _, b, kind in linear_constraints if kind != 'ineq'],
+                     bounds=list(zip(lo, hi)), method='highs')
+    max_return = np.clip(result.x, lo, hi) if result.success else min_variance
+
+    constraints = [{'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)}]
+    for a, b, kind in linear_constraints:
+        a = np.asarray(a, dtype=float)
+        if kind == 'ineq':
+            constraints.append({'type': 'ineq', 'fun': lambda x, a=a, b=b: b - a @ x, 'jac': lambda x, a=a: -a})
+        else:
+            constraints.append({'type': 'eq', 'fun': lambda x, a=a, b=b: a @ x - b, 'jac': lambda x, a=a: a})
+
+    weights = np.empty((n_points, n))
+    weights[0], weights[-1] = min_variance, max_return
+    targets = np.linspace(min_variance @ mu, max_return @ mu, n_points)
+    for k in range(1, n_points - 1):
+        target_constraint = {'type': 'ineq', 'fun': lambda x, t=targets[k]: x @ mu - t, 'jac': lambda x: mu}
+        solved = minimize(lambda x: (x @ cov @ x, 2 * cov @ x), weights[k - 1], jac=True, method='SLSQP',
+                          bounds=list(zip(lo, hi)), constraints=constraints + [target_constraint],
+                          options={'maxiter': 200})
+        # در صورت شکست، ترکیب خطی دو سر مرز همچنان شدنی است /
+        # on failure the blend of the two end points is still feasible
+        blend = (k / (n_points - 1)) * max_return + (1 - k / (n_points - 1)) * min_variance
+        weights[k] = np.clip(solved.x, lo, hi) if solved.success else blend
+    return weights
+
+
+def _frontier_resamples(returns, seeds, lo, hi, linear_constraints, n_points):
+    """
+    مرز کارای هر نمونه بوت‌استرپ / Frontier weights of each bootstrap resample
+
+    Each seed draws T row indices with replacement, so the result does not
+    depend on how the seeds are split between workers.
+    """
+    T, n = returns.shape
+    weights = np.empty((len(seeds), n_points, n))
+    for k, seed in enumerate(seeds):
+        sample = returns[np.random.default_rng(seed).integers(0, T, T)]
+        weights[k] = solve_frontier(sample.mean(axis=0) * 252, np.cov(sample, rowvar=False) * 252,
+                                    lo, hi, linear_constraints, n_points)
+    return weights
+
+
+def _frontier_resamples_shared(shm_name, shape, seeds, lo, hi, linear_constraints, n_points):
+    """
+    کارگر: اتصال به ماتریس بازده در حافظه مشترک بدون کپی /
+    Worker entry point: attach to the shared returns matrix without copying it
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        returns = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        return _frontier_resamples(returns, seeds, lo, hi, linear_constraints, n_points)
+    finally:
+        shm.close()
+
+
+def rolling_window_returns(returns, window):
+    """
+    بازده تجمعی همه پنجره‌های پیوسته با مجموع تجمعی لگاریتمی
+    Compound return of every contiguous window from one cumulative log-return sum
+
+    All T - window + 1 windows come from a single vectorized difference of
+    the cumulative sum instead of one product per window.
+
+    پارامترها / Parameters:
+    -----------
+    returns : np.array
+        بازده‌های ساده روزانه / Daily simple returns (T,) or (T, m)
+    window : int
+        طول پنجره / Window length in days
+
+    بازگشت / Returns:
+    --------
+    np.array : (T - window + 1, ...) ردیف i پنجره returns[i:i+window] است
+    """
+    log_returns = np.log1p(np.asarray(returns, dtype=float))
+    cumulative = np.concatenate([np.zeros((1,) + log_returns.shape[1:]), np.cumsum(log_returns, axis=0)])
+    return np.expm1(cumulative[window:] - cumulative[:-window])
+
+
+def ewma_state(returns, halflife):
+    """
+    انباشتگرهای میانگین/کوواریانس با وزن نمایی در یک گذر برداری
+    Exponentially weighted sufficient statistics in one vectorized pass
+
+    Row t gets weight λ^(T-1-t) with λ = 0.5^(1/halflife).  The state
+    (Σw, Σw·r, Σw·rrᵀ, Σw²) is updated per new row in O(n²) by
+    ewma_update(), so the history is never reprocessed.
+
+    بازگشت / Returns:
+    --------
+    dict : 'decay', 'weight', 'weighted_sum', 'weighted_cross', 'weight_sq'
+    """
+    returns = np.asarray(returns, dtype=float)
+    decay = 0.5 ** (1.0 / halflife)
+    weights = decay ** np.arange(len(returns) - 1, -1, -1)
+    return {
+        'decay': decay,
+        'weight': weights.sum(),
+        'weighted_sum': weights @ returns,
+        'weighted_cross': (returns * weights[:, None]).T @ returns,
+        'weight_sq': (weights ** 2).sum()
+    }
+
+
+def ewma_update(state, row):
+    """
+    افزودن یک مشاهده جدید به وضعیت EWMA در زمان ثابت
+    Add one observation to an EWMA state in constant time (in place)
+    """
+    decay = state['decay']
+    state['weight'] = decay * state['weight'] + 1
+    state['weighted_sum'] = decay * state['weighted_sum'] + row
+    state['weighted_cross'] = decay * state['weighted_cross'] + np.outer(row, row)
+    state['weight_sq'] = decay ** 2 * state['weight_sq'] + 1
+
+
+def ewma_moments(state):
+    """
+    میانگین و کوواریانس روزانه از وضعیت EWMA
+    Daily mean and bias-corrected covariance from an EWMA state
+
+    Matches pandas ``ewm(halflife=..., adjust=True)`` with ``bias=False``.
+    """
+    mean = state['weighted_sum'] / state['weight']
+    biased = state['weighted_cross'] / state['weight'] - np.outer(mean, mean)
+    correction = state['weight'] ** 2 / (state['weight'] ** 2 - state['weight_sq'])
+    return mean, biased * correction
+
+
+class FactorCovariance:
+    """
+    ماتریس کوواریانس عاملی (رتبه پایین + قطری)
+    Low-rank plus diagonal covariance Σ = B·Bᵀ + diag(d)
+
+    Only the N×K loadings B and the N specific variances d are stored, so
+    Σ·w, w'Σw and correlated shock generation cost O(N·K) and the dense
+    N×N matrix is never formed or factorized.
+    """
+
+    def __init__(self, loadings, specific_variances, assets=None):
+        """
+        پارامترها / Parameters:
+        -----------
+        loadings : np.array
+            بارهای عاملی / Factor loadings B (N, K)
+        specific_variances : np.array
+            واریانس خاص هر دارایی / Specific variances d (N,)
+        assets : list or None
+            نام دارایی‌ها / Asset names, used by to_frame()
+        """
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.specific_variances = np.asarray(specific_variances, dtype=float)
+        self.assets = None if assets is None else list(assets)
+        self.shape = (len(self.specific_variances),) * 2
+
+    @classmethod
+    def from_returns(cls, returns, n_factors, row_weights=None, assets=None):
+        """
+        ساخت مدل عاملی آماری (PCA) از بازده‌ها
+        Statistical (PCA) factor model from a thin SVD of the return matrix
+
+        With ``row_weights`` a the target covariance is Σ a_t (r_t-μ)(r_t-μ)ᵀ
+        with μ the a-weighted mean (default a_t = 1/(T-1), the sample
+        covariance).  The top ``n_factors`` singular directions become the
+        loadings and the residual diagonal keeps every asset's total variance.
+        """
+        returns = np.asarray(returns, dtype=float)
+        if row_weights is None:
+            row_weights = np.full(len(returns), 1.0 / (len(returns) - 1))
+        row_weights = np.asarray(row_weights, dtype=float)
+        mean = row_weights @ returns / row_weights.sum()
+        scaled = np.sqrt(row_weights)[:, None] * (returns - mean)
+
+        _, singular_values, vt = np.linalg.svd(scaled, full_matrices=False)
+        loadings = vt[:n_factors].T * singular_values[:n_factors]
+        total_variance = np.einsum('ij,ij->j', scaled, scaled)
+        specific = np.maximum(total_variance - np.einsum('ij,ij->i', loadings, loadings), 1e-12)
+        return cls(loadings, specific, assets)
+
+    @property
+    def n_factors(self):
+        return self.loadings.shape[1]
+
+    def matvec(self, W):
+        """Σ·w برای بردار یا هر سطر / Σ·w for a vector (n,) or each row of (m, n)"""
+        W = np.asarray(W, dtype=float)
+        return (W @ self.loadings) @ self.loadings.T + W * self.specific_variances
+
+    def quadratic(self, W):
+        """w'Σw برای بردار یا هر سطر / Portfolio variance of a vector or of each row"""
+        W = np.asarray(W, dtype=float)
+        exposures = W @ self.loadings
+        return np.sum(exposures ** 2, axis=-1) + np.sum(W ** 2 * self.specific_variances, axis=-1)
+
+    def diagonal(self):
+        """واریانس هر دارایی / Total variance of every asset"""
+        return np.einsum('ij,ij->i', self.loadings, self.loadings) + self.specific_variances
+
+    def scaled(self, factor):
+        """کوواریانس ضرب‌شده در عدد / The covariance multiplied by a scalar"""
+        return FactorCovariance(self.loadings * np.sqrt(factor), self.specific_variances * factor, self.assets)
+
+    def max_eigenvalue_bound(self):
+        """کران بالای بزرگ‌ترین مقدار ویژه / Upper bound λmax(BᵀB) + max(d) on λmax(Σ)"""
+        return np.linalg.eigvalsh(self.loadings.T @ self.loadings)[-1] + self.specific_variances.max()
+
+    def sample(self, rng, size):
+        """
+        تولید شوک‌های همبسته N(0, Σ) بدون چولسکی
+        Draw ``size`` correlated N(0, Σ) shocks in O(size·N·K), no Cholesky
+        """
+        common = rng.standard_normal((size, self.n_factors)) @ self.loadings.T
+        return common + rng.standard_normal((size, self.shape[0])) * np.sqrt(self.specific_variances)
+
+    def to_dense(self):
+        """ماتریس کامل N×N / Dense N×N matrix (for small universes and reports)"""
+        return self.loadings @ self.loadings.T + np.diag(self.specific_variances)
+
+    def to_frame(self):
+        """ماتریس کامل به صورت DataFrame / Dense matrix as a DataFrame"""
+        return pd.DataFrame(self.to_dense(), index=self.assets, columns=self.assets)
+
+
+def covariance_product(cov, W):
+    """
+    حاصل‌ضرب Σ·w برای کوواریانس متراکم یا عاملی
+    Σ·w for a dense or FactorCovariance matrix (rows of W are portfolios)
+    """
+    if isinstance(cov, FactorCovariance):
+        return cov.matvec(W)
+    return np.asarray(W, dtype=float) @ np.asarray(cov, dtype=float)
+
+
+def portfolio_variance(cov, W):
+    """
+    واریانس سبد w'Σw برای کوواریانس متراکم یا عاملی
+    w'Σw for a dense or FactorCovariance matrix, per row of a 2-D W
+    """
+    if isinstance(cov, FactorCovariance):
+        return cov.quadratic(W)
+    W = np.asarray(W, dtype=float)
+    return np.einsum('...j,jk,...k->...', W, np.asarray(cov, dtype=float), W)
+
+
+def _newton_direction(cov, extra_diagonal, rhs):
+    """
+    حل (Σ + diag(e))·x = rhs؛ برای کوواریانس عاملی با اتحاد وودبری در O(N·K²)
+    Solve (Σ + diag(e))·x = rhs; a FactorCovariance uses the Woodbury
+    identity in O(N·K²) instead of a dense O(N³) solve
+    """
+    if isinstance(cov, FactorCovariance):
+        inverse_diagonal = 1.0 / (cov.specific_variances + extra_diagonal)
+        scaled_loadings = cov.loadings * inverse_diagonal[:, None]
+        capacitance = np.eye(cov.n_factors) + cov.loadings.T @ scaled_loadings
+        return inverse_diagonal * rhs - scaled_loadings @ np.linalg.solve(capacitance, scaled_loadings.T @ rhs)
+    return np.linalg.solve(np.asarray(cov, dtype=float) + np.diag(extra_diagonal), rhs)
+
+
+def solve_risk_parity(cov_matrix, budgets=None, lo=None, hi=None, linear_constraints=(),
+                      max_iter=50, tol=1e-14, max_pg_iter=2000):
+    """
+    حل‌کننده نیوتن برای سبد برابری ریسک (ERC) / بودجه‌بندی ریسک
+    Newton solver for equal-risk-contribution / risk-budgeting portfolios
+
+    The risk-budget condition w_i·(Σw)_i ∝ b_i is the optimality condition of
+    the strictly convex problem min ½yᵀΣy − Σ b_i·log(y_i), y > 0, with
+    w = y / Σy.  Newton's method on it uses the analytic gradient Σy − b/y
+    and Hessian Σ + diag(b/y²) and converges quadratically, typically in
+    fewer than ten iterations for hundreds of assets.
+
+    When the budget portfolio violates ``lo``/``hi`` or the linear
+    constraints, the convex problem min ½wᵀΣw − σ²·Σ b_i·log(w_i) is
+    solved over the feasible set by projected gradient, with σ² the
+    variance of the unconstrained solution.  Its minimizer is the budget
+    portfolio itself whenever no constraint binds.
+
+    پارامترها / Parameters:
+    -----------
+    cov_matrix : np.array or FactorCovariance
+        ماتریس کوواریانس / Covariance (n, n)
+    budgets : np.array or None
+        بودجه ریسک هر دارایی / Risk budgets (default equal), normalized to 1
+    lo, hi : np.array or None
+        کران وزن‌ها / Weight bounds
+    linear_constraints : sequence
+        قیدهای خطی اضافه / Extra constraints ``(a, b, 'ineq'|'eq')``
+
+    بازگشت / Returns:
+    --------
+    tuple : (weights, info) - info holds 'iterations' (Newton),
+        'pg_iterations', 'converged' and 'constrained'
+    """
+    cov = cov_matrix if isinstance(cov_matrix, FactorCovariance) else np.asarray(cov_matrix, dtype=float)
+    n = cov.shape[0]
+    budgets = np.full(n, 1.0 / n) if budgets is None else np.asarray(budgets, dtype=float)
+    if np.any(budgets <= 0):
+        raise ValueError("بودجه‌های ریسک باید مثبت باشند.")
+    budgets = budgets / budgets.sum()
+
+    def objective(y):
+        return 0.5 * portfolio_variance(cov, y) - budgets @ np.log(y)
+
+    # شروع از سبد عکس نوسان با مقیاس yᵀΣy = 1 / inverse-volatility start scaled to yᵀΣy = 1
+    variances = cov.diagonal() if isinstance(cov, FactorCovariance) else np.diag(cov)
+    y = 1.0 / np.sqrt(variances)
+    y /= np.sqrt(portfolio_variance(cov, y))
+
+    converged = False
+    for iteration in range(1, max_iter + 1):
+        gradient = covariance_product(cov, y) - budgets / y
+        direction = -_newton_direction(cov, budgets / y ** 2, gradient)
+        decrement = -gradient @ direction
+        if decrement / 2 < tol:
+            converged = True
+            break
+        # گام میرا: مثبت ماندن y و شرط آرمیخو / damped step keeping y > 0 (Armijo)
+        shrinking = direction < 0
+        step = min(1.0, 0.99 * np.min(-y[shrinking] / direction[shrinking])) if shrinking.any() else 1.0
+        value = objective(y)
+        while objective(y + step * direction) > value - 0.25 * step * decrement and step > 1e-12:
+            step *= 0.5
+        y = y + step * direction
+
+    weights = y / y.sum()
+    info = {'iterations': iteration, 'pg_iterations': 0, 'converged': converged, 'constrained': False}
+
+    lo = np.zeros(n) if lo is None else np.asarray(lo, dtype=float)
+    hi = np.ones(n) if hi is None else np.asarray(hi, dtype=float)
+    feasible = np.all(weights >= lo - 1e-12) and np.all(weights <= hi + 1e-12) and all(
+        a @ weights <= b + 1e-12 if kind == 'ineq' else abs(a @ weights - b) <= 1e-12
+        for a, b, kind in linear_constraints)
+    if feasible:
+        return weights, info
+
+    # قیدهای فعال: بودجه‌بندی ریسک محدب روی مجموعه شدنی / binding constraints:
+    # convex risk budgeting over the feasible set by projected gradient
+    scale = portfolio_variance(cov, weights)
+    floor = np.maximum(lo, 1e-8)
+
+    def penalized(w):
+        return 0.5 * portfolio_variance(cov, w) - scale * budgets @ np.log(w)
+
+    def project(v):
+        return _project_feasible(v, floor, hi, linear_constraints)
+
+    w = project(weights)
+    value = penalized(w)
+    step = 1.0 / (2 * scale)
+    info['constrained'], info['converged'] = True, False
+    for pg_iteration in range(1, max_pg_iter + 1):
+        gradient = covariance_product(cov, w) - scale * budgets / w
+        while True:
+            trial = project(w - step * gradient)
+            trial_value = penalized(trial)
+            change = trial - w
+            if trial_value <= value + gradient @ change + change @ change / (2 * step) or step < 1e-12:
+                break
+            step *= 0.5
+        w, value = trial, trial_value
+        step *= 2
+        if np.max(np.abs(change)) < 1e-10:
+            info['converged'] = True
+            break
+    info['pg_iterations'] = pg_iteration
+    return w, info
+
+
+def hrp_weights(cov_matrix, correlation, linkage_method='single'):
+    """
+    تخصیص برابری ریسک سلسله‌مراتبی (HRP)
+    Hierarchical Risk Parity (López de Prado)
+
+    1. Tree clustering on the correlation distance sqrt((1 - ρ) / 2).
+    2. Quasi-diagonalization: assets are ordered by the dendrogram leaves.
+    3. Recursive bisection: each split gives its halves weight inversely
+       proportional to their inverse-variance cluster variances.
+
+    No matrix is inverted; the cost is dominated by the O(N²) linkage.
+
+    پارامترها / Parameters:
+    -----------
+    cov_matrix : np.array or FactorCovariance
+        ماتریس کوواریانس / Covariance (n, n)
+    correlation : np.array
+        ماتریس همبستگی / Correlation (n, n)
+    linkage_method : str
+        روش خوشه‌بندی / scipy linkage method ('single', 'ward', ...)
+
+    بازگشت / Returns:
+    --------
+    tuple : (weights, order) - order is the quasi-diagonal asset order
+    """
+    correlation = np.asarray(correlation, dtype=float)
+    distance = np.sqrt(np.clip((1 - correlation) / 2, 0, None))
+    np.fill_diagonal(distance, 0)
+    order = leaves_list(linkage(squareform(distance, checks=False), method=linkage_method))
+
+    factor = isinstance(cov_matrix, FactorCovariance)
+    cov = cov_matrix if factor else np.asarray(cov_matrix, dtype=float)
+    variances = cov.diagonal() if factor else np.diag(cov)
+
+    def cluster_variance(items):
+        ivp = 1.0 / variances[items]
+        ivp /= ivp.sum()
+        if factor:
+            exposures = ivp @ cov.loadings[items]
+            return exposures @ exposures + ivp ** 2 @ cov.specific_variances[items]
+        return ivp @ cov[np.ix_(items, items)] @ ivp
+
+    weights = np.ones(len(order))
+    clusters = [order]
+    while clusters:
+        next_clusters = []
+        for items in clusters:
+            if len(items) < 2:
+                continue
+            left, right = items[:len(items) // 2], items[len(items) // 2:]
+            left_variance, right_variance = cluster_variance(left), cluster_variance(right)
+            alpha = 1 - left_variance / (left_variance + right_variance)
+            weights[left] *= alpha
+            weights[right] *= 1 - alpha
+            next_clusters += [left, right]
+        clusters = next_clusters
+    return weights, order
+
+
+def solve_cvar_lp(scenario_returns, alpha=0.95, lo=None, hi=None, linear_constraints=(),
+                  expected_returns=None, target_return=None):
+    """
+    کمینه‌سازی CVaR سناریومحور با برنامه‌ریزی خطی تُنُک (راکافلار-اوریاسف)
+    Minimize scenario CVaR with the Rockafellar-Uryasev linear program
+
+    The primal has the weights w, the VaR level ζ and one excess loss u_s
+    per scenario:
+
+        min  ζ + c·Σ u_s,  c = 1/((1-α)·S)
+        s.t. u_s >= -r_sᵀw - ζ,  u_s >= 0,  Σw = 1,  lo <= w <= hi
+
+    Its LP dual is solved instead: one variable q_s ∈ [0, c] per scenario
+    but only n + 1 equality rows (Rᵀq + bound/constraint terms = 0,
+    Σq = 1), assembled as a sparse matrix.  With S in the 10k-100k range
+    the primal's dense ζ column makes every scenario row interact, while
+    the dual keeps a basis of size n + 1.  The primal w and ζ are read back
+    from the dual's equality marginals.
+
+    پارامترها / Parameters:
+    -----------
+    scenario_returns : np.array
+        بازده سناریوها / Scenario returns of each asset (S, n)
+    alpha : float
+        سطح اطمینان / Confidence level (0.95 -> CVaR of the worst 5%)
+    lo, hi : np.array or None
+        کران وزن‌ها / Weight bounds (default 0 and 1)
+    linear_constraints : sequence
+        قیدهای خطی اضافه / Extra constraints ``(a, b, 'ineq'|'eq')``
+    expected_returns, target_return : np.array, float or None
+        حداقل بازده مورد انتظار / Optional constraint expected_returns·w >= target_return
+
+    بازگشت / Returns:
+    --------
+    tuple : (weights, info) - weights is None when the problem is
+        infeasible; info holds 'cvar' and 'var' (loss fractions over the
+        scenario horizon), 'success' and 'message'
+    """
+    scenario_returns = np.asarray(scenario_returns, dtype=float)
+    S, n = scenario_returns.shape
+    lo = np.zeros(n) if lo is None else np.asarray(lo, dtype=float)
+    hi = np.ones(n) if hi is None else np.asarray(hi, dtype=float)
+
+    # قیدهای نابرابری G·w <= g و برابری E·w = e / primal constraints on w
+    G, g = [], []
+    E, e = [np.ones(n)], [1.0]
+    for a, b, kind in linear_constraints:
+        (G if kind == 'ineq' else E).append(np.asarray(a, dtype=float))
+        (g if kind == 'ineq' else e).append(b)
+    if target_return is not None:
+        G.append(-np.asarray(expected_returns, dtype=float))
+        g.append(-target_return)
+    G = np.array(G).reshape(-1, n)
+    E = np.array(E)
+    g, e = np.array(g, dtype=float), np.array(e, dtype=float)
+
+    # متغیرهای دوگان / dual variables [q (S), γ (G rows), λ (lo), κ (hi), v (E rows)]
+    # max  -gᵀγ + loᵀλ - hiᵀκ + eᵀv
+    # s.t. Rᵀq - Gᵀγ + λ - κ + Eᵀv = 0,  Σq = 1,  0 <= q <= c,  γ, λ, κ >= 0
+    identity = sparse.identity(n, format='csr')
+    stationarity = sparse.hstack([
+        sparse.csr_matrix(scenario_returns.T), sparse.csr_matrix(-G.T),
+        identity, -identity, sparse.csr_matrix(E.T)
+    ], format='csr')
+    n_other = len(g) + 2 * n + len(e)
+    normalization = sparse.hstack([
+        sparse.csr_matrix(np.ones((1, S))), sparse.csr_matrix((1, n_other))
+    ], format='csr')
+    A_eq = sparse.vstack([stationarity, normalization], format='csr')
+    b_eq = np.concatenate([np.zeros(n), [1.0]])
+
+    cost = -np.concatenate([np.zeros(S), -g, lo, -hi, e])
+    bounds = np.column_stack([
+        np.zeros(S + len(g) + 2 * n + len(e)),
+        np.concatenate([np.full(S, 1.0 / ((1 - alpha) * S)), np.full(n_other, np.inf)])
+    ])
+    bounds[S + len(g) + 2 * n:, 0] = -np.inf  # v آزاد است / v is free
+
+    result = linprog(cost, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
+    if not result.success:
+        # دوگان بی‌کران یعنی قیدهای اولیه ناسازگارند / an unbounded dual means infeasible constraints
+        message = "CVaR constraints are infeasible" if result.status == 3 else result.message
+        return None, {'cvar': np.nan, 'var': np.nan, 'success': False, 'message': message}
+
+    # حساسیت مقدار بهینه به سمت راست قیدها همان متغیرهای اولیه است /
+    # the equality marginals are the primal variables (with the sign of the min form)
+    marginals = -result.eqlin.marginals
+    weights = np.clip(marginals[:n], lo, hi)
+    return weights, {'cvar': -result.fun, 'var': marginals[n], 'success': True,
+                     'message': result.message}
+
+
+def solve_cdar_lp(returns, expected_returns=None, max_cdar=None, alpha=0.95, lo=None, hi=None,
+                  linear_constraints=()):
+    """
+    بهینه‌سازی با قید افت سرمایه شرطی (CDaR) روی مسیر تاریخی
+    Drawdown-constrained optimization with the Chekhlov-Uryasev-Zabarankin LP
+
+    The path is the uncompounded cumulative return y_t = C_tᵀw with
+    C = cumsum(R), which keeps drawdowns linear in w.  With u_t the running
+    peak of the path (starting from 0) and z_t the drawdown in excess of ζ:
+
+        max  μᵀw                      (or min CDaR when max_cdar is None)
+        s.t. u_t >= C_tᵀw,  u_t >= u_{t-1},  u_t >= 0
+             z_t >= u_t - C_tᵀw - ζ,  z_t >= 0
+             ζ + c·Σ z_t <= max_cdar,  c = 1/((1-α)·T)
+             Σw = 1,  lo <= w <= hi
+
+    Every row touches at most n + 3 variables, so the constraint matrix is
+    assembled in sparse form with O(T·n) non-zeros and handed to HiGHS.
+
+    پارامترها / Parameters:
+    -----------
+    returns : np.array
+        بازده‌های روزانه تاریخی / Historical periodic returns (T, n)
+    expected_returns : np.array or None
+        بازده مورد انتظار / Objective coefficients (required with max_cdar)
+    max_cdar : float or None
+        سقف CDaR به صورت کسری از سرمایه / CDaR limit as a fraction of the
+        investment; None minimizes CDaR instead
+    alpha : float
+        سطح اطمینان / Confidence level (0.95 -> mean of the worst 5% drawdowns)
+    lo, hi : np.array or None
+        کران وزن‌ها / Weight bounds (default 0 and 1)
+    linear_constraints : sequence
+        قیدهای خطی اضافه / Extra constraints ``(a, b, 'ineq'|'eq')``
+
+    بازگشت / Returns:
+    --------
+    tuple : (weights, info) - weights is None when the problem is
+        infeasible; info holds 'cdar', 'max_drawdown' (of the optimal
+        path), 'success' and 'message'
+    """
+    returns = np.asarray(returns, dtype=float)
+    T, n = returns.shape
+    lo = np.zeros(n) if lo is None else np.asarray(lo, dtype=float)
+    hi = np.ones(n) if hi is None else np.asarray(hi, dtype=float)
+    if max_cdar is not None and expected_returns is None:
+        raise ValueError("برای سقف CDaR بازده مورد انتظار لازم است.")
+
+    # متغیرها / variables x = [w (n), u (T), z (T), ζ]
+    n_vars = n + 2 * T + 1
+    path = sparse.csr_matrix(np.cumsum(returns, axis=0))
+    identity = sparse.identity(T, format='csr')
+    zeros = sparse.csr_matrix((T, T))
+    zeta = sparse.csr_matrix(np.ones((T, 1)))
+    # u_{t-1} - u_t <= 0 برای t >= 1 / the running peak never decreases
+    peak_step = sparse.diags([np.ones(T - 1), -np.ones(T - 1)], [0, 1], shape=(T - 1, T), format='csr')
+    c = 1.0 / ((1 - alpha) * T)
+
+    blocks = [
+        sparse.hstack([path, -identity, zeros, sparse.csr_matrix((T, 1))]),
+        sparse.hstack([sparse.csr_matrix((T - 1, n)), peak_step, sparse.csr_matrix((T - 1, T + 1))]),
+        sparse.hstack([-path, identity, -identity, -zeta]),
+    ]
+    b_ub = [np.zeros(T), np.zeros(T - 1), np.zeros(T)]
+    if max_cdar is not None:
+        blocks.append(sparse.csr_matrix(np.concatenate([np.zeros(n + T), np.full(T, c), [1.0]])))
+        b_ub.append([max_cdar])
+
+    A_eq, b_eq = [np.concatenate([np.ones(n), np.zeros(2 * T + 1)])], [1.0]
+    for a, b, kind in linear_constraints:
+        row = np.concatenate([np.asarray(a, dtype=float), np.zeros(2 * T + 1)])
+        if kind == 'ineq':
+            blocks.append(sparse.csr_matrix(row))
+            b_ub.append([b])
+        else:
+            A_eq.append(row)
+            b_eq.append(b)
+
+    if max_cdar is None:
+        cost = np.concatenate([np.zeros(n + T), np.full(T, c), [1.0]])
+    else:
+        cost = np.concatenate([-np.asarray(expected_returns, dtype=float), np.zeros(2 * T + 1)])
+    bounds = np.column_stack([
+        np.concatenate([lo, np.zeros(2 * T), [-np.inf]]),
+        np.concatenate([hi, np.full(2 * T + 1, np.inf)])
+    ])
+
+    result = linprog(cost, A_ub=sparse.vstack(blocks, format='csr'), b_ub=np.concatenate(b_ub),
+                     A_eq=sparse.csr_matrix(np.array(A_eq)), b_eq=b_eq, bounds=bounds, method='highs')
+    if not result.success:
+        message = "CDaR limit is infeasible" if result.status == 2 else result.message
+        return None, {'cdar': np.nan, 'max_drawdown': np.nan, 'success': False, 'message': message}
+
+    weights = np.clip(result.x[:n], lo, hi)
+    drawdowns = _path_drawdowns(returns @ weights)
+    return weights, {'cdar': _conditional_drawdown(drawdowns, alpha), 'max_drawdown': drawdowns.max(),
+                     'success': True, 'message': result.message}
+
+
+def _path_drawdowns(portfolio_returns):
+    """
+    افت هر روز از بیشینه مسیر بازده تجمعی ساده (از صفر)
+    Drawdown of each day below the running peak of the uncompounded path
+    """
+    path = np.cumsum(portfolio_returns)
+    return np.maximum.accumulate(np.maximum(path, 0)) - path
+
+
+def _conditional_drawdown(drawdowns, alpha=0.95):
+    """
+    CDaR: min over ζ of ζ + mean(max(d - ζ, 0)) / (1 - α), evaluated at the α-quantile
+    """
+    zeta = np.quantile(drawdowns, alpha, method='inverted_cdf')
+    return zeta + np.mean(np.maximum(drawdowns - zeta, 0)) / (1 - alpha)
+
+
+def _cholesky_factor(cov):
+    """
+    عامل L با L·Lᵀ = Σ (چولسکی، یا ریشه طیفی برای ماتریس نیمه‌معین)
+    Factor L with L·Lᵀ = Σ: Cholesky, or the eigen square root when Σ is
+    only positive semi-definite
+    """
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        return eigenvectors * np.sqrt(np.maximum(eigenvalues, 0))
+
+
+def _tail_risk_from_sorted(sorted_values, alphas):
+    """
+    چندک و میانگین دنباله از آرایه مرتب‌شده
+    Quantiles (np.percentile's linear rule) and lower-tail means for several
+    probabilities, read from one sorted array and its prefix sums.
+    """
+    n = len(sorted_values)
+    position = np.asarray(alphas, dtype=float) * (n - 1)
+    below = np.floor(position).astype(int)
+    above = np.minimum(below + 1, n - 1)
+    quantiles = sorted_values[below] + (sorted_values[above] - sorted_values[below]) * (position - below)
+
+    counts = np.maximum(np.searchsorted(sorted_values, quantiles, side='right'), 1)
+    prefix = np.cumsum(sorted_values)
+    tail_means = prefix[counts - 1] / counts
+    return quantiles, tail_means
+
+
 class PortfolioOptimizer:
     """
     کلاس بهینه‌سازی سبد سرمایه‌گذاری با MPT و شبیه‌سازی مونت‌کارلو
     Portfolio Optimizer using Modern Portfolio Theory and Monte Carlo Simulation
     """
     
-    def __init__(self, price_data):
+    def __init__(self, price_data, estimator='sample', halflife=63, n_factors=None):
         """
         پارامترها / Parameters:
         -----------
         price_data : DataFrame
             داده‌های قیمت دارایی‌ها / Asset price data
+        estimator : str
+            تخمین‌گر میانگین/کوواریانس / Moment estimator: 'sample' (equal
+            weights) or 'ewma' (exponentially weighted)
+        halflife : float
+            نیمه‌عمر EWMA بر حسب روز / EWMA half-life in trading days
+        n_factors : int or None
+            تعداد عامل‌های PCA / Number of statistical factors; when set,
+            cov_matrix is a FactorCovariance instead of a dense DataFrame
         """
         self.prices = price_data
         self.returns = self.prices.pct_change().dropna()
         self.assets = list(self.prices.columns)
         self.n_assets = len(self.assets)
         
-        # محاسبه آمار / Calculate statistics
-        self.mean_returns = self.returns.mean() * 252  # بازده سالانه / Annualized returns
-        self.cov_matrix = self.returns.cov() * 252     # ماتریس کوواریانس سالانه / Annualized covariance
+        # انباشتگرهای تخمین‌گرها (تنبل؛ در اولین استفاده ساخته و سپس با update() به‌روز می‌شوند)
+        # Estimator accumulators, built on first use and then kept current by update():
+        # Welford (count, daily mean, co-moment Σ(r-μ)(r-μ)ᵀ) and the EWMA state
+        self.halflife = halflife
+        self._moment_state = None
+        self._ewma_state = None
+        
+        # آمار مشتق‌شده تنبل که همگی با هم باطل می‌شوند / Lazily derived statistics,
+        # invalidated together whenever the data or the estimator changes
+        self._derived = {}
+        
+        # کش نتایج شبیه‌سازی مونت‌کارلو / Monte Carlo result cache
+        # key: (weights, investment, years, n_simulations, seed, engine)
+        self.simulation_cache_size = 32
+        self.simulation_cache_stats = {'hits': 0, 'misses': 0}
+        self._simulation_cache = {}
+        
+        # کش LRU سری بازده و آمار سبد / LRU memo of portfolio return series and stats
+        # key: ('returns' | 'stats', rounded weights[, risk_free_rate])
+        self.portfolio_cache_size = 128
+        self.portfolio_cache_stats = {'hits': 0, 'misses': 0}
+        self._portfolio_cache = {}
+        
+        # انتخاب تخمین‌گر؛ mean_returns و cov_matrix در اولین استفاده محاسبه می‌شوند
+        # Select the estimator; mean_returns and cov_matrix are computed on first use
+        self.set_estimator(estimator, n_factors=n_factors)
         
         # FIXED: Correct weights for risk profiles based on requirements
         self.profile_weights = {
@@ -46,7 +1075,8 @@ class PortfolioOptimizer:
                 'Bitcoin': (0.05, 0.20),
                 'Ethereum': (0.05, 0.15),
                 'target_volatility': (0.10, 0.15),
-                'target_return': (0.08, 0.12)
+                'target_return': (0.08, 0.12),
+                'max_cdar': 0.15
             },
             'Moderate': {
                 'Gold': (0.25, 0.35),
@@ -54,7 +1084,8 @@ class PortfolioOptimizer:
                 'Bitcoin': (0.15, 0.30),
                 'Ethereum': (0.15, 0.25),
                 'target_volatility': (0.15, 0.22),
-                'target_return': (0.12, 0.18)
+                'target_return': (0.12, 0.18),
+                'max_cdar': 0.25
             },
             'Aggressive': {
                 'Gold': (0.10, 0.20),
@@ -62,10 +1093,254 @@ class PortfolioOptimizer:
                 'Bitcoin': (0.30, 0.45),
                 'Ethereum': (0.25, 0.40),
                 'target_volatility': (0.25, 0.35),
-                'target_return': (0.20, 0.30)
+                'target_return': (0.20, 0.30),
+                'max_cdar': 0.40
             }
         }
+        self._extend_profiles()
+
+
+    def set_estimator(self, estimator='sample', halflife=None, n_factors=None):
+        """
+        انتخاب تخمین‌گر میانگین و کوواریانس
+        Select the moment estimator used by every optimizer and simulation
 
+        Both estimators' accumulators are kept current by update(), so
+        switching only rebuilds mean_returns/cov_matrix from them on next
+        use.  A new ``halflife`` rebuilds the EWMA state in one vectorized pass.
+
+        پارامترها / Parameters:
+        -----------
+        estimator : str
+            'sample' or 'ewma'
+        halflife : float or None
+            نیمه‌عمر جدید EWMA (روز) / New EWMA half-life in trading days
+        n_factors : int or None
+            تعداد عامل‌ها برای کوواریانس عاملی / Number of factors for a
+            FactorCovariance (None keeps the dense covariance)
+        """
+        if estimator not in ('sample', 'ewma'):
+            raise ValueError("estimator باید 'sample' یا 'ewma' باشد.")
+        if halflife is not None and halflife != self.halflife:
+            self.halflife = halflife
+            self._ewma_state = None
+        if n_factors is not None and not 1 <= n_factors <= self.n_assets:
+            raise ValueError("n_factors باید بین 1 و تعداد دارایی‌ها باشد.")
+        self.estimator = estimator
+        self.n_factors = n_factors
+        self._invalidate()
+    
+    def _invalidate(self):
+        """
+        باطل‌کردن همه آمار مشتق‌شده و نتایج کش‌شده
+        Drop every derived statistic, memoized portfolio and cached simulation
+        after a data or estimator change
+        """
+        self._derived.clear()
+        self.clear_portfolio_cache()
+        self.clear_simulation_cache()
+    
+    def _cached(self, name, compute):
+        """
+        مقدار مشتق‌شده را فقط یک بار (در اولین استفاده) محاسبه می‌کند
+        Compute a derived quantity on first use and reuse it until _invalidate()
+        """
+        if name not in self._derived:
+            self._derived[name] = compute()
+        return self._derived[name]
+    
+    def _sample_accumulators(self):
+        """انباشتگرهای Welford / Welford accumulators (count, daily mean, co-moment matrix)"""
+        if self._moment_state is None:
+            daily = self._returns_array
+            mean = daily.mean(axis=0)
+            centered = daily - mean
+            self._moment_state = (len(daily), mean, centered.T @ centered)
+        return self._moment_state
+    
+    def _ewma_accumulators(self):
+        """وضعیت EWMA / EWMA state for the current half-life"""
+        if self._ewma_state is None:
+            self._ewma_state = ewma_state(self._returns_array, self.halflife)
+        return self._ewma_state
+    
+    def _estimate_moments(self):
+        """
+        میانگین و کوواریانس سالانه تخمین‌گر فعال
+        Annualized mean (array) and covariance (array or FactorCovariance)
+        of the active estimator
+
+        With ``n_factors`` the factor model is fitted from the return
+        history (one thin SVD, O(T·N·min(T, N))) instead of the dense
+        accumulators.
+        """
+        if self.estimator == 'ewma':
+            mean, cov = ewma_moments(self._ewma_accumulators())
+        else:
+            count, mean, m2 = self._sample_accumulators()
+            cov = m2 / (count - 1)
+        if self.n_factors:
+            cov = FactorCovariance.from_returns(
+                self._returns_array, self.n_factors, self._factor_row_weights(), self.assets).scaled(252)
+        else:
+            cov = np.ascontiguousarray(cov * 252)
+        return np.ascontiguousarray(mean * 252), cov
+    
+    # آرایه‌های پیوسته float64 برای محاسبات داخلی؛ اشیای pandas فقط برای API
+    # Contiguous float64 arrays used by every internal method; the pandas
+    # properties below them are kept for the public API only
+    @property
+    def _returns_array(self):
+        return self._cached('returns_array', lambda: np.ascontiguousarray(self.returns.values, dtype=float))
+    
+    @property
+    def _mean_array(self):
+        return self._cached('moments', self._estimate_moments)[0]
+    
+    @property
+    def _cov_array(self):
+        return self._cached('moments', self._estimate_moments)[1]
+    
+    @property
+    def mean_returns(self):
+        """بازده سالانه / Annualized expected returns (Series)"""
+        return self._cached('mean_returns', lambda: pd.Series(self._mean_array, index=self.assets))
+    
+    @property
+    def cov_matrix(self):
+        """ماتریس کوواریانس سالانه / Annualized covariance (DataFrame, or FactorCovariance with n_factors)"""
+        def compute():
+            if isinstance(self._cov_array, FactorCovariance):
+                return self._cov_array
+            return pd.DataFrame(self._cov_array, index=self.assets, columns=self.assets)
+        return self._cached('cov_matrix', compute)
+    
+    @property
+    def cholesky_factor(self):
+        """
+        عامل چولسکی کوواریانس سالانه / Lower factor L with L·Lᵀ = cov_matrix
+        (None for a FactorCovariance, which draws shocks from its factors)
+        """
+        def compute():
+            if isinstance(self._cov_array, FactorCovariance):
+                return None
+            return _cholesky_factor(self._cov_array)
+        return self._cached('cholesky_factor', compute)
+    
+    @property
+    def asset_volatilities(self):
+        """نوسان سالانه هر دارایی / Annualized volatility of every asset (Series)"""
+        def compute():
+            cov = self._cov_array
+            variances = cov.diagonal() if isinstance(cov, FactorCovariance) else np.diag(cov)
+            return pd.Series(np.sqrt(variances), index=self.assets)
+        return self._cached('asset_volatilities', compute)
+    
+    @property
+    def correlation_matrix(self):
+        """ماتریس همبستگی / Correlation matrix implied by cov_matrix (DataFrame)"""
+        def compute():
+            cov = self._cov_array
+            dense = cov.to_dense() if isinstance(cov, FactorCovariance) else cov
+            volatilities = self.asset_volatilities.values
+            return pd.DataFrame(dense / np.outer(volatilities, volatilities),
+                                index=self.assets, columns=self.assets)
+        return self._cached('correlation_matrix', compute)
+    
+    @property
+    def downside_cov_matrix(self):
+        """
+        کوواریانس نزولی سالانه / Annualized downside semi-covariance
+        E[min(r_i, 0)·min(r_j, 0)]·252, the matrix behind the Sortino ratio
+        """
+        def compute():
+            downside = np.minimum(self._returns_array, 0)
+            return pd.DataFrame(downside.T @ downside / len(downside) * 252,
+                                index=self.assets, columns=self.assets)
+        return self._cached('downside_cov_matrix', compute)
+
+    def _factor_row_weights(self):
+        """
+        وزن هر ردیف بازده در تخمین‌گر فعال / Per-row weights a_t of the active
+        estimator, so that its covariance is Σ a_t (r_t-μ)(r_t-μ)ᵀ
+        """
+        if self.estimator != 'ewma':
+            return None
+        state = self._ewma_accumulators()
+        correction = state['weight'] ** 2 / (state['weight'] ** 2 - state['weight_sq'])
+        weights = state['decay'] ** np.arange(len(self.returns) - 1, -1, -1)
+        return weights / state['weight'] * correction
+
+    def update(self, new_prices, window=None):
+        """
+        به‌روزرسانی افزایشی با ردیف‌های قیمت جدید
+        Append new price rows and update the statistics incrementally
+
+        Each new daily return updates the mean and co-moment matrix with
+        Welford's online recurrence (and the EWMA state) in O(n_assets²),
+        so a nightly refresh does not re-estimate over the whole history.
+        With ``window`` the oldest returns are removed by the reverse
+        recurrence until at most ``window`` remain, giving a sliding
+        estimation window.  Accumulators that were never built are left
+        to be built from the updated history on first use.
+
+        پارامترها / Parameters:
+        -----------
+        new_prices : DataFrame or Series
+            ردیف(های) قیمت جدید با همان ستون‌ها / New price row(s) with the
+            same columns, dated after the last existing row
+        window : int or None
+            حداکثر تعداد بازده نگه‌داشته‌شده / Maximum number of returns to keep
+        """
+        if isinstance(new_prices, pd.Series):
+            new_prices = new_prices.to_frame().T
+        new_prices = new_prices[self.assets]
+        if len(new_prices) and new_prices.index[0] <= self.prices.index[-1]:
+            raise ValueError("قیمت‌های جدید باید بعد از آخرین تاریخ موجود باشند.")
+        if window is not None and window < 2:
+            raise ValueError("window باید حداقل 2 باشد.")
+        
+        new_returns = pd.concat([self.prices.iloc[-1:], new_prices]).pct_change().iloc[1:].dropna()
+        self.prices = pd.concat([self.prices, new_prices])
+        self.returns = pd.concat([self.returns, new_returns])
+        
+        sample, ewma = self._moment_state, self._ewma_state
+        if sample is not None:
+            count, mean, m2 = sample[0], sample[1].copy(), sample[2].copy()
+        for row in new_returns.values:
+            if sample is not None:
+                count += 1
+                delta = row - mean
+                mean += delta / count
+                m2 += np.outer(delta, row - mean)
+            if ewma is not None:
+                ewma_update(ewma, row)
+        
+        if window is not None and len(self.returns) > window:
+            dropped = len(self.returns) - window
+            rows = len(self.returns)
+            for row in self.returns.values[:dropped]:
+                if ewma is not None:
+                    # وزن EWMA قدیمی‌ترین ردیف λ^(rows-1) است / oldest row carries weight λ^(rows-1)
+                    weight = ewma['decay'] ** (rows - 1)
+                    ewma['weight'] -= weight
+                    ewma['weighted_sum'] = ewma['weighted_sum'] - weight * row
+                    ewma['weighted_cross'] = ewma['weighted_cross'] - weight * np.outer(row, row)
+                    ewma['weight_sq'] -= weight ** 2
+                if sample is not None:
+                    count -= 1
+                    delta = row - mean
+                    mean -= delta / count
+                    m2 -= np.outer(delta, row - mean)
+                rows -= 1
+            self.returns = self.returns.iloc[dropped:]
+            # قیمت روز قبل از اولین بازده به عنوان مبنا نگه داشته می‌شود / keep the base price row
+            self.prices = self.prices.iloc[self.prices.index.get_loc(self.returns.index[0]) - 1:]
+        
+        if sample is not None:
+            self._moment_state = (count, mean, m2)
+        self._invalidate()
+    
     @property
     def weights(self):
         """Return profile weights as arrays aligned with self.assets.
@@ -78,6 +1353,38 @@ class PortfolioOptimizer:
             for profile, dist in self.profile_weights.items()
         }
     
+    def _extend_profiles(self):
+        """
+        گسترش وزن‌ها و محدودیت‌های پروفایل به همه دارایی‌های self.assets
+        Extend the profile tables (written for Gold, Silver, Bitcoin and
+        Ethereum) to the actual universe
+
+        Assets missing from a profile get (0, 1) bounds and a default
+        weight of 0; when the resulting weights are not feasible (e.g. some
+        of the four assets are absent) they are projected onto the
+        profile's constraints, or normalized when the bounds themselves
+        cannot be met.
+        """
+        for constraints in self.profile_constraints.values():
+            for asset in self.assets:
+                constraints.setdefault(asset, (0, 1))
+        
+        for risk_profile, weights_dict in self.profile_weights.items():
+            weights = np.array([weights_dict.get(asset, 0.0) for asset in self.assets], dtype=float)
+            lo, hi = np.array(self._profile_bounds(risk_profile), dtype=float).T
+            linear_constraints = self._profile_linear_constraints(risk_profile)
+            feasible = (abs(weights.sum() - 1) < 1e-9 and np.all(weights >= lo - 1e-12)
+                        and np.all(weights <= hi + 1e-12)
+                        and all(a @ weights <= b + 1e-12 for a, b, _ in linear_constraints))
+            if not feasible:
+                if lo.sum() <= 1 <= hi.sum():
+                    weights = _project_feasible(weights, lo, hi, linear_constraints)
+                elif weights.sum() > 0:
+                    weights = weights / weights.sum()
+                else:
+                    weights = np.full(self.n_assets, 1.0 / self.n_assets)
+            self.profile_weights[risk_profile] = dict(zip(self.assets, weights))
+    
     def get_profile_weights(self, risk_profile):
         """
         دریافت وزن‌های از پیش تعریف شده برای پروفایل ریسک
@@ -100,7 +1407,57 @@ class PortfolioOptimizer:
         else:
             raise ValueError(f"پروفایل {risk_profile} شناخته شده نیست.")
     
-    def portfolio_stats(self, weights, risk_free_rate=0.02):
+    def _portfolio_key(self, weights):
+        """
+        کلید کش سبد (وزن‌های گردشده) / Portfolio memo key: rounded weight tuple
+        """
+        return tuple(np.round(np.asarray(weights, dtype=float), 10))
+    
+    def _lookup_portfolio(self, key):
+        """
+        جستجو در کش LRU سبد و ثبت hit/miss
+        Look up a memoized portfolio entry, count the hit or miss and mark it
+        most recently used
+        """
+        value = self._portfolio_cache.pop(key, None)
+        if value is None:
+            self.portfolio_cache_stats['misses'] += 1
+        else:
+            self.portfolio_cache_stats['hits'] += 1
+            self._portfolio_cache[key] = value
+        return value
+    
+    def _store_portfolio(self, key, value):
+        """
+        ذخیره در کش؛ کم‌استفاده‌ترین مورد در صورت پر بودن حذف می‌شود
+        Store an entry, evicting the least recently used one when the memo is full
+        """
+        if key not in self._portfolio_cache and len(self._portfolio_cache) >= self.portfolio_cache_size:
+            self._portfolio_cache.pop(next(iter(self._portfolio_cache)))
+        self._portfolio_cache[key] = value
+    
+    def clear_portfolio_cache(self):
+        """
+        پاک‌کردن کش سبد و شمارنده‌ها
+        Clear memoized portfolio series/stats and reset the hit/miss counters
+        """
+        self._portfolio_cache.clear()
+        self.portfolio_cache_stats = {'hits': 0, 'misses': 0}
+    
+    def _portfolio_returns(self, weights):
+        """
+        سری بازده روزانه سبد (کش‌شده، فقط‌خواندنی)
+        Daily portfolio return series, memoized by weights and read-only
+        """
+        key = ('returns', self._portfolio_key(weights))
+        portfolio_returns = self._lookup_portfolio(key)
+        if portfolio_returns is None:
+            portfolio_returns = self._returns_array @ np.asarray(weights, dtype=float)
+            portfolio_returns.setflags(write=False)
+            self._store_portfolio(key, portfolio_returns)
+        return portfolio_returns
+    
+    def portfolio_stats(self, weights, risk_free_rate=0.02, use_cache=True):
         """
         محاسبه بازده و ریسک سبد
         Calculate portfolio return and risk
@@ -111,36 +1468,45 @@ class PortfolioOptimizer:
             وزن‌های سبد / Portfolio weights
         risk_free_rate : float
             نرخ بدون ریسک / Risk-free rate (default 2%)
+        use_cache : bool
+            استفاده از کش LRU سبد / Reuse memoized results for the same
+            (rounded) weights; optimizer objectives pass False
         
         بازگشت / Returns:
         --------
         dict : آمار سبد / Portfolio statistics
         """
+        if use_cache:
+            key = ('stats', self._portfolio_key(weights), risk_free_rate)
+            cached = self._lookup_portfolio(key)
+            if cached is not None:
+                return dict(cached, weights=weights)
+        
         # بازده مورد انتظار / Expected return
-        port_return = np.sum(self.mean_returns * weights)
+        port_return = self._mean_array @ weights
         
         # ریسک (انحراف معیار) / Risk (standard deviation)
-        port_volatility = np.sqrt(np.dot(weights.T, np.dot(self.cov_matrix, weights)))
+        port_volatility = np.sqrt(portfolio_variance(self._cov_array, weights))
         
         # نسبت شارپ / Sharpe ratio
         sharpe_ratio = (port_return - risk_free_rate) / port_volatility if port_volatility != 0 else 0
         
         # محاسبه Sortino Ratio / Calculate Sortino Ratio
-        portfolio_returns = self.returns.dot(weights)
+        portfolio_returns = self._portfolio_returns(weights) if use_cache else self._returns_array @ weights
         downside_returns = portfolio_returns[portfolio_returns < 0]
         downside_std = np.sqrt(np.mean(downside_returns**2)) * np.sqrt(252) if len(downside_returns) > 0 else port_volatility
         sortino_ratio = (port_return - risk_free_rate) / downside_std if downside_std != 0 else 0
         
         # محاسبه Maximum Drawdown / Calculate Maximum Drawdown
-        cumulative_returns = (1 + portfolio_returns).cumprod()
-        running_max = cumulative_returns.expanding().max()
+        cumulative_returns = np.cumprod(1 + portfolio_returns)
+        running_max = np.maximum.accumulate(cumulative_returns)
         drawdown = (cumulative_returns - running_max) / running_max
         max_drawdown = drawdown.min()
         
         # محاسبه Calmar Ratio / Calculate Calmar Ratio
         calmar_ratio = port_return / abs(max_drawdown) if max_drawdown != 0 else 0
         
-        return {
+        stats = {
             'return': port_return,
             'volatility': port_volatility,
             'sharpe_ratio': sharpe_ratio,
@@ -149,8 +1515,49 @@ class PortfolioOptimizer:
             'calmar_ratio': calmar_ratio,
             'weights': weights
         }
+        if use_cache:
+            self._store_portfolio(key, dict(stats))
+        return stats
+    
+    def _profile_bounds(self, risk_profile=None):
+        """
+        حدود وزن هر دارایی برای پروفایل ریسک
+        Per-asset weight bounds for a risk profile (0-60% without a profile)
+        """
+        if risk_profile and risk_profile in self.profile_constraints:
+            return tuple(self.profile_constraints[risk_profile].get(asset, (0, 1))
+                         for asset in self.assets)
+        return tuple((0, 0.6) for _ in range(self.n_assets))
     
-    def optimize_sharpe(self, risk_profile=None):
+    def _profile_linear_constraints(self, risk_profile=None):
+        """
+        قیدهای خطی اضافه پروفایل به شکل (a, b, 'ineq') یعنی a·w <= b
+        Extra linear constraints of a profile as (a, b, 'ineq'), i.e. a·w <= b
+        """
+        linear_constraints = []
+        # Bitcoin + Ethereum <= 0.25 (25%) for conservative
+        if risk_profile == 'Conservative' and 'Bitcoin' in self.assets and 'Ethereum' in self.assets:
+            a = np.zeros(self.n_assets)
+            a[self.assets.index('Bitcoin')] = 1
+            a[self.assets.index('Ethereum')] = 1
+            linear_constraints.append((a, 0.25, 'ineq'))
+        return linear_constraints
+    
+    def _solve_projected_gradient(self, objective, initial_weights, bounds, linear_constraints=()):
+        """
+        اجرای حل‌کننده گرادیان تصویری برای یک مسئله و بازگرداندن آمار سبد
+        Run the projected-gradient backend on a single problem
+        """
+        lo, hi = np.array(bounds, dtype=float).T
+        weights, info = solve_mean_variance_pg(
+            self._mean_array, self._cov_array, lo, hi,
+            objective=objective, x0=initial_weights,
+            linear_constraints=linear_constraints)
+        if not info['converged'][0]:
+            print(f"Optimization warning: projected gradient stopped after {info['iterations']} iterations")
+        return self.portfolio_stats(weights[0])
+    
+    def optimize_sharpe(self, risk_profile=None, solver='slsqp', n_starts=1, n_workers=None, seed=None):
         """
         بهینه‌سازی سبد برای بیشینه‌کردن نسبت شارپ با محدودیت‌های پروفایل ریسک
         Optimize portfolio to maximize Sharpe ratio with risk profile constraints
@@ -159,42 +1566,43 @@ class PortfolioOptimizer:
         -----------
         risk_profile : str or None
             'Conservative', 'Moderate', or 'Aggressive'
+        solver : str
+            'slsqp' (default) or 'projected_gradient' for large universes
+        n_starts : int
+            تعداد نقاط شروع / Number of starts; above 1 the profile weights
+            are joined by random feasible portfolios (see _optimize_sharpe_multistart)
+        n_workers : int or None
+            تعداد پردازش‌ها برای SLSQP چندشروعی (None = تعداد هسته‌ها، 1 = بدون pool) /
+            Worker processes for multi-start SLSQP (None = CPU count, 1 = in-process)
+        seed : int or None
+            بذر تصادفی نقاط شروع / Random seed of the starts
         
         بازگشت / Returns:
         --------
-        dict : سبد بهینه / Optimal portfolio
+        dict : سبد بهینه / Optimal portfolio; with n_starts > 1 also
+            'multistart' convergence diagnostics
         """
+        if solver not in ('slsqp', 'projected_gradient'):
+            raise ValueError("solver باید 'slsqp' یا 'projected_gradient' باشد.")
+        if n_starts < 1:
+            raise ValueError("n_starts باید حداقل 1 باشد.")
+        
         # تابع منفی شارپ (چون minimize می‌کنیم)
         def negative_sharpe(weights):
-            stats = self.portfolio_stats(weights)
+            stats = self.portfolio_stats(weights, use_cache=False)
             return -stats['sharpe_ratio']
         
         # محدودیت‌ها: مجموع وزن‌ها = 1
         constraints = [{'type': 'eq', 'fun': lambda x: np.sum(x) - 1}]
         
         # FIXED: Apply risk profile specific bounds
-        if risk_profile and risk_profile in self.profile_constraints:
-            bounds = []
-            for asset in self.assets:
-                if asset in self.profile_constraints[risk_profile]:
-                    bounds.append(self.profile_constraints[risk_profile][asset])
-                else:
-                    bounds.append((0, 1))
-            bounds = tuple(bounds)
-            
-            # Additional constraint: crypto max allocation for conservative
-            if risk_profile == 'Conservative':
-                # Bitcoin + Ethereum <= 0.25 (25%)
-                btc_idx = self.assets.index('Bitcoin') if 'Bitcoin' in self.assets else None
-                eth_idx = self.assets.index('Ethereum') if 'Ethereum' in self.assets else None
-                if btc_idx is not None and eth_idx is not None:
-                    constraints.append({
-                        'type': 'ineq',
-                        'fun': lambda x: 0.25 - (x[btc_idx] + x[eth_idx])
-                    })
-        else:
-            # حدود وزن‌ها: بین ۰ تا ۰.۶ (max 60% per asset for diversification)
-            bounds = tuple((0, 0.6) for _ in range(self.n_assets))
+        # حدود وزن‌ها بدون پروفایل: بین ۰ تا ۰.۶ (max 60% per asset for diversification)
+        bounds = self._profile_bounds(risk_profile)
+        
+        # Additional constraint: crypto max allocation for conservative
+        linear_constraints = self._profile_linear_constraints(risk_profile)
+        for a, b, _ in linear_constraints:
+            constraints.append({'type': 'ineq', 'fun': lambda x, a=a, b=b: b - np.dot(a, x)})
         
         # وزن اولیه
         if risk_profile and risk_profile in self.profile_weights:
@@ -204,6 +1612,12 @@ class PortfolioOptimizer:
         
         # بهینه‌سازی
         try:
+            if n_starts > 1:
+                return self._optimize_sharpe_multistart(initial_weights, bounds, linear_constraints,
+                                                        solver, n_starts, n_workers, seed)
+            if solver == 'projected_gradient':
+                return self._solve_projected_gradient('sharpe', initial_weights, bounds, linear_constraints)
+            
             result = minimize(negative_sharpe, initial_weights,
                             method='SLSQP', bounds=bounds,
                             constraints=constraints,
@@ -220,7 +1634,77 @@ class PortfolioOptimizer:
             print(f"Optimization error: {e}")
             return self.portfolio_stats(initial_weights)
     
-    def minimize_volatility(self, target_return=None, risk_profile=None):
+    def _optimize_sharpe_multistart(self, initial_weights, bounds, linear_constraints, solver,
+                                    n_starts, n_workers=None, seed=None):
+        """
+        جست‌وجوی سراسری شارپ از چند نقطه شروع تصادفی شدنی
+        Multi-start search for the Sharpe optimum
+
+        The starts are the profile weights plus n_starts - 1 Dirichlet draws
+        projected onto the feasible set in one batched call.  SLSQP starts
+        are split into one chunk per worker process; projected-gradient
+        starts are solved together as one batched problem.
+
+        بازگشت / Returns:
+        --------
+        dict : بهترین سبد / Best portfolio plus 'multistart': n_starts,
+            n_converged, best_start, hit_rate (converged starts within 1e-6
+            of the best Sharpe), n_distinct_optima (converged weights more
+            than 1e-3 apart), sharpe and iterations per start
+        """
+        lo, hi = np.array(bounds, dtype=float).T
+        rng = np.random.default_rng(seed)
+        random_starts = _project_feasible(rng.dirichlet(np.ones(self.n_assets), n_starts - 1),
+                                          lo, hi, linear_constraints)
+        starts = np.vstack([initial_weights, random_starts])
+        
+        if solver == 'projected_gradient':
+            weights, info = solve_mean_variance_pg(
+                self._mean_array, self._cov_array, lo, hi, objective='sharpe',
+                x0=starts, linear_constraints=linear_constraints)
+            sharpe, success = info['objective'], info['converged']
+            iterations = np.full(n_starts, info['iterations'])
+        else:
+            if n_workers is None:
+                n_workers = os.cpu_count() or 1
+            n_workers = max(1, min(n_workers, n_starts))
+            args = [(self._mean_array, self._cov_array, lo, hi, linear_constraints, starts[chunk])
+                    for chunk in np.array_split(np.arange(n_starts), n_workers)]
+            if n_workers == 1:
+                results = [_sharpe_slsqp_starts(*args[0])]
+            else:
+                with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                    futures = [executor.submit(_sharpe_slsqp_starts, *a) for a in args]
+                    results = [future.result() for future in futures]
+            weights, sharpe, success, iterations = (np.concatenate(parts) for parts in zip(*results))
+        
+        if not success.any():
+            # Fallback to profile weights if optimization fails
+            print(f"Optimization warning: none of the {n_starts} starts converged")
+            stats = self.portfolio_stats(initial_weights)
+            best = 0
+        else:
+            best = int(np.flatnonzero(success)[np.argmax(sharpe[success])])
+            stats = self.portfolio_stats(weights[best])
+        
+        # بهینه‌های متمایز: نقاط همگرا با فاصله بیش از 1e-3 / optima further than 1e-3 apart
+        distinct = []
+        for w in weights[success]:
+            if all(np.max(np.abs(w - d)) > 1e-3 for d in distinct):
+                distinct.append(w)
+        at_best = success & (sharpe >= sharpe[best] - 1e-6)
+        stats['multistart'] = {
+            'n_starts': n_starts,
+            'n_converged': int(success.sum()),
+            'best_start': best,
+            'hit_rate': float(at_best.sum() / max(success.sum(), 1)),
+            'n_distinct_optima': len(distinct),
+            'sharpe': sharpe,
+            'iterations': iterations
+        }
+        return stats
+    
+    def minimize_volatility(self, target_return=None, risk_profile=None, solver='slsqp'):
         """
         بهینه‌سازی سبد برای کمینه‌کردن ریسک
         Optimize portfolio to minimize risk
@@ -231,59 +1715,457 @@ class PortfolioOptimizer:
             بازده هدف / Target return
         risk_profile : str or None
             پروفایل ریسک / Risk profile
+        solver : str
+            'slsqp' (default) or 'projected_gradient' for large universes
+        
+        بازگشت / Returns:
+        --------
+        dict : سبد بهینه / Optimal portfolio
+        """
+        if solver not in ('slsqp', 'projected_gradient'):
+            raise ValueError("solver باید 'slsqp' یا 'projected_gradient' باشد.")
+        
+        # تابع نوسان برای مینیمم‌سازی
+        def portfolio_volatility(weights):
+            return np.sqrt(portfolio_variance(self._cov_array, weights))
+        
+        # محدودیت‌ها
+        constraints = [{'type': 'eq', 'fun': lambda x: np.sum(x) - 1}]
+        
+        # اگر بازده هدف مشخص شده
+        if target_return is not None:
+            constraints.append({
+                'type': 'eq',
+                'fun': lambda x: self._mean_array @ x - target_return
+            })
+        
+        # تعیین حدود بر اساس پروفایل ریسک
+        bounds = self._profile_bounds(risk_profile)
+        
+        # وزن اولیه
+        if risk_profile and risk_profile in self.profile_weights:
+            initial_weights = self.get_profile_weights(risk_profile)
+        else:
+            initial_weights = np.array([1/self.n_assets] * self.n_assets)
+        
+        # بهینه‌سازی
+        try:
+            if solver == 'projected_gradient':
+                linear_constraints = []
+                if target_return is not None:
+                    linear_constraints.append((self._mean_array, target_return, 'eq'))
+                return self._solve_projected_gradient('volatility', initial_weights, bounds, linear_constraints)
+            
+            result = minimize(portfolio_volatility, initial_weights,
+                            method='SLSQP', bounds=bounds,
+                            constraints=constraints,
+                            options={'maxiter': 1000})
+            
+            if result.success:
+                optimal_weights = result.x
+                return self.portfolio_stats(optimal_weights)
+            else:
+                return self.portfolio_stats(initial_weights)
+        except Exception as e:
+            print(f"Volatility optimization error: {e}")
+            return self.portfolio_stats(initial_weights)
+
+    def optimize_risk_parity(self, risk_profile=None, budgets=None):
+        """
+        سبد برابری ریسک (سهم برابر هر دارایی از ریسک کل) با محدودیت‌های پروفایل
+        Equal-risk-contribution (or risk-budget) portfolio within the profile constraints
+        
+        پارامترها / Parameters:
+        -----------
+        risk_profile : str or None
+            'Conservative', 'Moderate', or 'Aggressive'
+        budgets : dict, np.array or None
+            بودجه ریسک هر دارایی / Risk budget per asset (default equal)
+        
+        بازگشت / Returns:
+        --------
+        dict : سبد بهینه / Optimal portfolio, plus 'risk_contributions'
+            (fraction of portfolio variance per asset)
+        """
+        if isinstance(budgets, dict):
+            budgets = np.array([budgets.get(asset, 0.0) for asset in self.assets])
+        lo, hi = np.array(self._profile_bounds(risk_profile), dtype=float).T
+        weights, info = solve_risk_parity(
+            self._cov_array, budgets, lo, hi, self._profile_linear_constraints(risk_profile))
+        if not info['converged']:
+            print(f"Optimization warning: risk parity stopped after "
+                  f"{info['iterations']} Newton / {info['pg_iterations']} projected-gradient iterations")
+        
+        stats = self.portfolio_stats(weights)
+        contributions = weights * covariance_product(self._cov_array, weights)
+        stats['risk_contributions'] = contributions / contributions.sum()
+        return stats
+    
+    def optimize_hrp(self, risk_profile=None, linkage_method='single'):
+        """
+        تخصیص HRP با اعمال محدودیت‌های پروفایل پس از تخصیص
+        Hierarchical Risk Parity allocation; profile bounds are applied afterwards
+        
+        HRP weights come from clustering and recursive bisection, without
+        inverting the covariance, so the allocation stays stable for large
+        universes.  The result is then projected (Euclidean) onto the
+        profile's bounds and linear constraints.
+        
+        پارامترها / Parameters:
+        -----------
+        risk_profile : str or None
+            'Conservative', 'Moderate', or 'Aggressive'
+        linkage_method : str
+            روش خوشه‌بندی / scipy linkage method (default 'single')
+        
+        بازگشت / Returns:
+        --------
+        dict : سبد / Portfolio statistics, plus 'hrp_weights' (before the
+            profile constraints) and 'cluster_order' (asset names)
+        """
+        raw_weights, order = hrp_weights(self._cov_array, self.correlation_matrix.values, linkage_method)
+        lo, hi = np.array(self._profile_bounds(risk_profile), dtype=float).T
+        weights = _project_feasible(raw_weights, lo, hi, self._profile_linear_constraints(risk_profile))
+        
+        stats = self.portfolio_stats(weights)
+        stats['hrp_weights'] = raw_weights
+        stats['cluster_order'] = [self.assets[i] for i in order]
+        return stats
+    
+    def optimize_cvar(self, risk_profile=None, alpha=0.95, scenarios='monte_carlo',
+                      target_return=None, n_scenarios=10000, seed=None):
+        """
+        بهینه‌سازی سبد برای کمینه‌کردن CVaR (همان معیار گزارش‌شده cvar_95)
+        Minimize scenario CVaR (the reported cvar_95) within the profile constraints
+        
+        پارامترها / Parameters:
+        -----------
+        risk_profile : str or None
+            'Conservative', 'Moderate', or 'Aggressive'
+        alpha : float
+            سطح اطمینان / Confidence level (default 0.95)
+        scenarios : str or np.array
+            'monte_carlo' (1-year growth from the simulation engine, as in
+            cvar_95), 'historical' (daily returns) or an (S, n) array of
+            scenario returns
+        target_return : float or None
+            حداقل بازده سالانه مورد انتظار / Minimum annualized expected return
+        n_scenarios : int
+            تعداد سناریوهای مونت‌کارلو / Number of Monte Carlo scenarios
+        seed : int or None
+            بذر تصادفی / Random seed of the simulated scenarios
+        
+        بازگشت / Returns:
+        --------
+        dict : سبد بهینه / Optimal portfolio, plus 'cvar' and 'var' (loss as a
+            fraction of the investment over the scenario horizon) and 'n_scenarios'
+        """
+        if isinstance(scenarios, str):
+            if scenarios == 'monte_carlo':
+                scenario_returns = self._simulate_growth(years=1, n_simulations=n_scenarios, seed=seed) - 1
+            elif scenarios == 'historical':
+                scenario_returns = self._returns_array
+            else:
+                raise ValueError("scenarios باید 'monte_carlo'، 'historical' یا آرایه سناریو باشد.")
+        else:
+            scenario_returns = np.asarray(scenarios, dtype=float)
+        
+        lo, hi = np.array(self._profile_bounds(risk_profile), dtype=float).T
+        weights, info = solve_cvar_lp(
+            scenario_returns, alpha, lo, hi, self._profile_linear_constraints(risk_profile),
+            self._mean_array, target_return)
+        if weights is None:
+            # Fallback to profile weights if optimization fails
+            print(f"Optimization warning: {info['message']}")
+            if risk_profile and risk_profile in self.profile_weights:
+                weights = self.get_profile_weights(risk_profile)
+            else:
+                weights = np.array([1/self.n_assets] * self.n_assets)
+        
+        stats = self.portfolio_stats(weights)
+        stats.update({'cvar': info['cvar'], 'var': info['var'], 'n_scenarios': len(scenario_returns)})
+        return stats
+    
+    def optimize_cdar(self, risk_profile=None, alpha=0.95, max_cdar=None):
+        """
+        بیشینه‌سازی بازده با سقف افت سرمایه شرطی (CDaR) روی مسیر تاریخی
+        Maximize expected return subject to a Conditional Drawdown-at-Risk limit
+        
+        پارامترها / Parameters:
+        -----------
+        risk_profile : str or None
+            'Conservative', 'Moderate', or 'Aggressive'
+        alpha : float
+            سطح اطمینان / Confidence level (0.95 -> mean of the worst 5% drawdowns)
+        max_cdar : float or None
+            سقف CDaR / CDaR limit as a fraction of the investment (default:
+            the profile's 'max_cdar'; without either, CDaR is minimized)
         
         بازگشت / Returns:
         --------
-        dict : سبد بهینه / Optimal portfolio
+        dict : سبد بهینه / Optimal portfolio, plus 'cdar', 'cdar_limit' and
+            'cdar_max_drawdown' of the uncompounded historical path
+        """
+        if max_cdar is None and risk_profile in self.profile_constraints:
+            max_cdar = self.profile_constraints[risk_profile].get('max_cdar')
+        
+        lo, hi = np.array(self._profile_bounds(risk_profile), dtype=float).T
+        linear_constraints = self._profile_linear_constraints(risk_profile)
+        weights, info = solve_cdar_lp(self._returns_array, self._mean_array, max_cdar, alpha,
+                                      lo, hi, linear_constraints)
+        if weights is None and max_cdar is not None:
+            # سقف دست‌نیافتنی: کمترین CDaR ممکن / unreachable limit: use the minimum-CDaR portfolio
+            print(f"Optimization warning: {info['message']}, using the minimum-CDaR portfolio")
+            weights, info = solve_cdar_lp(self._returns_array, None, None, alpha, lo, hi, linear_constraints)
+        if weights is None:
+            # Fallback to profile weights if optimization fails
+            print(f"Optimization warning: {info['message']}")
+            if risk_profile and risk_profile in self.profile_weights:
+                weights = self.get_profile_weights(risk_profile)
+            else:
+                weights = np.array([1/self.n_assets] * self.n_assets)
+            drawdowns = _path_drawdowns(self._returns_array @ weights)
+            info = {'cdar': _conditional_drawdown(drawdowns, alpha), 'max_drawdown': drawdowns.max()}
+        
+        stats = self.portfolio_stats(weights)
+        stats.update({'cdar': info['cdar'], 'cdar_limit': max_cdar,
+                      'cdar_max_drawdown': info['max_drawdown']})
+        return stats
+    
+    def _batch_portfolio_stats(self, weights_matrix, risk_free_rate=0.02):
+        """
+        محاسبه برداری آمار سبد برای چند سبد به‌طور همزمان
+        Vectorized portfolio_stats for many portfolios at once
+
+        Same definitions as portfolio_stats, but every metric is computed for
+        all rows of ``weights_matrix`` with one (T, n) @ (n, m) product.
+
+        بازگشت / Returns:
+        --------
+        dict : آرایه هر معیار / One array of length m per metric
+        """
+        W = np.atleast_2d(np.asarray(weights_matrix, dtype=float))
+        port_return = W @ self._mean_array
+        port_volatility = np.sqrt(portfolio_variance(self._cov_array, W))
+        return {
+            'return': port_return,
+            'volatility': port_volatility,
+            **self._path_metrics(self._returns_array @ W.T, port_return, port_volatility, risk_free_rate),
+            'weights': W
+        }
+
+    @staticmethod
+    def _path_metrics(portfolio_returns, port_return, port_volatility, risk_free_rate=0.02):
+        """
+        معیارهای وابسته به مسیر برای هر ستون سری بازده
+        Sharpe, Sortino, maximum drawdown and Calmar for every column of a
+        (T, m) matrix of daily portfolio returns, given each column's
+        annualized return and volatility
+        """
+        safe_volatility = np.where(port_volatility != 0, port_volatility, 1)
+        sharpe_ratio = np.where(port_volatility != 0, (port_return - risk_free_rate) / safe_volatility, 0)
+
+        # Sortino
+        negative = np.minimum(portfolio_returns, 0)
+        n_negative = (portfolio_returns < 0).sum(axis=0)
+        downside_std = np.where(
+            n_negative > 0,
+            np.sqrt((negative ** 2).sum(axis=0) / np.maximum(n_negative, 1)) * np.sqrt(252),
+            port_volatility
+        )
+        safe_downside = np.where(downside_std != 0, downside_std, 1)
+        sortino_ratio = np.where(downside_std != 0, (port_return - risk_free_rate) / safe_downside, 0)
+
+        # Maximum Drawdown و Calmar
+        cumulative_returns = np.cumprod(1 + portfolio_returns, axis=0)
+        running_max = np.maximum.accumulate(cumulative_returns, axis=0)
+        max_drawdown = ((cumulative_returns - running_max) / running_max).min(axis=0)
+        safe_drawdown = np.where(max_drawdown != 0, np.abs(max_drawdown), 1)
+        calmar_ratio = np.where(max_drawdown != 0, port_return / safe_drawdown, 0)
+
+        return {
+            'sharpe_ratio': sharpe_ratio,
+            'sortino_ratio': sortino_ratio,
+            'max_drawdown': max_drawdown,
+            'calmar_ratio': calmar_ratio
+        }
+
+    def _bootstrap_metrics(self, portfolio_returns, n_bootstrap=2000, block_size=1, seed=None,
+                           risk_free_rate=0.02):
+        """
+        بوت‌استرپ برداری معیارهای سبد / Vectorized bootstrap of the portfolio metrics
+
+        One (T, n_bootstrap) index matrix of resampled rows (circular blocks
+        of ``block_size`` days) is shared by every column of
+        ``portfolio_returns`` (T, m); all replicates then go through
+        _path_metrics in a single call, with the return and volatility
+        re-estimated from each replicate.
+
+        بازگشت / Returns:
+        --------
+        dict : آرایه (n_bootstrap, m) برای هر معیار / One (n_bootstrap, m) array per metric
+        """
+        portfolio_returns = np.asarray(portfolio_returns, dtype=float).reshape(len(portfolio_returns), -1)
+        T, m = portfolio_returns.shape
+        rng = np.random.default_rng(seed)
+        n_blocks = -(-T // block_size)
+        starts = rng.integers(0, T, size=(n_blocks, 1, n_bootstrap))
+        rows = ((starts + np.arange(block_size)[:, None]) % T).reshape(-1, n_bootstrap)[:T]
+
+        sampled = portfolio_returns[rows].reshape(T, n_bootstrap * m)
+        metrics = self._sample_metrics(sampled, risk_free_rate)
+        return {key: values.reshape(n_bootstrap, m) for key, values in metrics.items()}
+
+    def _sample_metrics(self, portfolio_returns, risk_free_rate=0.02):
+        """
+        معیارهای سبد با گشتاورهای نمونه‌ای هر ستون
+        Metrics of every column of a (T, k) return matrix, with the annualized
+        return and volatility estimated from the column itself
+        """
+        port_return = portfolio_returns.mean(axis=0) * 252
+        port_volatility = portfolio_returns.std(axis=0, ddof=1) * np.sqrt(252)
+        return {
+            'return': port_return,
+            'volatility': port_volatility,
+            **self._path_metrics(portfolio_returns, port_return, port_volatility, risk_free_rate)
+        }
+
+    def _bootstrap_intervals(self, portfolio_returns, estimates, n_bootstrap=2000, confidence=0.95,
+                             block_size=1, seed=None, risk_free_rate=0.02):
+        """
+        فواصل اطمینان بوت‌استرپ حول برآورد گزارش‌شده
+        Percentile intervals for every column of ``portfolio_returns`` (T, m),
+        centred on ``estimates`` ({metric: array of length m})
+
+        The replicates re-estimate sample moments, while the reported
+        estimates come from the optimizer's estimator (EWMA, factor
+        covariance, ...).  Each interval is shifted by the gap between the
+        estimate and the same sample statistic of the original series, so
+        interval and estimate come from one estimator; with the default
+        sample estimator the shift is zero.
+
+        بازگشت / Returns:
+        --------
+        dict : {معیار: (lower, upper, std_error)} / {metric: (lower, upper,
+            std_error)}, each an array of length m
+        """
+        portfolio_returns = np.asarray(portfolio_returns, dtype=float).reshape(len(portfolio_returns), -1)
+        replicates = self._bootstrap_metrics(portfolio_returns, n_bootstrap, block_size, seed, risk_free_rate)
+        observed = self._sample_metrics(portfolio_returns, risk_free_rate)
+        tail = (1 - confidence) / 2 * 100
+        intervals = {}
+        for key, values in replicates.items():
+            shift = np.asarray(estimates[key], dtype=float) - observed[key]
+            lower, upper = np.percentile(values, [tail, 100 - tail], axis=0) + shift
+            intervals[key] = (lower, upper, values.std(axis=0, ddof=1))
+        return intervals
+
+    def bootstrap_stats(self, weights, n_bootstrap=2000, confidence=0.95, block_size=1, seed=None,
+                        risk_free_rate=0.02):
+        """
+        فاصله اطمینان بوت‌استرپ برای همه معیارهای portfolio_stats
+        Bootstrap confidence intervals for every metric of portfolio_stats
+
+        The daily return rows are resampled with replacement (in circular
+        blocks when ``block_size`` > 1, which keeps the autocorrelation the
+        drawdown depends on); each replicate's annualized return and
+        volatility are the sample estimates of the resampled series, and the
+        intervals are centred on the portfolio_stats estimate (see
+        _bootstrap_intervals).
+
+        پارامترها / Parameters:
+        -----------
+        weights : np.array
+            وزن‌های سبد / Portfolio weights
+        n_bootstrap : int
+            تعداد تکرارها / Number of bootstrap replicates
+        confidence : float
+            سطح اطمینان / Confidence level of the percentile intervals
+        block_size : int
+            طول بلوک (روز) / Block length in days (1 = iid bootstrap)
+        seed : int or None
+            بذر تصادفی / Random seed
+
+        بازگشت / Returns:
+        --------
+        DataFrame : ستون‌های estimate, lower, upper, std_error برای هر معیار /
+            estimate (portfolio_stats), lower, upper and std_error per metric
+        """
+        if n_bootstrap < 2 or block_size < 1 or not 0 < confidence < 1:
+            raise ValueError("n_bootstrap باید حداقل 2، block_size حداقل 1 و confidence بین 0 و 1 باشد.")
+        weights = np.asarray(weights, dtype=float)
+        estimate = self.portfolio_stats(weights, risk_free_rate)
+        intervals = self._bootstrap_intervals(self._portfolio_returns(weights), estimate, n_bootstrap,
+                                              confidence, block_size, seed, risk_free_rate)
+        rows = {}
+        for key, (lower, upper, std_error) in intervals.items():
+            rows[key] = {'estimate': estimate[key], 'lower': lower[0], 'upper': upper[0],
+                         'std_error': std_error[0]}
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+    def optimize_batch(self, constraint_sets, objective='sharpe'):
+        """
+        بهینه‌سازی دسته‌ای برای چند مشتری با حدود وزن متفاوت
+        Solve many mean-variance problems against the shared mean_returns/cov_matrix
+
+        All problems are stacked into (m, n) bound matrices and solved together
+        by the batched projected-gradient solver; problems are only split into
+        groups when they carry different extra linear constraints (e.g. the
+        Conservative crypto cap).  Statistics are then computed in one
+        vectorized pass.
+
+        پارامترها / Parameters:
+        -----------
+        constraint_sets : list
+            هر عضو نام یک پروفایل ریسک یا دیکشنری {دارایی: (min, max)} است /
+            Each item is a risk profile name or a {asset: (min, max)} dict;
+            assets missing from a dict are bounded by (0, 1)
+        objective : str
+            'sharpe' (maximize Sharpe) or 'volatility' (minimize volatility)
+
+        بازگشت / Returns:
+        --------
+        list : یک دیکشنری آمار سبد برای هر مسئله / One portfolio_stats-style
+            dict per problem, plus a 'converged' flag
         """
-        # تابع نوسان برای مینیمم‌سازی
-        def portfolio_volatility(weights):
-            return np.sqrt(np.dot(weights.T, np.dot(self.cov_matrix, weights)))
-        
-        # محدودیت‌ها
-        constraints = [{'type': 'eq', 'fun': lambda x: np.sum(x) - 1}]
-        
-        # اگر بازده هدف مشخص شده
-        if target_return is not None:
-            constraints.append({
-                'type': 'eq',
-                'fun': lambda x: np.sum(self.mean_returns * x) - target_return
-            })
-        
-        # تعیین حدود بر اساس پروفایل ریسک
-        if risk_profile and risk_profile in self.profile_constraints:
-            bounds = []
-            for asset in self.assets:
-                if asset in self.profile_constraints[risk_profile]:
-                    bounds.append(self.profile_constraints[risk_profile][asset])
-                else:
-                    bounds.append((0, 1))
-            bounds = tuple(bounds)
-        else:
-            bounds = tuple((0, 0.6) for _ in range(self.n_assets))
-        
-        # وزن اولیه
-        if risk_profile and risk_profile in self.profile_weights:
-            initial_weights = self.get_profile_weights(risk_profile)
-        else:
-            initial_weights = np.array([1/self.n_assets] * self.n_assets)
-        
-        # بهینه‌سازی
-        try:
-            result = minimize(portfolio_volatility, initial_weights,
-                            method='SLSQP', bounds=bounds,
-                            constraints=constraints,
-                            options={'maxiter': 1000})
-            
-            if result.success:
-                optimal_weights = result.x
-                return self.portfolio_stats(optimal_weights)
+        if objective not in ('sharpe', 'volatility'):
+            raise ValueError("objective باید 'sharpe' یا 'volatility' باشد.")
+
+        m = len(constraint_sets)
+        lo = np.zeros((m, self.n_assets))
+        hi = np.ones((m, self.n_assets))
+        x0 = np.full((m, self.n_assets), 1.0 / self.n_assets)
+        groups = {}
+        for i, constraint_set in enumerate(constraint_sets):
+            if isinstance(constraint_set, str):
+                if constraint_set not in self.profile_constraints:
+                    raise ValueError(f"پروفایل {constraint_set} شناخته شده نیست.")
+                bounds = self._profile_bounds(constraint_set)
+                x0[i] = self.get_profile_weights(constraint_set)
+                group_key = constraint_set if self._profile_linear_constraints(constraint_set) else None
             else:
-                return self.portfolio_stats(initial_weights)
-        except Exception as e:
-            print(f"Volatility optimization error: {e}")
-            return self.portfolio_stats(initial_weights)
-    
+                bounds = [constraint_set.get(asset, (0, 1)) for asset in self.assets]
+                group_key = None
+            lo[i], hi[i] = np.array(bounds, dtype=float).T
+            groups.setdefault(group_key, []).append(i)
+
+        weights = np.empty((m, self.n_assets))
+        converged = np.zeros(m, dtype=bool)
+        for group_key, rows in groups.items():
+            rows = np.array(rows)
+            solved, info = solve_mean_variance_pg(
+                self._mean_array, self._cov_array, lo[rows], hi[rows],
+                objective=objective, x0=x0[rows],
+                linear_constraints=self._profile_linear_constraints(group_key))
+            weights[rows] = solved
+            converged[rows] = info['converged']
+
+        stats = self._batch_portfolio_stats(weights)
+        return [
+            {**{key: values[i] for key, values in stats.items()}, 'converged': bool(converged[i])}
+            for i in range(m)
+        ]
+
     def efficient_frontier(self, n_portfolios=100):
         """
         تولید مرز کارا
@@ -308,7 +2190,7 @@ class PortfolioOptimizer:
             weights = np.random.random(self.n_assets)
             weights /= np.sum(weights)
             
-            stats = self.portfolio_stats(weights)
+            stats = self.portfolio_stats(weights, use_cache=False)
             
             returns.append(stats['return'])
             volatilities.append(stats['volatility'])
@@ -317,56 +2199,138 @@ class PortfolioOptimizer:
         
         return np.array(returns), np.array(volatilities), np.array(all_weights), np.array(sharpe_ratios)
     
-    def monte_carlo_simulation(self, weights, initial_investment, years=1, n_simulations=10000):
+    def resampled_frontier(self, n_resamples=100, n_points=20, risk_profile=None, n_workers=None, seed=None):
         """
-        شبیه‌سازی مونت‌کارلو برای پیش‌بینی ارزش آینده سبد
-        Monte Carlo simulation for portfolio value prediction
+        مرز کارای بازنمونه‌گیری‌شده (میشو)
+        Resampled (Michaud) efficient frontier
+        
+        Each resample bootstraps the rows of the return history,
+        re-estimates the sample mean and covariance and solves the
+        constrained frontier at n_points evenly spaced target returns; the
+        frontiers are averaged point by point (by rank).  The resamples
+        are split into one chunk per worker process, and the workers read
+        the returns matrix from shared memory instead of receiving a copy.
         
         پارامترها / Parameters:
         -----------
-        weights : np.array
-            وزن‌های سبد / Portfolio weights
-        initial_investment : float
-            سرمایه اولیه (تومان) / Initial investment
-        years : int
-            افق زمانی (سال) / Time horizon (years)
-        n_simulations : int
-            تعداد شبیه‌سازی‌ها / Number of simulations (FIXED: 10,000)
+        n_resamples : int
+            تعداد نمونه‌های بوت‌استرپ / Number of bootstrap resamples
+        n_points : int
+            تعداد نقاط مرز / Points per frontier
+        risk_profile : str or None
+            'Conservative', 'Moderate', or 'Aggressive'
+        n_workers : int or None
+            تعداد پردازش‌ها (None = تعداد هسته‌ها، 1 = بدون pool) /
+            Worker processes (None = CPU count, 1 = in-process)
+        seed : int or None
+            بذر تصادفی / Random seed
         
         بازگشت / Returns:
         --------
-        dict : نتایج شبیه‌سازی / Simulation results
+        dict : 'weights' و 'weights_std' (n_points, n)، 'returns',
+            'volatilities' و 'sharpe_ratios' of the averaged portfolios under
+            the full-sample estimates, and 'max_sharpe' (portfolio_stats of
+            the frontier point with the highest Sharpe ratio)
         """
-        days = years * 252  # روزهای کاری / Trading days
-        last_prices = self.prices.iloc[-1].values
-        
-        # محاسبه تعداد سهم هر دارایی
-        shares = (weights * initial_investment) / last_prices
-        
-        results = []
-        
-        for _ in range(n_simulations):
-            # شبیه‌سازی مسیر قیمت با Geometric Brownian Motion
-            simulated_prices = last_prices.copy()
-            
+        if n_resamples < 1 or n_points < 2:
+            raise ValueError("n_resamples باید حداقل 1 و n_points حداقل 2 باشد.")
+        lo, hi = np.array(self._profile_bounds(risk_profile), dtype=float).T
+        linear_constraints = self._profile_linear_constraints(risk_profile)
+        seeds = np.random.SeedSequence(seed).spawn(n_resamples)
+        
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_workers = max(1, min(n_workers, n_resamples))
+        if n_workers == 1:
+            resampled = _frontier_resamples(self._returns_array, seeds, lo, hi, linear_constraints, n_points)
+        else:
+            returns = self._returns_array
+            shm = shared_memory.SharedMemory(create=True, size=returns.nbytes)
+            try:
+                np.ndarray(returns.shape, dtype=np.float64, buffer=shm.buf)[:] = returns
+                with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                    futures = [
+                        executor.submit(_frontier_resamples_shared, shm.name, returns.shape,
+                                        [seeds[i] for i in chunk], lo, hi, linear_constraints, n_points)
+                        for chunk in np.array_split(np.arange(n_resamples), n_workers)
+                    ]
+                    resampled = np.concatenate([future.result() for future in futures])
+            finally:
+                shm.close()
+                shm.unlink()
+        
+        weights = resampled.mean(axis=0)
+        stats = self._batch_portfolio_stats(weights)
+        best = int(np.argmax(stats['sharpe_ratio']))
+        return {
+            'weights': weights,
+            'weights_std': resampled.std(axis=0),
+            'returns': stats['return'],
+            'volatilities': stats['volatility'],
+            'sharpe_ratios': stats['sharpe_ratio'],
+            'max_sharpe': self.portfolio_stats(weights[best])
+        }
+    
+    def _simulate_growth(self, years=1, n_simulations=10000, seed=None, engine='vectorized'):
+        """
+        شبیه‌سازی ضریب رشد قیمت هر دارایی در افق زمانی
+        Simulate each asset's gross price growth over the horizon
+
+        Daily returns are drawn from N(μ/252, Σ/252) and compounded, as in
+        the original model.  Portfolio values are linear in the result, so
+        one draw serves any number of weight vectors.  Dense shocks reuse the
+        Cholesky factor computed once on the optimizer; a FactorCovariance
+        draws shocks from its factors in O(N·K) per path and day.
+
+        پارامترها / Parameters:
+        -----------
+        seed : int or None
+            بذر تصادفی / Random seed; equal seeds give common random numbers
+        engine : str
+            'vectorized' (all paths per trading day at once) or 'loop'
+            (one path at a time, the original reference implementation)
+
+        بازگشت / Returns:
+        --------
+        np.array : (n_simulations, n_assets) simulated price / last price
+        """
+        days = int(round(years * 252))  # روزهای کاری / Trading days
+        rng = np.random.default_rng(seed)
+        daily_mean = self._mean_array / 252  # بازده روزانه
+
+        if isinstance(self._cov_array, FactorCovariance):
+            # شوک‌های عاملی O(N·K) بدون تجزیه ماتریس / factor shocks, no matrix factorization
+            daily_cov = self._cov_array.scaled(1 / 252)
+
+            def draw(size):
+                return daily_mean + daily_cov.sample(rng, size)
+        else:
+            daily_cholesky = self.cholesky_factor / np.sqrt(252)  # عامل چولسکی روزانه / daily Cholesky factor
+
+            def draw(size):
+                return daily_mean + rng.standard_normal((size, self.n_assets)) @ daily_cholesky.T
+
+        if engine == 'vectorized':
+            growth = np.ones((n_simulations, self.n_assets))
             for day in range(days):
-                # تولید بازده تصادفی با توزیع نرمال
-                random_returns = np.random.multivariate_normal(
-                    self.mean_returns / 252,  # بازده روزانه
-                    self.cov_matrix / 252,     # کوواریانس روزانه
-                    size=1
-                )[0]
-                
-                # Geometric Brownian Motion: price_t = price_0 * exp((μ - σ²/2)*dt + σ*√dt*ε)
-                simulated_prices *= (1 + random_returns)
-            
-            # ارزش نهایی سبد
-            final_value = np.sum(shares * simulated_prices)
-            results.append(final_value)
-        
-        results = np.array(results)
-        
-        # محاسبه معیارهای ریسک
+                growth *= 1 + draw(n_simulations)
+            return growth
+
+        if engine == 'loop':
+            growth = np.ones((n_simulations, self.n_assets))
+            for i in range(n_simulations):
+                for day in range(days):
+                    growth[i] *= 1 + draw(1)[0]
+            return growth
+
+        raise ValueError("engine باید 'vectorized' یا 'loop' باشد.")
+
+    def _summarize_simulation(self, results, initial_investment):
+        """
+        محاسبه معیارهای ریسک از ارزش‌های نهایی شبیه‌سازی‌شده
+        Risk metrics from simulated final portfolio values
+        """
+        n_simulations = len(results)
         mean_final_value = np.mean(results)
         median_final_value = np.median(results)
         std_final_value = np.std(results)
@@ -385,7 +2349,7 @@ class PortfolioOptimizer:
         
         # بهترین و بدترین سناریو
         best_case = np.percentile(results, 95)
-        worst_case = np.percentile(results, 5)
+        worst_case = percentile_5
         
         return {
             'initial_investment': initial_investment,
@@ -401,7 +2365,131 @@ class PortfolioOptimizer:
             'expected_return_pct': (mean_final_value / initial_investment - 1) * 100
         }
     
-    def calculate_var(self, weights, initial_investment, confidence_level=0.95, method='historical'):
+    def _simulation_key(self, weights, initial_investment, years, n_simulations, seed, engine):
+        """
+        کلید کش شبیه‌سازی (وزن‌ها گرد می‌شوند تا نویز عددی کلید را تغییر ندهد)
+        Simulation cache key; weights are rounded so float noise does not miss.
+        None for unseeded runs, which must draw fresh numbers every time.
+        """
+        if seed is None:
+            return None
+        return (tuple(np.round(np.asarray(weights, dtype=float), 10)), float(initial_investment),
+                years, n_simulations, seed, engine)
+    
+    def _lookup_simulation(self, key):
+        """
+        جستجو در کش شبیه‌سازی و ثبت hit/miss
+        Look up a cached simulation and count the hit or miss (unseeded
+        runs always miss); a hit is returned as a copy so callers cannot
+        change later results
+        """
+        mc_results = self._simulation_cache.get(key) if key is not None else None
+        if mc_results is None:
+            self.simulation_cache_stats['misses'] += 1
+            return None
+        self.simulation_cache_stats['hits'] += 1
+        return self._copy_simulation(mc_results)
+    
+    def _store_simulation(self, key, mc_results):
+        """
+        ذخیره نتیجه در کش؛ قدیمی‌ترین مورد در صورت پر بودن حذف می‌شود
+        Store a copy of a result, evicting the oldest entry when the cache is full
+        """
+        if key is None:
+            return
+        if key not in self._simulation_cache and len(self._simulation_cache) >= self.simulation_cache_size:
+            self._simulation_cache.pop(next(iter(self._simulation_cache)))
+        self._simulation_cache[key] = self._copy_simulation(mc_results)
+    
+    @staticmethod
+    def _copy_simulation(mc_results):
+        """کپی نتیجه شبیه‌سازی همراه با آرایه‌ها / Copy a result, including its arrays"""
+        return {name: value.copy() if isinstance(value, np.ndarray) else value
+                for name, value in mc_results.items()}
+    
+    def clear_simulation_cache(self):
+        """
+        پاک‌کردن کش شبیه‌سازی و شمارنده‌ها
+        Clear cached simulations and reset the hit/miss counters
+        """
+        self._simulation_cache.clear()
+        self.simulation_cache_stats = {'hits': 0, 'misses': 0}
+    
+    def monte_carlo_simulation(self, weights, initial_investment, years=1, n_simulations=10000,
+                               seed=None, engine='vectorized', use_cache=True):
+        """
+        شبیه‌سازی مونت‌کارلو برای پیش‌بینی ارزش آینده سبد
+        Monte Carlo simulation for portfolio value prediction
+        
+        پارامترها / Parameters:
+        -----------
+        weights : np.array
+            وزن‌های سبد / Portfolio weights
+        initial_investment : float
+            سرمایه اولیه (تومان) / Initial investment
+        years : int
+            افق زمانی (سال) / Time horizon (years)
+        n_simulations : int
+            تعداد شبیه‌سازی‌ها / Number of simulations (FIXED: 10,000)
+        seed : int or None
+            بذر تصادفی / Random seed for reproducible runs
+        engine : str
+            'vectorized' (default) or 'loop'
+        use_cache : bool
+            استفاده از نتیجه قبلی با همین ورودی‌ها / Reuse a previous run with
+            the same weights, investment, horizon, seed and engine (only
+            seeded runs are cached)
+        
+        بازگشت / Returns:
+        --------
+        dict : نتایج شبیه‌سازی / Simulation results
+        """
+        key = self._simulation_key(weights, initial_investment, years, n_simulations, seed, engine)
+        if use_cache:
+            cached = self._lookup_simulation(key)
+            if cached is not None:
+                return cached
+        
+        # شبیه‌سازی مسیر قیمت و محاسبه ارزش نهایی سبد
+        # shares * simulated_prices == initial_investment * weights * growth
+        growth = self._simulate_growth(years, n_simulations, seed, engine)
+        results = initial_investment * (growth @ np.asarray(weights, dtype=float))
+        
+        mc_results = self._summarize_simulation(results, initial_investment)
+        if use_cache:
+            self._store_simulation(key, mc_results)
+        return mc_results
+    
+    def historical_simulation(self, weights, initial_investment, horizon_days=252):
+        """
+        شبیه‌سازی تاریخی نتایج افق زمانی با پنجره‌های هم‌پوشان
+        Empirical distribution of horizon outcomes over every overlapping window
+
+        Every window of ``horizon_days`` consecutive days in the history is
+        one outcome, so there is no randomness and no distributional
+        assumption.  Windows overlap, so outcomes are not independent and
+        the number of distinct years is small for short histories.
+
+        پارامترها / Parameters:
+        -----------
+        weights : np.array
+            وزن‌های سبد / Portfolio weights
+        initial_investment : float
+            سرمایه اولیه / Initial investment
+        horizon_days : int
+            افق (روز کاری) / Horizon in trading days
+
+        بازگشت / Returns:
+        --------
+        dict : همان کلیدهای monte_carlo_simulation / Same keys as
+            monte_carlo_simulation; 'all_simulations' holds one value per window
+        """
+        if horizon_days > len(self.returns):
+            raise ValueError("تاریخچه داده کوتاه‌تر از افق شبیه‌سازی تاریخی است.")
+        window_returns = rolling_window_returns(self._portfolio_returns(weights), horizon_days)
+        return self._summarize_simulation(initial_investment * (1 + window_returns), initial_investment)
+    
+    def calculate_var(self, weights, initial_investment, confidence_level=0.95, method='historical', seed=None):
         """
         محاسبه Value at Risk
         Calculate Value at Risk
@@ -416,6 +2504,9 @@ class PortfolioOptimizer:
             سطح اطمینان (مثلاً 0.95 برای 95%) / Confidence level
         method : str
             'historical', 'parametric', or 'monte_carlo'
+        seed : int or None
+            بذر شبیه‌سازی برای روش monte_carlo / Simulation seed; a cached
+            simulation with the same inputs is reused
         
         بازگشت / Returns:
         --------
@@ -423,14 +2514,14 @@ class PortfolioOptimizer:
         """
         if method == 'historical':
             # VaR تاریخی
-            portfolio_returns = self.returns.dot(weights)
+            portfolio_returns = self._portfolio_returns(weights)
             var = np.percentile(portfolio_returns, (1 - confidence_level) * 100)
             var_amount = -var * initial_investment
             
         elif method == 'parametric':
             # VaR پارامتریک (فرض توزیع نرمال)
-            port_return = np.sum(self.mean_returns * weights)
-            port_volatility = np.sqrt(np.dot(weights.T, np.dot(self.cov_matrix, weights)))
+            port_return = self._mean_array @ weights
+            port_volatility = np.sqrt(portfolio_variance(self._cov_array, weights))
             
             from scipy.stats import norm
             z_score = norm.ppf(1 - confidence_level)
@@ -438,7 +2529,7 @@ class PortfolioOptimizer:
             
         elif method == 'monte_carlo':
             # VaR از شبیه‌سازی مونت‌کارلو
-            mc_results = self.monte_carlo_simulation(weights, initial_investment, years=1, n_simulations=10000)
+            mc_results = self.monte_carlo_simulation(weights, initial_investment, years=1, n_simulations=10000, seed=seed)
             var_amount = mc_results['var_95']
         
         else:
@@ -446,28 +2537,194 @@ class PortfolioOptimizer:
         
         return var_amount
     
-    def generate_report(self, risk_profile, investment):
+    def risk_table(self, weights, initial_investment, confidence_levels=(0.90, 0.95, 0.975, 0.99),
+                   methods=('historical', 'parametric', 'cornish_fisher', 'monte_carlo'),
+                   horizons=(1, 10, 252), seed=None):
         """
-        تولید گزارش کامل برای پروفایل ریسک و مبلغ سرمایه‌گذاری
-        Generate complete report for risk profile and investment amount
-        
-        This method:
-        1. Optimizes portfolio based on risk profile
-        2. Calculates all metrics
-        3. Runs Monte Carlo simulation
-        4. Calculates VaR and CVaR
-        5. Generates recommendations
-        
+        جدول کامل VaR و Expected Shortfall در چند سطح اطمینان، روش و افق زمانی
+        Full VaR / Expected Shortfall grid over confidence levels, methods and horizons
+
+        The portfolio return series is computed and sorted once; every
+        historical quantile and tail mean is then read from the sorted array
+        and its prefix sums.  Skewness and kurtosis for Cornish-Fisher come
+        from the same series.  Monte Carlo rows go through the simulation
+        cache: with the 'seed' of a report the 1-year horizon is a cache hit,
+        while seed=None simulates every horizon afresh.
+
+        Losses are reported as positive amounts.  Historical figures for
+        horizons longer than one day use square-root-of-time scaling;
+        parametric and Cornish-Fisher figures scale mean by h and volatility
+        by sqrt(h).
+
         پارامترها / Parameters:
         -----------
-        risk_profile : str
-            'Conservative', 'Moderate', or 'Aggressive'
-        investment : float
-            مبلغ سرمایه‌گذاری / Investment amount
-        
+        weights : np.array
+            وزن‌های سبد / Portfolio weights
+        initial_investment : float
+            سرمایه اولیه / Initial investment
+        confidence_levels : sequence
+            سطوح اطمینان / Confidence levels
+        methods : sequence
+            'historical', 'parametric', 'cornish_fisher', 'monte_carlo'
+        horizons : sequence
+            افق‌ها بر حسب روز کاری / Horizons in trading days
+        seed : int or None
+            بذر شبیه‌سازی / Monte Carlo seed (e.g. report['seed'])
+
         بازگشت / Returns:
         --------
-        dict : گزارش کامل / Complete report
+        DataFrame : ستون‌های var, var_pct, es, es_pct با اندیس
+            (method, horizon_days, confidence_level)
+        """
+        from scipy.stats import norm
+
+        unknown = set(methods) - {'historical', 'parametric', 'cornish_fisher', 'monte_carlo'}
+        if unknown:
+            raise ValueError("method باید 'historical', 'parametric', 'cornish_fisher' یا 'monte_carlo' باشد.")
+
+        weights = np.asarray(weights, dtype=float)
+        confidence_levels = np.asarray(confidence_levels, dtype=float)
+        alphas = 1 - confidence_levels
+
+        # یک بار محاسبه و مرتب‌سازی سری بازده سبد / One pass over the return series
+        portfolio_returns = np.sort(self._portfolio_returns(weights))
+        daily_mean = float(weights @ self._mean_array) / 252
+        daily_vol = np.sqrt(portfolio_variance(self._cov_array, weights) / 252)
+
+        rows = []
+
+        def add_rows(method, horizon, var_returns, es_returns):
+            for level, var_r, es_r in zip(confidence_levels, var_returns, es_returns):
+                rows.append({
+                    'method': method, 'horizon_days': horizon, 'confidence_level': level,
+                    'var': var_r * initial_investment, 'var_pct': var_r * 100,
+                    'es': es_r * initial_investment, 'es_pct': es_r * 100
+                })
+
+        if 'historical' in methods:
+            quantiles, tail_means = _tail_risk_from_sorted(portfolio_returns, alphas)
+            for horizon in horizons:
+                add_rows('historical', horizon, -quantiles * np.sqrt(horizon), -tail_means * np.sqrt(horizon))
+
+        if 'parametric' in methods:
+            z = norm.ppf(alphas)
+            for horizon in horizons:
+                mean_h, vol_h = daily_mean * horizon, daily_vol * np.sqrt(horizon)
+                add_rows('parametric', horizon,
+                         -(mean_h + z * vol_h),
+                         -(mean_h - vol_h * norm.pdf(z) / alphas))
+
+        if 'cornish_fisher' in methods:
+            centered = portfolio_returns - portfolio_returns.mean()
+            std = centered.std()
+            skew = np.mean(centered ** 3) / std ** 3 if std > 0 else 0.0
+            kurt = np.mean(centered ** 4) / std ** 4 - 3 if std > 0 else 0.0
+
+            def cornish_fisher(z):
+                return (z + (z ** 2 - 1) * skew / 6 + (z ** 3 - 3 * z) * kurt / 24
+                        - (2 * z ** 3 - 5 * z) * skew ** 2 / 36)
+
+            z_cf = cornish_fisher(norm.ppf(alphas))
+            # ES: میانگین چندک‌های اصلاح‌شده در دنباله / average of adjusted tail quantiles
+            grid = (np.arange(1000) + 0.5) / 1000
+            z_tail = cornish_fisher(norm.ppf(np.multiply.outer(alphas, grid))).mean(axis=1)
+            for horizon in horizons:
+                mean_h, vol_h = daily_mean * horizon, daily_vol * np.sqrt(horizon)
+                add_rows('cornish_fisher', horizon, -(mean_h + z_cf * vol_h), -(mean_h + z_tail * vol_h))
+
+        if 'monte_carlo' in methods:
+            for horizon in horizons:
+                mc_results = self.monte_carlo_simulation(weights, initial_investment,
+                                                         years=horizon / 252, seed=seed)
+                simulated_returns = np.sort(mc_results['all_simulations']) / initial_investment - 1
+                quantiles, tail_means = _tail_risk_from_sorted(simulated_returns, alphas)
+                add_rows('monte_carlo', horizon, -quantiles, -tail_means)
+
+        return pd.DataFrame(rows).set_index(['method', 'horizon_days', 'confidence_level']).sort_index()
+    
+    def batch_risk_contributions(self, weights_matrix, initial_investment, confidence_level=0.95, horizon=1):
+        """
+        تجزیه تحلیلی VaR برای چند سبد به‌طور همزمان
+        Analytic VaR decomposition for many portfolios at once
+
+        Uses the parametric VaR of risk_table, VaR = -(μ_h + z·σ_h)·investment,
+        which is homogeneous of degree one in the weights, so by Euler's
+        theorem the component VaRs w_i·∂VaR/∂w_i add up to the total.  All
+        gradients come from one W @ Σ product.
+
+        پارامترها / Parameters:
+        -----------
+        weights_matrix : np.array
+            وزن‌های سبدها / Portfolio weights, (m, n)
+        initial_investment : float
+            سرمایه اولیه / Initial investment
+        confidence_level : float
+            سطح اطمینان / Confidence level
+        horizon : int
+            افق بر حسب روز کاری / Horizon in trading days
+
+        بازگشت / Returns:
+        --------
+        dict : آرایه‌های (m, n) برای marginal_var, component_var و
+            pct_contribution و آرایه (m,) برای var
+        """
+        from scipy.stats import norm
+
+        W = np.atleast_2d(np.asarray(weights_matrix, dtype=float))
+        z = norm.ppf(1 - confidence_level)
+        scale = np.sqrt(horizon / 252)
+
+        cov_times_w = covariance_product(self._cov_array, W)
+        volatility = np.sqrt(np.einsum('ij,ij->i', cov_times_w, W))
+        safe_volatility = np.where(volatility > 0, volatility, 1)
+
+        marginal_var = -(self._mean_array * horizon / 252
+                         + z * scale * cov_times_w / safe_volatility[:, None]) * initial_investment
+        component_var = W * marginal_var
+        total_var = component_var.sum(axis=1)
+        safe_total = np.where(total_var != 0, total_var, 1)
+        pct_contribution = np.where(total_var[:, None] != 0, component_var / safe_total[:, None] * 100, 0)
+
+        return {
+            'var': total_var,
+            'marginal_var': marginal_var,
+            'component_var': component_var,
+            'pct_contribution': pct_contribution
+        }
+
+    def risk_contributions(self, weights, initial_investment, confidence_level=0.95, horizon=1):
+        """
+        سهم هر دارایی از VaR سبد (marginal، component و درصد مشارکت)
+        Per-asset marginal VaR, component VaR and percentage contribution
+
+        پارامترها / Parameters:
+        -----------
+        weights : np.array
+            وزن‌های سبد / Portfolio weights
+        initial_investment : float
+            سرمایه اولیه / Initial investment
+        confidence_level : float
+            سطح اطمینان / Confidence level
+        horizon : int
+            افق بر حسب روز کاری / Horizon in trading days
+
+        بازگشت / Returns:
+        --------
+        DataFrame : یک سطر برای هر دارایی / One row per asset with columns
+            weight, marginal_var, component_var, pct_contribution
+        """
+        contributions = self.batch_risk_contributions(weights, initial_investment, confidence_level, horizon)
+        return pd.DataFrame({
+            'weight': np.asarray(weights, dtype=float),
+            'marginal_var': contributions['marginal_var'][0],
+            'component_var': contributions['component_var'][0],
+            'pct_contribution': contributions['pct_contribution'][0]
+        }, index=self.assets)
+    
+    def _report_weights(self, risk_profile):
+        """
+        وزن‌های بهینه پروفایل، با بازگشت به وزن‌های پیش‌فرض در صورت خروج از حدود
+        Optimized weights for a profile, falling back to the profile defaults
         """
         # FIXED: Optimize based on risk profile instead of using fixed weights
         try:
@@ -493,15 +2750,129 @@ class PortfolioOptimizer:
             print(f"Optimization failed: {e}, using default weights")
             weights = self.get_profile_weights(risk_profile)
         
-        # Calculate portfolio statistics
-        stats = self.portfolio_stats(weights)
+        return weights
+    
+    def generate_report(self, risk_profile, investment, seed=None):
+        """
+        تولید گزارش کامل برای پروفایل ریسک و مبلغ سرمایه‌گذاری
+        Generate complete report for risk profile and investment amount
+        
+        This method:
+        1. Optimizes portfolio based on risk profile
+        2. Calculates all metrics
+        3. Runs Monte Carlo simulation
+        4. Calculates VaR and CVaR
+        5. Generates recommendations
+        
+        پارامترها / Parameters:
+        -----------
+        risk_profile : str
+            'Conservative', 'Moderate', or 'Aggressive'
+        investment : float
+            مبلغ سرمایه‌گذاری / Investment amount
+        seed : int or None
+            بذر تصادفی شبیه‌سازی / Simulation random seed; None draws one,
+            returned as report['seed'] so later calls can reuse the paths
+        
+        بازگشت / Returns:
+        --------
+        dict : گزارش کامل / Complete report
+        """
+        return self.generate_reports([risk_profile], investment, seed=seed)[risk_profile]
+    
+    def generate_reports(self, profiles, investment, seed=None):
+        """
+        تولید گزارش چند پروفایل ریسک در یک گذر
+        Generate reports for several risk profiles in one pass
+        
+        Each profile is still optimized on its own (one small SLSQP solve,
+        milliseconds for a handful of assets; the batched projected-gradient
+        solver of optimize_batch only pays off for many problems).  The
+        expensive steps are shared: statistics come from one
+        _batch_portfolio_stats pass, the portfolio return series from a
+        single returns @ W.T product, the bootstrap intervals from one index
+        matrix, and the Monte Carlo step draws one set of asset growth paths
+        (common random numbers) that every profile is valued against, so
+        differences between profiles are not simulation noise.
+        
+        پارامترها / Parameters:
+        -----------
+        profiles : list
+            نام پروفایل‌ها / Risk profile names
+        investment : float
+            مبلغ سرمایه‌گذاری / Investment amount
+        seed : int or None
+            بذر تصادفی شبیه‌سازی / Simulation random seed.  None draws a
+            fresh seed that every random step uses and each report returns
+            as 'seed'; passing it to monte_carlo_simulation, calculate_var
+            or risk_table reuses the cached paths
+        
+        بازگشت / Returns:
+        --------
+        dict : {پروفایل: گزارش کامل} / {profile: complete report}
+        """
+        from scipy.stats import norm
         
-        # Run Monte Carlo simulation
-        mc_results = self.monte_carlo_simulation(weights, investment, years=1, n_simulations=10000)
+        if seed is None:
+            # بذر مشخص تا نتایج گزارش قابل کش و تکرار باشد / a concrete seed makes the report cacheable
+            seed = int(np.random.SeedSequence().entropy)
         
-        # Calculate VaR using multiple methods
-        var_historical = self.calculate_var(weights, investment, method='historical')
-        var_parametric = self.calculate_var(weights, investment, method='parametric')
+        profiles = list(profiles)
+        weights_matrix = np.array([self._report_weights(profile) for profile in profiles])
+        
+        # Calculate portfolio statistics
+        stats = self._batch_portfolio_stats(weights_matrix)
+        
+        # Run Monte Carlo simulation (one draw for all profiles not in the cache)
+        keys = [self._simulation_key(weights, investment, 1, 10000, seed, 'vectorized')
+                for weights in weights_matrix]
+        mc_by_profile = [self._lookup_simulation(key) for key in keys]
+        missing = [i for i, mc_results in enumerate(mc_by_profile) if mc_results is None]
+        if missing:
+            growth = self._simulate_growth(years=1, n_simulations=10000, seed=seed)
+            simulated_values = investment * (growth @ weights_matrix[missing].T)
+            for column, i in enumerate(missing):
+                mc_by_profile[i] = self._summarize_simulation(simulated_values[:, column], investment)
+                self._store_simulation(keys[i], mc_by_profile[i])
+        
+        # VaR تاریخی و پارامتریک (همان تعریف calculate_var)
+        portfolio_returns = self._returns_array @ weights_matrix.T
+        var_historical = -np.percentile(portfolio_returns, 5, axis=0) * investment
+        var_parametric = investment * (norm.ppf(0.05) * stats['volatility'] / np.sqrt(252) - stats['return'] / 252)
+        
+        # شبیه‌سازی تاریخی یک‌ساله (بدون تصادف) برای مقایسه با مونت‌کارلو
+        if len(portfolio_returns) >= 252:
+            window_values = investment * (1 + rolling_window_returns(portfolio_returns, 252))
+            hist_by_profile = [self._summarize_simulation(window_values[:, i], investment)
+                               for i in range(len(profiles))]
+        else:
+            hist_by_profile = [None] * len(profiles)
+        
+        # فواصل اطمینان بوت‌استرپ با بلوک‌های ۲۰ روزه (یک ماتریس اندیس برای همه پروفایل‌ها) /
+        # bootstrap intervals in 20-day circular blocks, which keep the loss runs
+        # the drawdown depends on; one shared index matrix for all profiles
+        intervals = self._bootstrap_intervals(portfolio_returns, stats, n_bootstrap=1000,
+                                              block_size=20, seed=seed)
+        
+        reports = {}
+        for i, risk_profile in enumerate(profiles):
+            weights = weights_matrix[i]
+            profile_stats = {key: values[i] for key, values in stats.items()}
+            reports[risk_profile] = self._assemble_report(
+                risk_profile, investment, weights, profile_stats, mc_by_profile[i],
+                var_historical[i], var_parametric[i], hist_by_profile[i],
+                {key: (lower[i], upper[i]) for key, (lower, upper, _) in intervals.items()}, seed)
+        
+        return reports
+    
+    def _assemble_report(self, risk_profile, investment, weights, stats, mc_results,
+                         var_historical, var_parametric, hist_results=None, confidence_intervals=None,
+                         seed=None):
+        """
+        ساخت دیکشنری گزارش از نتایج محاسبات
+        Build the report dictionary from computed results
+        """
+        hist_results = hist_results or {}
         var_monte_carlo = mc_results['var_95']
         
         # Calculate CVaR
@@ -547,9 +2918,22 @@ class PortfolioOptimizer:
             'mc_prob_loss': mc_results['prob_loss'],
             'mc_expected_return_pct': mc_results['expected_return_pct'],
             
+            # Historical 1-year windows (None when history is shorter than a year)
+            'hist_mean_value': hist_results.get('mean_final_value'),
+            'hist_best_case': hist_results.get('best_case'),
+            'hist_worst_case': hist_results.get('worst_case'),
+            'hist_prob_loss': hist_results.get('prob_loss'),
+            'hist_n_windows': len(hist_results.get('all_simulations', ())),
+            
+            # 95% bootstrap intervals {metric: (lower, upper)}
+            'confidence_intervals': confidence_intervals or {},
+            
             # Recommendation
             'recommendation': recommendation,
-            'risk_profile': risk_profile
+            'risk_profile': risk_profile,
+            
+            # Simulation seed (reuse it to hit the simulation cache)
+            'seed': seed
         }
     
     def _generate_recommendation(self, risk_profile, stats, mc_results):
@@ -700,29 +3084,19 @@ if __name__ == "__main__":
             # تست محاسبات پایه
             print("\n📊 آمار دارایی‌ها / Asset Statistics:")
             for asset in optimizer.assets:
-                print(f"  {asset}: بازده/Return {optimizer.mean_returns[asset]:.1%}, نوسان/Volatility {np.sqrt(optimizer.cov_matrix.loc[asset, asset]):.1%}")
-            
-            # تست سبد Conservative
-            print("\n🧪 تست پروفایل Conservative:")
-            report = optimizer.generate_report('Conservative', 100000000)  # 100M Toman
-            print(f"  وزن‌ها / Weights:")
-            for asset, weight in report['weights_dict'].items():
-                print(f"    {asset}: {weight:.1%}")
-            print(f"  بازده / Return: {report['expected_return']:.1%}")
-            print(f"  ریسک / Risk: {report['volatility']:.1%}")
-            print(f"  شارپ / Sharpe: {report['sharpe_ratio']:.2f}")
-            print(f"  VaR 95%: {report['var_pct']:.1f}%")
+                print(f"  {asset}: بازده/Return {optimizer.mean_returns[asset]:.1%}, نوسان/Volatility {optimizer.asset_volatilities[asset]:.1%}")
             
-            # تست سبد Aggressive
-            print("\n🧪 تست پروفایل Aggressive:")
-            report = optimizer.generate_report('Aggressive', 100000000)
-            print(f"  وزن‌ها / Weights:")
-            for asset, weight in report['weights_dict'].items():
-                print(f"    {asset}: {weight:.1%}")
-            print(f"  بازده / Return: {report['expected_return']:.1%}")
-            print(f"  ریسک / Risk: {report['volatility']:.1%}")
-            print(f"  شارپ / Sharpe: {report['sharpe_ratio']:.2f}")
-            print(f"  VaR 95%: {report['var_pct']:.1f}%")
+            # تست پروفایل‌ها در یک گذر / Test profiles in one pass
+            reports = optimizer.generate_reports(['Conservative', 'Aggressive'], 100000000)  # 100M Toman
+            for profile, report in reports.items():
+                print(f"\n🧪 تست پروفایل {profile}:")
+                print(f"  وزن‌ها / Weights:")
+                for asset, weight in report['weights_dict'].items():
+                    print(f"    {asset}: {weight:.1%}")
+                print(f"  بازده / Return: {report['expected_return']:.1%}")
+                print(f"  ریسک / Risk: {report['volatility']:.1%}")
+                print(f"  شارپ / Sharpe: {report['sharpe_ratio']:.2f}")
+                print(f"  VaR 95%: {report['var_pct']:.1f}%")
             
             print("\n✅ تست موفقیت‌آمیز! ماژول آماده است.")
         else:
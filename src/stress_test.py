@@ -0,0 +1,139 @@
+# src/stress_test.py
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .portfolio_optimizer import rolling_window_returns
+except ImportError:
+    from portfolio_optimizer import rolling_window_returns
+
+# سناریوهای شوک نمونه (بازده تقریبی هر دارایی در کل رویداد) /
+# Sample shock library: approximate total return of each asset over the event.
+# Assets missing from a scenario are treated as unchanged.
+SCENARIOS = {
+    'crypto_crash_2022': {'Gold': -0.01, 'Silver': 0.03, 'Bitcoin': -0.64, 'Ethereum': -0.68},
+    'covid_crash_2020': {'Gold': -0.12, 'Silver': -0.35, 'Bitcoin': -0.50, 'Ethereum': -0.60},
+    'crypto_winter_2018': {'Gold': -0.02, 'Silver': -0.09, 'Bitcoin': -0.73, 'Ethereum': -0.82},
+    'metals_selloff_2013': {'Gold': -0.28, 'Silver': -0.36},
+}
+
+
+def worst_historical_windows(optimizer, portfolios=None, windows=(5, 20, 60)):
+    """
+    بدترین پنجره‌های تاریخی برای هر دارایی و هر سبد
+    Worst historical cumulative return per asset and per portfolio
+
+    پارامترها / Parameters:
+    -----------
+    optimizer : PortfolioOptimizer
+        منبع بازده‌ها / Source of the return history
+    portfolios : dict or None
+        {نام: وزن‌ها} / {name: weights}; portfolios are rebalanced daily
+    windows : sequence
+        طول پنجره‌ها (روز) / Window lengths in trading days
+
+    بازگشت / Returns:
+    --------
+    DataFrame : اندیس (window, series) با ستون‌های worst_return, start, end
+    """
+    portfolios = portfolios or {}
+    returns = optimizer.returns.values
+    names = list(optimizer.assets) + list(portfolios)
+    if portfolios:
+        weights_matrix = np.array([np.asarray(w, dtype=float) for w in portfolios.values()])
+        returns = np.hstack([returns, returns @ weights_matrix.T])
+
+    dates = optimizer.returns.index
+    rows = []
+    for window in windows:
+        window_returns = rolling_window_returns(returns, window)
+        starts = window_returns.argmin(axis=0)
+        for j, name in enumerate(names):
+            rows.append({
+                'window': window, 'series': name,
+                'worst_return': window_returns[starts[j], j],
+                'start': dates[starts[j]], 'end': dates[starts[j] + window - 1]
+            })
+    return pd.DataFrame(rows).set_index(['window', 'series'])
+
+
+def historical_scenarios(optimizer, weights, windows=(5, 20, 60)):
+    """
+    ساخت سناریوی شوک از بدترین پنجره‌های تاریخی یک سبد
+    Turn a portfolio's worst historical windows into shock vectors
+
+    The shock of each asset is its own compound return over the window in
+    which the portfolio did worst, so the result can be fed to revalue().
+
+    بازگشت / Returns:
+    --------
+    dict : {'worst_<w>d': {دارایی: شوک}} / {'worst_<w>d': {asset: shock}}
+    """
+    returns = optimizer.returns.values
+    portfolio_returns = returns @ np.asarray(weights, dtype=float)
+    scenarios = {}
+    for window in windows:
+        start = rolling_window_returns(portfolio_returns, window).argmin()
+        shocks = rolling_window_returns(returns[start:start + window], window)[0]
+        scenarios[f'worst_{window}d'] = dict(zip(optimizer.assets, shocks))
+    return scenarios
+
+
+def revalue(scenarios, portfolios, assets, investment=1.0):
+    """
+    ارزیابی مجدد برداری همه سناریوها × همه سبدها
+    Vectorized revaluation of every scenario against every portfolio
+
+    پارامترها / Parameters:
+    -----------
+    scenarios : dict
+        {نام سناریو: {دارایی: شوک}} / {scenario: {asset: shock return}}
+    portfolios : dict
+        {نام سبد: وزن‌ها} / {portfolio: weights aligned with ``assets``}
+    assets : list
+        ترتیب دارایی‌ها / Asset order of the weight vectors
+    investment : float
+        سرمایه / Investment amount
+
+    بازگشت / Returns:
+    --------
+    DataFrame : سود/زیان هر سناریو (سطر) برای هر سبد (ستون) /
+        P&L with one row per scenario and one column per portfolio
+    """
+    shocks = np.array([[scenario.get(asset, 0.0) for asset in assets] for scenario in scenarios.values()])
+    weights_matrix = np.array([np.asarray(w, dtype=float) for w in portfolios.values()])
+    pnl = shocks @ weights_matrix.T * investment
+    return pd.DataFrame(pnl, index=list(scenarios), columns=list(portfolios))
+
+
+def stress_test(optimizer, portfolios, investment, scenarios=None, windows=(5, 20, 60)):
+    """
+    آزمون استرس کامل: بدترین پنجره‌های تاریخی و سناریوهای شوک
+    Full stress test: worst historical windows plus scenario revaluation
+
+    پارامترها / Parameters:
+    -----------
+    optimizer : PortfolioOptimizer
+        منبع بازده‌ها / Source of the return history
+    portfolios : dict
+        {نام: وزن‌ها} / {name: weights}, e.g. one entry per risk profile
+    investment : float
+        سرمایه / Investment amount
+    scenarios : dict or None
+        سناریوهای شوک (پیش‌فرض SCENARIOS) / Shock library (default SCENARIOS)
+    windows : sequence
+        طول پنجره‌های تاریخی / Historical window lengths
+
+    بازگشت / Returns:
+    --------
+    dict : 'worst_windows' (DataFrame), 'scenario_pnl' and 'scenario_pnl_pct'
+        (scenarios × portfolios DataFrames)
+    """
+    scenarios = dict(SCENARIOS if scenarios is None else scenarios)
+    pnl = revalue(scenarios, portfolios, optimizer.assets, investment)
+    return {
+        'worst_windows': worst_historical_windows(optimizer, portfolios, windows),
+        'scenario_pnl': pnl,
+        'scenario_pnl_pct': pnl / investment * 100
+    }
@@ -0,0 +1,176 @@
+# src/var_backtest.py
+
+from bisect import bisect_left, insort
+
+import numpy as np
+import pandas as pd
+from scipy.special import xlogy
+from scipy.stats import chi2, norm
+
+
+def rolling_historical_var(returns, window, confidence_level=0.95):
+    """
+    VaR تاریخی غلتان با پنجره مرتب و درج/حذف دودویی
+    Rolling historical VaR from a sorted window maintained with bisect
+
+    Each day one return is inserted into and one removed from a sorted
+    list, so the quantile is read directly instead of re-sorting the
+    window.  The quantile uses the same linear interpolation as
+    np.percentile (and therefore calculate_var).
+
+    پارامترها / Parameters:
+    -----------
+    returns : np.array
+        بازده روزانه سبد / Daily portfolio returns (T,)
+    window : int
+        طول پنجره / Window length
+    confidence_level : float
+        سطح اطمینان / Confidence level
+
+    بازگشت / Returns:
+    --------
+    np.array : VaR (زیان مثبت به صورت کسری) برای روزهای window..T-1 /
+        VaR as a positive return fraction forecast for days window..T-1
+    """
+    returns = np.asarray(returns, dtype=float)
+    position = (1 - confidence_level) * (window - 1)
+    below = int(np.floor(position))
+    above = min(below + 1, window - 1)
+    fraction = position - below
+
+    sorted_window = sorted(returns[:window].tolist())
+    var = np.empty(len(returns) - window)
+    for k, t in enumerate(range(window, len(returns))):
+        quantile = sorted_window[below] + (sorted_window[above] - sorted_window[below]) * fraction
+        var[k] = -quantile
+        del sorted_window[bisect_left(sorted_window, returns[t - window])]
+        insort(sorted_window, returns[t])
+    return var
+
+
+def rolling_parametric_var(returns, window, confidence_level=0.95):
+    """
+    VaR پارامتریک (نرمال) غلتان با مجموع‌های تجمعی
+    Rolling normal VaR, -(μ + z·σ), with window moments from cumulative sums
+    """
+    returns = np.asarray(returns, dtype=float)
+    sum_r = np.concatenate([[0.0], np.cumsum(returns)])
+    sum_rr = np.concatenate([[0.0], np.cumsum(returns ** 2)])
+    window_sum = (sum_r[window:] - sum_r[:-window])[:-1]
+    window_sum_sq = (sum_rr[window:] - sum_rr[:-window])[:-1]
+
+    mean = window_sum / window
+    variance = np.maximum((window_sum_sq - window * mean ** 2) / (window - 1), 0)
+    return -(mean + norm.ppf(1 - confidence_level) * np.sqrt(variance))
+
+
+def kupiec_test(exceptions, confidence_level=0.95):
+    """
+    آزمون پوشش غیرشرطی کوپیک (POF)
+    Kupiec proportion-of-failures test
+
+    بازگشت / Returns:
+    --------
+    tuple : (آماره LR, p-value) با توزیع کای‌دو با ۱ درجه آزادی
+    """
+    exceptions = np.asarray(exceptions, dtype=bool)
+    n = len(exceptions)
+    x = exceptions.sum()
+    p = 1 - confidence_level
+    observed = x / n if n else 0.0
+
+    log_null = xlogy(n - x, 1 - p) + xlogy(x, p)
+    log_alt = xlogy(n - x, 1 - observed) + xlogy(x, observed)
+    lr = max(-2 * (log_null - log_alt), 0.0)
+    return lr, chi2.sf(lr, 1)
+
+
+def christoffersen_test(exceptions):
+    """
+    آزمون استقلال کریستوفرسن (خوشه‌ای نبودن استثناها)
+    Christoffersen independence test on the exception sequence
+
+    بازگشت / Returns:
+    --------
+    tuple : (آماره LR, p-value) با توزیع کای‌دو با ۱ درجه آزادی
+    """
+    exceptions = np.asarray(exceptions, dtype=int)
+    previous, current = exceptions[:-1], exceptions[1:]
+    n00 = np.sum((previous == 0) & (current == 0))
+    n01 = np.sum((previous == 0) & (current == 1))
+    n10 = np.sum((previous == 1) & (current == 0))
+    n11 = np.sum((previous == 1) & (current == 1))
+
+    pi0 = n01 / (n00 + n01) if n00 + n01 else 0.0
+    pi1 = n11 / (n10 + n11) if n10 + n11 else 0.0
+    pi = (n01 + n11) / (n00 + n01 + n10 + n11) if len(previous) else 0.0
+
+    log_null = xlogy(n00 + n10, 1 - pi) + xlogy(n01 + n11, pi)
+    log_alt = xlogy(n00, 1 - pi0) + xlogy(n01, pi0) + xlogy(n10, 1 - pi1) + xlogy(n11, pi1)
+    lr = max(-2 * (log_null - log_alt), 0.0)
+    return lr, chi2.sf(lr, 1)
+
+
+def backtest_var(optimizer, weights, window=252, confidence_level=0.95,
+                 methods=('historical', 'parametric')):
+    """
+    بک‌تست VaR تاریخی و پارامتریک روی کل تاریخچه
+    Backtest rolling historical and parametric VaR over all dates of optimizer.returns
+
+    For every day after the first ``window`` days, VaR is forecast from the
+    preceding window only and compared with the realised portfolio return;
+    a return below -VaR is an exception.
+
+    پارامترها / Parameters:
+    -----------
+    optimizer : PortfolioOptimizer
+        منبع بازده‌ها / Source of the return history
+    weights : np.array
+        وزن‌های سبد / Portfolio weights
+    window : int
+        طول پنجره تخمین / Estimation window in trading days
+    confidence_level : float
+        سطح اطمینان / Confidence level
+    methods : sequence
+        'historical' and/or 'parametric'
+
+    بازگشت / Returns:
+    --------
+    dict : برای هر روش / Per method: var and exceptions (Series),
+        n_exceptions, expected_exceptions, exception_rate, kupiec_lr,
+        kupiec_pvalue, christoffersen_lr, christoffersen_pvalue,
+        conditional_coverage_lr, conditional_coverage_pvalue
+    """
+    portfolio_returns = optimizer.returns.values @ np.asarray(weights, dtype=float)
+    if window < 2 or window >= len(portfolio_returns):
+        raise ValueError("window باید بین 2 و تعداد روزهای داده باشد.")
+
+    rolling = {'historical': rolling_historical_var, 'parametric': rolling_parametric_var}
+    index = optimizer.returns.index[window:]
+    realised = portfolio_returns[window:]
+
+    results = {}
+    for method in methods:
+        if method not in rolling:
+            raise ValueError("method باید 'historical' یا 'parametric' باشد.")
+        var = rolling[method](portfolio_returns, window, confidence_level)
+        exceptions = realised < -var
+
+        kupiec_lr, kupiec_pvalue = kupiec_test(exceptions, confidence_level)
+        christoffersen_lr, christoffersen_pvalue = christoffersen_test(exceptions)
+        conditional_coverage_lr = kupiec_lr + christoffersen_lr
+
+        results[method] = {
+            'var': pd.Series(var, index=index),
+            'exceptions': pd.Series(exceptions, index=index),
+            'n_exceptions': int(exceptions.sum()),
+            'expected_exceptions': len(exceptions) * (1 - confidence_level),
+            'exception_rate': exceptions.mean(),
+            'kupiec_lr': kupiec_lr,
+            'kupiec_pvalue': kupiec_pvalue,
+            'christoffersen_lr': christoffersen_lr,
+            'christoffersen_pvalue': christoffersen_pvalue,
+            'conditional_coverage_lr': conditional_coverage_lr,
+            'conditional_coverage_pvalue': chi2.sf(conditional_coverage_lr, 2)
+        }
+    return results
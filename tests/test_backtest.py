@@ -0,0 +1,100 @@
+"""
+Tests for backtest.py - walk-forward backtest engine
+"""
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import src.portfolio_optimizer as po
+import src.backtest as bt
+
+
+class TestWalkForwardBacktest:
+    """Test suite for the rolling walk-forward backtest"""
+
+    def setup_method(self):
+        """Create sample data for testing"""
+        dates = pd.date_range(end=pd.Timestamp.now(), periods=600, freq='D')
+        np.random.seed(42)
+
+        self.test_prices = pd.DataFrame({
+            'Gold': 100 * np.exp(np.random.randn(600).cumsum() * 0.01),
+            'Silver': 20 * np.exp(np.random.randn(600).cumsum() * 0.02),
+            'Bitcoin': 50000 * np.exp(np.random.randn(600).cumsum() * 0.03),
+            'Ethereum': 3000 * np.exp(np.random.randn(600).cumsum() * 0.04)
+        }, index=dates)
+
+        self.optimizer = po.PortfolioOptimizer(self.test_prices)
+
+    def test_rolling_moments_match_full_estimate(self):
+        """Incremental window moments equal pandas mean/cov on the same window"""
+        returns = self.optimizer.returns
+        means, covs = bt.rolling_moments(returns.values, 100, [100, 357, 599])
+
+        window = returns.iloc[257:357]
+        assert np.allclose(means[1], window.mean().values * 252)
+        assert np.allclose(covs[1], window.cov().values * 252)
+        assert np.allclose(covs[2], returns.iloc[499:599].cov().values * 252)
+        print("✓ Rolling moments match full re-estimation")
+
+    def test_run_backtest(self):
+        """Backtest produces weights within profile bounds and a consistent equity curve"""
+        backtest = bt.WalkForwardBacktest(self.optimizer, 'Conservative', window=252, rebalance_every=21)
+        result = backtest.run(n_workers=1)
+
+        weights = result['weights']
+        assert list(weights.columns) == self.optimizer.assets
+        assert np.allclose(weights.sum(axis=1), 1)
+        assert (weights['Gold'] >= 0.40 - 1e-8).all() and (weights['Gold'] <= 0.60 + 1e-8).all()
+        assert (weights['Bitcoin'] + weights['Ethereum'] <= 0.25 + 1e-6).all()
+
+        assert len(result['portfolio_returns']) == len(self.optimizer.returns) - 252
+        assert np.isclose(result['total_return'], result['equity_curve'].iloc[-1] - 1)
+        assert result['max_drawdown'] <= 0
+        assert result['turnover'] >= 0
+        print(f"✓ Backtest Sharpe: {result['sharpe_ratio']:.2f}")
+
+    def test_crypto_cap_binding(self):
+        """The Conservative crypto cap holds at every rebalance when crypto dominates"""
+        n = 500
+        rng = np.random.default_rng(1)
+        trend = np.arange(n) * 0.002
+        prices = pd.DataFrame({
+            'Gold': 100 * np.exp(rng.standard_normal(n).cumsum() * 0.01),
+            'Silver': 20 * np.exp(rng.standard_normal(n).cumsum() * 0.02),
+            'Bitcoin': 50000 * np.exp(rng.standard_normal(n).cumsum() * 0.03 + trend),
+            'Ethereum': 3000 * np.exp(rng.standard_normal(n).cumsum() * 0.04 + trend)
+        }, index=pd.date_range(end=pd.Timestamp.now(), periods=n, freq='D'))
+        optimizer = po.PortfolioOptimizer(prices)
+        weights = bt.WalkForwardBacktest(optimizer, 'Conservative', window=252, rebalance_every=1).run(n_workers=1)['weights']
+        crypto = weights['Bitcoin'] + weights['Ethereum']
+        assert (crypto <= 0.25 + 1e-6).all()
+        assert crypto.max() > 0.25 - 1e-4
+        assert np.allclose(weights.sum(axis=1), 1)
+        print("✓ Crypto cap holds on every rebalance")
+
+    def test_first_rebalance_matches_optimizer(self):
+        """The first rebalance solves the same problem as optimize_sharpe on that window"""
+        result = bt.WalkForwardBacktest(self.optimizer, 'Moderate', window=252).run(n_workers=1)
+
+        window_prices = self.test_prices.iloc[:253]
+        expected = po.PortfolioOptimizer(window_prices).optimize_sharpe('Moderate', solver='projected_gradient')
+        assert np.allclose(result['weights'].iloc[0].values, expected['weights'], atol=1e-4)
+        print("✓ First rebalance matches optimize_sharpe")
+
+    def test_process_pool_matches_serial(self):
+        """Fanning rebalance dates across processes gives the same weights"""
+        backtest = bt.WalkForwardBacktest(self.optimizer, 'Aggressive', window=252, rebalance_every=30)
+        serial = backtest.run(n_workers=1)
+        parallel = backtest.run(n_workers=2)
+        assert np.allclose(serial['weights'].values, parallel['weights'].values, atol=1e-5)
+        print("✓ Process pool matches serial run")
+
+    def test_invalid_window(self):
+        """Invalid window raises ValueError"""
+        with pytest.raises(ValueError):
+            bt.WalkForwardBacktest(self.optimizer, window=10_000)
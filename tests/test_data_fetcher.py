@@ -3,6 +3,8 @@ Complete tests for data_fetcher.py - ADAPTED to actual implementation
 """
 import sys
 import os
+import time
+import threading
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -167,6 +169,140 @@ class TestDataFetcher:
         
         print("✓ Edge cases tested")
 
+
+SYMBOLS = ['GC=F', 'SI=F', 'BTC-USD', 'ETH-USD']
+
+
+class TestBatchedFetch:
+    """Test suite for the single multi-ticker download"""
+
+    def setup_method(self):
+        """Create a multi-ticker download result with an empty and a sparse column"""
+        index = pd.date_range('2023-01-01', periods=300)
+        close = pd.DataFrame({
+            'GC=F': np.arange(300.0) + 100,
+            'SI=F': np.nan,
+            'BTC-USD': np.arange(300.0) + 1,
+            'ETH-USD': np.arange(300.0) + 2
+        }, index=index)
+        close.iloc[::7, 0] = np.nan  # futures calendar gaps inside the union index
+        self.batch = pd.concat({'Close': close, 'Open': close}, axis=1)
+        self.single = pd.DataFrame({'Close': np.arange(200.0) + 5}, index=index[:200])
+        self.calls = []
+
+    def download(self, symbols, **kwargs):
+        self.calls.append(symbols)
+        return self.batch if isinstance(symbols, list) else self.single
+
+    def test_single_request_and_local_split(self):
+        """All symbols come from one download; columns are cleaned on their own"""
+        self.batch['Close', 'SI=F'] = np.arange(300.0) + 20
+        with patch('yfinance.download', side_effect=self.download):
+            results = df.fetch_assets_batch(SYMBOLS)
+
+        assert self.calls == [SYMBOLS]
+        assert set(results) == set(SYMBOLS)
+        assert not results['GC=F'].isna().any()
+        assert len(results['GC=F']) == 300 - len(range(0, 300, 7))
+        assert results['BTC-USD'].iloc[-1] == 300
+        print("✓ One round trip for all symbols")
+
+    def test_fallback_only_for_empty_tickers(self):
+        """Only the ticker that came back empty is fetched again"""
+        with patch('yfinance.download', side_effect=self.download):
+            results = df.fetch_assets_batch(SYMBOLS)
+
+        assert self.calls == [SYMBOLS, 'SI=F']
+        assert len(results['SI=F']) == 200
+        assert len(results['ETH-USD']) == 300
+        print("✓ Per-symbol fallback for empty tickers")
+
+    def test_failed_batch_falls_back_per_symbol(self):
+        """A failing batch request falls back to one request per symbol"""
+        def download(symbols, **kwargs):
+            if isinstance(symbols, list):
+                raise ConnectionError("batch failed")
+            return self.single
+
+        with patch('yfinance.download', side_effect=download):
+            results = df.fetch_assets_batch(SYMBOLS)
+
+        assert all(len(results[symbol]) == 200 for symbol in SYMBOLS)
+        print("✓ Failed batch falls back per symbol")
+
+
+class FakeTicker:
+    """Stand-in for yf.Ticker whose history() blocks until the test releases it"""
+
+    def __init__(self, symbol, suite):
+        self.symbol = symbol
+        self.suite = suite
+
+    def history(self, **kwargs):
+        self.suite.requested.append(self.symbol)
+        self.suite.release[self.symbol].wait()
+        return pd.DataFrame({'Close': np.arange(300.0) + 1}, index=self.suite.index)
+
+
+class TestConcurrentFetch:
+    """Test suite for the thread-pool fetch with deadlines"""
+
+    def setup_method(self):
+        """Every symbol answers at once except SI=F, which blocks until teardown"""
+        self.index = pd.date_range('2023-01-01', periods=300)
+        self.requested = []
+        self.release = {symbol: threading.Event() for symbol in SYMBOLS}
+        for symbol in ['GC=F', 'BTC-USD', 'ETH-USD']:
+            self.release[symbol].set()
+        self.threads = set(threading.enumerate())
+
+    def teardown_method(self):
+        """Release the blocked request and wait for the abandoned workers"""
+        for event in self.release.values():
+            event.set()
+        for thread in set(threading.enumerate()) - self.threads:
+            thread.join()
+
+    def fetch(self, symbols, **kwargs):
+        with patch('yfinance.Ticker', side_effect=lambda symbol: FakeTicker(symbol, self)), \
+             patch('yfinance.download', side_effect=AssertionError("yf.download is not thread-safe")):
+            return df.fetch_assets_concurrent(symbols, **kwargs)
+
+    def test_slow_symbol_times_out(self):
+        """A slow symbol hits its deadline; the others are returned with progress updates"""
+        messages = []
+        start = time.monotonic()
+        results, status = self.fetch(SYMBOLS, progress_callback=messages.append,
+                                     symbol_timeout=2, total_timeout=30)
+
+        assert time.monotonic() - start < 20
+        assert status == {'GC=F': 'ok', 'SI=F': 'timeout', 'BTC-USD': 'ok', 'ETH-USD': 'ok'}
+        assert results['SI=F'] is None and len(results['GC=F']) == 300
+        assert len(messages) == 3
+        assert {message.split()[1] for message in messages} == {'GC=F', 'BTC-USD', 'ETH-USD'}
+        assert {message.split()[2] for message in messages} == {'(1/4)', '(2/4)', '(3/4)'}
+        print("✓ Slow symbol abandoned at its deadline")
+
+    def test_queued_symbol_has_its_own_deadline(self):
+        """A symbol queued behind the slow one is cancelled at its own deadline"""
+        _, status = self.fetch(['SI=F', 'GC=F'], max_workers=1, symbol_timeout=0.3, total_timeout=30)
+        assert status == {'SI=F': 'timeout', 'GC=F': 'timeout'}
+
+        # Once the slow request returns, the worker exits without starting GC=F
+        self.teardown_method()
+        assert self.requested == ['SI=F']
+        print("✓ Queued symbol cancelled at its deadline")
+
+    def test_total_budget(self):
+        """The overall budget caps the fetch even with generous per-symbol deadlines"""
+        start = time.monotonic()
+        _, status = self.fetch(SYMBOLS, symbol_timeout=60, total_timeout=2)
+
+        assert time.monotonic() - start < 20
+        assert status == {'GC=F': 'ok', 'SI=F': 'timeout', 'BTC-USD': 'ok', 'ETH-USD': 'ok'}
+        print("✓ Total budget respected")
+
+
 def run_tests():
     print("\n🔧 Testing data_fetcher.py")
     print("=" * 60)
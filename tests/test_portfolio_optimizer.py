@@ -219,6 +219,604 @@ class TestPortfolioOptimizer:
             print(f"  ✓ Raises error for extreme weights: {type(e).__name__}")
         
         print("✓ Edge cases tested")
+    
+    def test_project_capped_simplex(self):
+        """Test capped-simplex projection (single and batch)"""
+        lo = np.array([0.40, 0.20, 0.05, 0.05])
+        hi = np.array([0.60, 0.30, 0.20, 0.15])
+        w = po.project_capped_simplex(np.array([2.0, -1.0, 0.5, 0.1]), lo, hi)
+        assert abs(w.sum() - 1) < 1e-12
+        assert np.all(w >= lo - 1e-12) and np.all(w <= hi + 1e-12)
+        
+        # A feasible point is its own projection
+        feasible = np.array([0.5, 0.25, 0.15, 0.10])
+        assert np.allclose(po.project_capped_simplex(feasible, lo, hi), feasible)
+        
+        batch = po.project_capped_simplex(np.random.randn(50, 4), lo, hi)
+        assert batch.shape == (50, 4)
+        assert np.allclose(batch.sum(axis=1), 1)
+        
+        with pytest.raises(ValueError):
+            po.project_capped_simplex(np.zeros(4), lo, lo)
+        
+        # Lower bounds that add up to 1 (up to rounding) leave lo as the only feasible point
+        tight = np.array([0.2, 0.3, 0.5])
+        assert np.allclose(po.project_capped_simplex(np.array([3.0, 0.0, -1.0]), tight, 1), tight)
+        tight = np.array([0.0, 0.36, 0.27, 0.37])
+        assert np.allclose(po.project_capped_simplex(np.random.randn(20, 4), tight, 1), tight)
+        
+        # Large steps away from the feasible set still respect an extra linear constraint
+        crypto = (np.array([0, 0, 1.0, 1.0]), 0.25, 'ineq')
+        far = po._project_feasible(np.random.randn(200, 4) * 1e4, lo, hi, [crypto])
+        assert np.all(far[:, 2] + far[:, 3] <= 0.25 + 1e-9)
+        assert np.allclose(far.sum(axis=1), 1)
+        print("✓ Capped-simplex projection works")
+    
+    def test_projected_gradient_solver(self):
+        """Test projected-gradient backend against SLSQP"""
+        for profile in [None, 'Conservative', 'Moderate', 'Aggressive']:
+            slsqp = self.optimizer.optimize_sharpe(risk_profile=profile)
+            pg = self.optimizer.optimize_sharpe(risk_profile=profile, solver='projected_gradient')
+            assert abs(pg['weights'].sum() - 1) < 1e-8
+            assert pg['sharpe_ratio'] >= slsqp['sharpe_ratio'] - 1e-4
+        
+        crypto = self.optimizer.optimize_sharpe('Conservative', solver='projected_gradient')['weights']
+        assert crypto[2] + crypto[3] <= 0.25 + 1e-6
+        
+        slsqp = self.optimizer.minimize_volatility(risk_profile='Moderate')
+        pg = self.optimizer.minimize_volatility(risk_profile='Moderate', solver='projected_gradient')
+        assert pg['volatility'] <= slsqp['volatility'] + 1e-6
+        
+        with pytest.raises(ValueError):
+            self.optimizer.optimize_sharpe(solver='newton')
+        print("✓ Projected-gradient solver matches SLSQP")
+    
+    def test_optimize_batch(self):
+        """Test batch optimization over many constraint sets"""
+        constraint_sets = ['Conservative', 'Moderate', 'Aggressive']
+        constraint_sets += [{'Gold': (0.1, 0.5), 'Bitcoin': (0.0, 0.2)}] * 20
+        results = self.optimizer.optimize_batch(constraint_sets)
+        
+        assert len(results) == len(constraint_sets)
+        for result in results:
+            assert abs(result['weights'].sum() - 1) < 1e-8
+        assert 0.1 - 1e-9 <= results[-1]['weights'][0] <= 0.5 + 1e-9
+        
+        single = self.optimizer.optimize_sharpe('Moderate')
+        assert results[1]['sharpe_ratio'] >= single['sharpe_ratio'] - 1e-4
+        
+        # Vectorized stats agree with portfolio_stats
+        stats = self.optimizer.portfolio_stats(results[-1]['weights'])
+        for key in ['return', 'volatility', 'sortino_ratio', 'max_drawdown', 'calmar_ratio']:
+            assert np.isclose(stats[key], results[-1][key])
+        
+        volatility = self.optimizer.optimize_batch(['Moderate'], objective='volatility')[0]
+        assert volatility['volatility'] <= self.optimizer.minimize_volatility(risk_profile='Moderate')['volatility'] + 1e-6
+        
+        # Minimums adding up to 100% pin the weights to the minimums
+        tight = self.optimizer.optimize_batch([{'Silver': (.36, 1), 'Bitcoin': (.27, 1), 'Ethereum': (.37, 1)}])[0]
+        assert np.allclose(tight['weights'], [0, .36, .27, .37])
+        print(f"✓ optimize_batch solved {len(results)} problems")
+    
+    def test_generate_reports(self):
+        """Test multi-profile reports sharing one data pass"""
+        profiles = ['Conservative', 'Moderate', 'Aggressive']
+        reports = self.optimizer.generate_reports(profiles, investment=100_000_000, seed=7)
+        assert list(reports) == profiles
+        
+        # Same seed -> same draws as a single-profile report (common random numbers)
+        single = self.optimizer.generate_report('Moderate', investment=100_000_000, seed=7)
+        assert np.isclose(reports['Moderate']['var'], single['var'])
+        assert np.isclose(reports['Moderate']['mc_mean_value'], single['mc_mean_value'])
+        
+        weights = reports['Aggressive']['weights']
+        assert np.isclose(reports['Aggressive']['var_historical'],
+                          self.optimizer.calculate_var(weights, 100_000_000, method='historical'))
+        assert np.isclose(reports['Aggressive']['var_parametric'],
+                          self.optimizer.calculate_var(weights, 100_000_000, method='parametric'))
+        assert np.isclose(reports['Aggressive']['sortino_ratio'],
+                          self.optimizer.portfolio_stats(weights)['sortino_ratio'])
+
+        # Only the optimization runs per profile; simulation and bootstrap run once
+        self.optimizer.clear_simulation_cache()
+        with patch.object(self.optimizer, '_simulate_growth', wraps=self.optimizer._simulate_growth) as growth, \
+             patch.object(self.optimizer, '_bootstrap_metrics', wraps=self.optimizer._bootstrap_metrics) as boot, \
+             patch.object(self.optimizer, '_report_weights', wraps=self.optimizer._report_weights) as optimize:
+            self.optimizer.generate_reports(profiles, investment=100_000_000, seed=8)
+        assert (growth.call_count, boot.call_count, optimize.call_count) == (1, 1, 3)
+        print("✓ generate_reports shares one simulation across profiles")
+    
+    def test_monte_carlo_seed_and_engines(self):
+        """Test reproducible simulation and engine selection"""
+        weights = np.array([0.25, 0.25, 0.25, 0.25])
+        first = self.optimizer.monte_carlo_simulation(weights, 100_000_000, n_simulations=500, seed=3)
+        second = self.optimizer.monte_carlo_simulation(weights, 100_000_000, n_simulations=500, seed=3)
+        assert np.array_equal(first['all_simulations'], second['all_simulations'])
+        
+        loop = self.optimizer.monte_carlo_simulation(weights, 100_000_000, years=1, n_simulations=5,
+                                                     seed=3, engine='loop')
+        assert len(loop['all_simulations']) == 5
+        
+        with pytest.raises(ValueError):
+            self.optimizer.monte_carlo_simulation(weights, 100_000_000, engine='quantum')
+        print("✓ Monte Carlo seeds and engines work")
+    
+    def test_simulation_cache(self):
+        """Test that reports and monte_carlo VaR share cached simulations"""
+        self.optimizer.clear_simulation_cache()
+        report = self.optimizer.generate_report('Moderate', investment=100_000_000, seed=11)
+        assert self.optimizer.simulation_cache_stats == {'hits': 0, 'misses': 1}
+        
+        var = self.optimizer.calculate_var(report['weights'], 100_000_000, method='monte_carlo', seed=11)
+        assert var == report['var']
+        assert self.optimizer.simulation_cache_stats == {'hits': 1, 'misses': 1}
+        
+        # A different seed is a different simulation
+        self.optimizer.calculate_var(report['weights'], 100_000_000, method='monte_carlo', seed=12)
+        assert self.optimizer.simulation_cache_stats['misses'] == 2
+        
+        # Cached results are copies: editing one does not change later hits
+        first = self.optimizer.monte_carlo_simulation(report['weights'], 100_000_000, seed=11)
+        first['all_simulations'][:] = 0
+        first['var_95'] = -1
+        again = self.optimizer.monte_carlo_simulation(report['weights'], 100_000_000, seed=11)
+        assert again['var_95'] == report['var'] and again['all_simulations'].any()
+        
+        # Unseeded runs are never cached and draw fresh numbers
+        self.optimizer.clear_simulation_cache()
+        a = self.optimizer.monte_carlo_simulation(report['weights'], 100_000_000, n_simulations=500)
+        b = self.optimizer.monte_carlo_simulation(report['weights'], 100_000_000, n_simulations=500)
+        assert not np.array_equal(a['all_simulations'], b['all_simulations'])
+        assert self.optimizer.simulation_cache_stats == {'hits': 0, 'misses': 2}
+
+        # An unseeded report draws a seed and returns it, so its paths can be reused
+        self.optimizer.clear_simulation_cache()
+        report = self.optimizer.generate_report('Moderate', investment=100_000_000)
+        assert isinstance(report['seed'], int)
+        var = self.optimizer.calculate_var(report['weights'], 100_000_000, method='monte_carlo',
+                                           seed=report['seed'])
+        assert var == report['var']
+        assert self.optimizer.simulation_cache_stats == {'hits': 1, 'misses': 1}
+        print("✓ Simulation cache reuses Monte Carlo output")
+    
+    def test_risk_table(self):
+        """Test single-pass multi-level, multi-method VaR/ES grid"""
+        weights = np.array([0.30, 0.20, 0.30, 0.20])
+        investment = 100_000_000
+        table = self.optimizer.risk_table(weights, investment, horizons=(1, 252), seed=5)
+        
+        assert isinstance(table, pd.DataFrame)
+        assert len(table) == 4 * 4 * 2
+        assert list(table.columns) == ['var', 'var_pct', 'es', 'es_pct']
+        
+        # Historical 1-day rows agree with calculate_var
+        for level in [0.90, 0.95, 0.99]:
+            expected = self.optimizer.calculate_var(weights, investment, confidence_level=level)
+            assert np.isclose(table.loc[('historical', 1, level), 'var'], expected)
+        
+        # Monte Carlo 1-year rows reuse the cached simulation
+        mc_results = self.optimizer.monte_carlo_simulation(weights, investment, seed=5)
+        assert np.isclose(table.loc[('monte_carlo', 252, 0.95), 'var'], mc_results['var_95'])
+        assert np.isclose(table.loc[('monte_carlo', 252, 0.95), 'es'], mc_results['cvar_95'])
+
+        # With a report's seed the 1-year rows come from the report's simulation
+        report = self.optimizer.generate_report('Moderate', investment)
+        hits = self.optimizer.simulation_cache_stats['hits']
+        table = self.optimizer.risk_table(report['weights'], investment, horizons=(1, 252), seed=report['seed'])
+        assert self.optimizer.simulation_cache_stats['hits'] == hits + 1
+        assert np.isclose(table.loc[('monte_carlo', 252, 0.95), 'var'], report['var'])
+        
+        # ES is never below VaR, and VaR grows with the confidence level
+        assert (table['es'] >= table['var'] - 1e-6).all()
+        parametric = table.loc[('parametric', 1), 'var']
+        assert parametric.is_monotonic_increasing
+        
+        with pytest.raises(ValueError):
+            self.optimizer.risk_table(weights, investment, methods=('garch',))
+        print("✓ Risk table computed in one call")
+    
+    def test_risk_contributions(self):
+        """Test analytic marginal/component VaR decomposition"""
+        weights = np.array([0.30, 0.20, 0.30, 0.20])
+        investment = 100_000_000
+        contributions = self.optimizer.risk_contributions(weights, investment)
+        
+        assert list(contributions.index) == self.optimizer.assets
+        assert np.isclose(contributions['pct_contribution'].sum(), 100)
+        
+        # Components add up to the parametric VaR of risk_table (Euler allocation)
+        table = self.optimizer.risk_table(weights, investment, methods=('parametric',), horizons=(1,))
+        assert np.isclose(contributions['component_var'].sum(), table.loc[('parametric', 1, 0.95), 'var'])
+        
+        # Marginal VaR matches a finite-difference derivative
+        def parametric_var(w):
+            return self.optimizer.batch_risk_contributions(w, investment)['var'][0]
+        bump = np.zeros(4)
+        bump[2] = 1e-6
+        numeric = (parametric_var(weights + bump) - parametric_var(weights - bump)) / 2e-6
+        assert np.isclose(numeric, contributions['marginal_var'].iloc[2], rtol=1e-5)
+        
+        batch = self.optimizer.batch_risk_contributions(np.tile(weights, (10, 1)), investment)
+        assert batch['component_var'].shape == (10, 4)
+        assert np.allclose(batch['component_var'][3], contributions['component_var'].values)
+        print("✓ Risk contributions add up to total VaR")
+    
+    def test_historical_simulation(self):
+        """Test overlapping-window historical outcomes"""
+        weights = np.array([0.30, 0.20, 0.30, 0.20])
+        result = self.optimizer.historical_simulation(weights, 100_000_000, horizon_days=60)
+        
+        # Every window equals the compounded product of its daily returns
+        daily = self.optimizer.returns.values @ weights
+        assert len(result['all_simulations']) == len(daily) - 60 + 1
+        assert np.isclose(result['all_simulations'][5], 100_000_000 * np.prod(1 + daily[5:65]))
+        
+        reports = self.optimizer.generate_reports(['Moderate'], investment=100_000_000, seed=7)
+        report = reports['Moderate']
+        full_year = self.optimizer.historical_simulation(report['weights'], 100_000_000)
+        assert np.isclose(report['hist_mean_value'], full_year['mean_final_value'])
+        assert report['hist_n_windows'] == len(daily) - 252 + 1
+        
+        with pytest.raises(ValueError):
+            self.optimizer.historical_simulation(weights, 100_000_000, horizon_days=10_000)
+        print("✓ Historical simulation windows compound correctly")
+    
+    def test_incremental_update(self):
+        """Test update() against rebuilding the optimizer from scratch"""
+        optimizer = po.PortfolioOptimizer(self.test_prices.iloc[:400])
+        optimizer.portfolio_stats(np.full(4, 0.25))  # builds the accumulators updated below
+        optimizer.update(self.test_prices.iloc[400:450])
+        optimizer.update(self.test_prices.iloc[450])
+        rebuilt = po.PortfolioOptimizer(self.test_prices.iloc[:451])
+        assert np.allclose(optimizer.mean_returns, rebuilt.mean_returns)
+        assert np.allclose(optimizer.cov_matrix, rebuilt.cov_matrix)
+        assert len(optimizer.returns) == len(rebuilt.returns)
+        
+        # Sliding window: oldest returns are removed
+        sliding = po.PortfolioOptimizer(self.test_prices.iloc[:400])
+        sliding.monte_carlo_simulation(np.full(4, 0.25), 100_000_000, n_simulations=100, seed=1)
+        sliding.update(self.test_prices.iloc[400:], window=200)
+        rebuilt = po.PortfolioOptimizer(self.test_prices.iloc[-201:])
+        assert len(sliding.returns) == 200
+        assert np.allclose(sliding.cov_matrix, rebuilt.cov_matrix)
+        assert sliding.simulation_cache_stats == {'hits': 0, 'misses': 0}
+        
+        with pytest.raises(ValueError):
+            sliding.update(self.test_prices.iloc[:10])
+        print("✓ Incremental update matches full re-estimation")
+    
+    def test_ewma_estimator(self):
+        """Test exponentially weighted moments, streaming updates and switching"""
+        optimizer = po.PortfolioOptimizer(self.test_prices, estimator='ewma', halflife=30)
+        ewm = optimizer.returns.ewm(halflife=30)
+        assert np.allclose(optimizer.mean_returns, ewm.mean().iloc[-1] * 252)
+        assert np.allclose(optimizer.cov_matrix.values,
+                           ewm.cov().loc[optimizer.returns.index[-1]].values * 252)
+        
+        # Streaming updates reach the same state as one pass over the history
+        streamed = po.PortfolioOptimizer(self.test_prices.iloc[:300], estimator='ewma', halflife=30)
+        streamed.portfolio_stats(np.full(4, 0.25))  # builds the EWMA state updated below
+        streamed.update(self.test_prices.iloc[300:])
+        assert streamed._ewma_state is not None
+        assert np.allclose(streamed.cov_matrix, optimizer.cov_matrix)
+        
+        # Switching back to equal weights restores the sample estimates
+        optimizer.set_estimator('sample')
+        assert np.allclose(optimizer.cov_matrix, self.optimizer.cov_matrix)
+        
+        with pytest.raises(ValueError):
+            optimizer.set_estimator('garch')
+        print("✓ EWMA estimator matches pandas and streams in constant time")
+    
+    def test_factor_covariance(self):
+        """Test the low-rank plus diagonal covariance against the dense one"""
+        factor = po.PortfolioOptimizer(self.test_prices, n_factors=2)
+        cov = factor.cov_matrix
+        assert isinstance(cov, po.FactorCovariance)
+        assert cov.loadings.shape == (4, 2)
+        
+        # Asset variances are preserved; products agree with the dense form
+        dense = cov.to_dense()
+        assert np.allclose(cov.diagonal(), np.diag(self.optimizer.cov_matrix.values))
+        W = np.random.default_rng(0).dirichlet(np.ones(4), size=5)
+        assert np.allclose(cov.matvec(W), W @ dense)
+        assert np.allclose(cov.quadratic(W), np.einsum('ij,jk,ik->i', W, dense, W))
+        
+        # Shocks have the model covariance
+        shocks = cov.sample(np.random.default_rng(1), 200_000)
+        assert np.allclose(np.cov(shocks.T), dense, rtol=0.05, atol=1e-3)
+        
+        # With a full set of factors the model is exact
+        full = po.PortfolioOptimizer(self.test_prices, n_factors=4)
+        assert np.allclose(full.cov_matrix.to_dense(), self.optimizer.cov_matrix.values)
+        
+        # Statistics, optimizers and simulations accept the factor model
+        weights = np.array([0.30, 0.20, 0.30, 0.20])
+        stats = factor.portfolio_stats(weights)
+        assert np.isclose(stats['volatility'], np.sqrt(weights @ dense @ weights))
+        result = factor.optimize_sharpe('Moderate', solver='projected_gradient')
+        assert np.isclose(result['weights'].sum(), 1)
+        mc = factor.monte_carlo_simulation(weights, 100_000_000, n_simulations=200, seed=3)
+        assert len(mc['all_simulations']) == 200
+        
+        with pytest.raises(ValueError):
+            po.PortfolioOptimizer(self.test_prices, n_factors=10)
+        print("✓ Factor covariance matches its dense form")
+    
+    def test_lazy_derived_statistics(self):
+        """Test lazily cached derived statistics and their joint invalidation"""
+        optimizer = po.PortfolioOptimizer(self.test_prices)
+        assert optimizer._derived == {}  # nothing is estimated at construction
+        
+        correlation = optimizer.correlation_matrix
+        assert np.allclose(correlation.values, optimizer.returns.corr().values)
+        assert np.allclose(optimizer.asset_volatilities, optimizer.returns.std() * np.sqrt(252))
+        L = optimizer.cholesky_factor
+        assert np.allclose(L @ L.T, optimizer.cov_matrix.values)
+        downside = np.minimum(optimizer.returns.values, 0)
+        assert np.isclose(optimizer.downside_cov_matrix.iloc[0, 1],
+                          np.mean(downside[:, 0] * downside[:, 1]) * 252)
+        assert optimizer.correlation_matrix is correlation  # cached
+        
+        # A data or estimator change invalidates every derived quantity together
+        optimizer.set_estimator('ewma', halflife=20)
+        assert optimizer._derived == {}
+        assert not np.allclose(optimizer.correlation_matrix.values, correlation.values)
+        print("✓ Derived statistics are lazy and invalidated together")
+    
+    def test_portfolio_memo(self):
+        """Test the weight-keyed LRU memo of return series and stats"""
+        optimizer = po.PortfolioOptimizer(self.test_prices)
+        weights = np.array([0.30, 0.20, 0.30, 0.20])
+        
+        first = optimizer.portfolio_stats(weights)
+        assert optimizer.portfolio_cache_stats == {'hits': 0, 'misses': 2}  # stats and series
+        first['sharpe_ratio'] = None  # mutating a result must not corrupt the memo
+        second = optimizer.portfolio_stats(weights + 1e-13)
+        assert optimizer.portfolio_cache_stats['hits'] == 1
+        assert second['sharpe_ratio'] == optimizer.portfolio_stats(weights, use_cache=False)['sharpe_ratio']
+        
+        # calculate_var reuses the memoized return series
+        optimizer.calculate_var(weights, 100_000_000)
+        assert optimizer.portfolio_cache_stats['hits'] == 2
+        
+        # Bounded LRU: the least recently used entry is evicted
+        optimizer.portfolio_cache_size = 4
+        optimizer.clear_portfolio_cache()
+        for w in np.random.default_rng(0).dirichlet(np.ones(4), size=3):
+            optimizer.portfolio_stats(w)
+        assert len(optimizer._portfolio_cache) <= 4
+        
+        optimizer.update(self.test_prices.iloc[-1:].set_axis([self.test_prices.index[-1] + pd.Timedelta(days=1)]))
+        assert optimizer._portfolio_cache == {}
+        print("✓ Portfolio memo hits and evicts as expected")
+    
+    def test_risk_parity(self):
+        """Test the Newton risk-parity solver and the profile-constrained optimizer"""
+        cov = self.optimizer.cov_matrix.values
+        weights, info = po.solve_risk_parity(cov)
+        contributions = weights * (cov @ weights)
+        assert info['converged'] and info['iterations'] <= 10
+        assert np.allclose(contributions / contributions.sum(), 0.25)
+        
+        # Risk budgets and the factor covariance
+        budgets = np.array([0.4, 0.3, 0.2, 0.1])
+        weights, _ = po.solve_risk_parity(cov, budgets)
+        contributions = weights * (cov @ weights)
+        assert np.allclose(contributions / contributions.sum(), budgets)
+        factor = po.PortfolioOptimizer(self.test_prices, n_factors=2).cov_matrix
+        weights, info = po.solve_risk_parity(factor)
+        contributions = weights * factor.matvec(weights)
+        assert info['converged'] and np.allclose(contributions / contributions.sum(), 0.25)
+        
+        # Profile bounds and the crypto cap hold even when they bind
+        result = self.optimizer.optimize_risk_parity('Conservative')
+        w = result['weights']
+        assert np.isclose(w.sum(), 1)
+        lo, hi = np.array(self.optimizer._profile_bounds('Conservative')).T
+        assert np.all(w >= lo - 1e-8) and np.all(w <= hi + 1e-8)
+        assert w[2] + w[3] <= 0.25 + 1e-8
+        assert np.isclose(result['risk_contributions'].sum(), 1)
+        print("✓ Risk parity converges and respects profile constraints")
+    
+    def test_hrp(self):
+        """Test Hierarchical Risk Parity weights and profile bounds"""
+        cov = self.optimizer.cov_matrix.values
+        correlation = self.optimizer.correlation_matrix.values
+        weights, order = po.hrp_weights(cov, correlation)
+        assert np.isclose(weights.sum(), 1) and np.all(weights > 0)
+        assert sorted(order) == [0, 1, 2, 3]
+        
+        # Two uncorrelated assets: the split is inverse-variance
+        weights, _ = po.hrp_weights(np.diag([0.04, 0.01]), np.eye(2))
+        assert np.allclose(weights, [0.2, 0.8])
+        
+        result = self.optimizer.optimize_hrp('Conservative')
+        w = result['weights']
+        lo, hi = np.array(self.optimizer._profile_bounds('Conservative')).T
+        assert np.isclose(w.sum(), 1)
+        assert np.all(w >= lo - 1e-8) and np.all(w <= hi + 1e-8)
+        assert w[2] + w[3] <= 0.25 + 1e-8
+        assert sorted(result['cluster_order']) == sorted(self.optimizer.assets)
+        print("✓ HRP allocation respects profile bounds")
+    
+    def test_optimize_cvar(self):
+        """Test Rockafellar-Uryasev CVaR minimization"""
+        result = self.optimizer.optimize_cvar('Moderate', n_scenarios=2000, seed=5)
+        weights = result['weights']
+        lo, hi = np.array(self.optimizer._profile_bounds('Moderate')).T
+        assert np.isclose(weights.sum(), 1)
+        assert np.all(weights >= lo - 1e-8) and np.all(weights <= hi + 1e-8)
+        
+        # The LP optimum is the CVaR the simulation reports for those weights
+        mc = self.optimizer.monte_carlo_simulation(weights, 1.0, n_simulations=2000, seed=5)
+        assert np.isclose(result['cvar'], mc['cvar_95'], rtol=0.02)
+        profile = self.optimizer.monte_carlo_simulation(
+            self.optimizer.get_profile_weights('Moderate'), 1.0, n_simulations=2000, seed=5)
+        assert result['cvar'] <= profile['cvar_95'] + 1e-9
+        
+        # Historical scenarios: the objective equals the scenario CVaR of the solution
+        scenarios = self.optimizer.returns.values
+        result = self.optimizer.optimize_cvar('Conservative', scenarios='historical', target_return=0.1)
+        losses = -(scenarios @ result['weights'])
+        tail_mean = result['var'] + np.maximum(losses - result['var'], 0).mean() / 0.05
+        assert np.isclose(result['cvar'], tail_mean)
+        assert result['return'] >= 0.1 - 1e-8
+        assert result['weights'][2] + result['weights'][3] <= 0.25 + 1e-8
+        
+        # An unreachable target falls back to the profile weights
+        fallback = self.optimizer.optimize_cvar('Conservative', scenarios='historical', target_return=10)
+        assert np.allclose(fallback['weights'], self.optimizer.get_profile_weights('Conservative'))
+        print("✓ CVaR optimization matches reported cvar_95")
+    
+    def test_optimize_cdar(self):
+        """Test drawdown-constrained (CDaR) return maximization"""
+        returns = self.optimizer.returns.values
+        lo, hi = np.array(self.optimizer._profile_bounds('Moderate')).T
+        min_weights, minimum = po.solve_cdar_lp(returns, lo=lo, hi=hi)
+        path = np.cumsum(returns @ min_weights)
+        drawdowns = np.maximum.accumulate(np.maximum(path, 0)) - path
+        brute = min(z + np.maximum(drawdowns - z, 0).mean() / 0.05 for z in drawdowns)
+        assert np.isclose(minimum['cdar'], brute)
+        
+        # A looser limit buys at least as much return and is respected
+        limit = minimum['cdar'] * 1.5
+        result = self.optimizer.optimize_cdar('Moderate', max_cdar=limit)
+        assert np.isclose(result['weights'].sum(), 1)
+        assert np.all(result['weights'] >= lo - 1e-8) and np.all(result['weights'] <= hi + 1e-8)
+        assert result['cdar'] <= limit + 1e-8
+        assert result['return'] >= self.optimizer.portfolio_stats(min_weights)['return'] - 1e-9
+        assert result['cdar_limit'] == limit
+        
+        # Profile default limit, and an unreachable limit falls back to minimum CDaR
+        default = self.optimizer.optimize_cdar('Conservative')
+        assert default['cdar_limit'] == self.optimizer.profile_constraints['Conservative']['max_cdar']
+        assert default['weights'][2] + default['weights'][3] <= 0.25 + 1e-8
+        tight = self.optimizer.optimize_cdar('Moderate', max_cdar=minimum['cdar'] / 2)
+        assert np.isclose(tight['cdar'], minimum['cdar'])
+        print("✓ CDaR optimization respects the drawdown limit")
+    
+    def test_multistart_sharpe(self):
+        """Test parallel multi-start Sharpe optimization and its diagnostics"""
+        single = self.optimizer.optimize_sharpe('Conservative')
+        result = self.optimizer.optimize_sharpe('Conservative', n_starts=8, n_workers=2, seed=3)
+        diagnostics = result['multistart']
+        assert diagnostics['n_starts'] == 8 and len(diagnostics['sharpe']) == 8
+        assert 1 <= diagnostics['n_converged'] <= 8
+        assert 0 < diagnostics['hit_rate'] <= 1 and diagnostics['n_distinct_optima'] >= 1
+        assert np.isclose(result['sharpe_ratio'], diagnostics['sharpe'][diagnostics['best_start']])
+        assert result['sharpe_ratio'] >= single['sharpe_ratio'] - 1e-8
+        weights = result['weights']
+        assert np.isclose(weights.sum(), 1)
+        assert weights[2] + weights[3] <= 0.25 + 1e-8
+        
+        # In-process and pooled runs agree; the batched projected-gradient starts stay feasible
+        serial = self.optimizer.optimize_sharpe('Conservative', n_starts=8, n_workers=1, seed=3)
+        assert np.allclose(serial['multistart']['sharpe'], diagnostics['sharpe'])
+        pg = self.optimizer.optimize_sharpe('Conservative', solver='projected_gradient', n_starts=8, seed=3)
+        assert pg['weights'][2] + pg['weights'][3] <= 0.25 + 1e-8
+        assert np.isclose(pg['sharpe_ratio'], result['sharpe_ratio'], atol=1e-4)
+        
+        with pytest.raises(ValueError):
+            self.optimizer.optimize_sharpe(n_starts=0)
+        print("✓ Multi-start Sharpe optimization works")
+    
+    def test_resampled_frontier(self):
+        """Test the bootstrap-resampled (Michaud) frontier"""
+        result = self.optimizer.resampled_frontier(n_resamples=12, n_points=6, risk_profile='Conservative',
+                                                   n_workers=2, seed=4)
+        weights = result['weights']
+        assert weights.shape == (6, self.optimizer.n_assets) == result['weights_std'].shape
+        lo, hi = np.array(self.optimizer._profile_bounds('Conservative')).T
+        assert np.allclose(weights.sum(axis=1), 1)
+        assert np.all(weights >= lo - 1e-8) and np.all(weights <= hi + 1e-8)
+        assert np.all(weights[:, 2] + weights[:, 3] <= 0.25 + 1e-8)
+        
+        # Ordered by return, and the best point is reported with its stats
+        assert np.all(np.diff(result['returns']) >= -1e-6)
+        assert np.isclose(result['max_sharpe']['sharpe_ratio'], result['sharpe_ratios'].max())
+        
+        # The resamples depend only on the seed, not on the number of workers
+        serial = self.optimizer.resampled_frontier(n_resamples=12, n_points=6, risk_profile='Conservative',
+                                                   n_workers=1, seed=4)
+        assert np.allclose(serial['weights'], weights)
+        print("✓ Resampled frontier works")
+    
+    def test_bootstrap_stats(self):
+        """Test vectorized bootstrap confidence intervals"""
+        weights = self.optimizer.get_profile_weights('Moderate')
+        table = self.optimizer.bootstrap_stats(weights, n_bootstrap=500, seed=1)
+        metrics = ['return', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown', 'calmar_ratio']
+        assert list(table.index) == metrics
+        assert list(table.columns) == ['estimate', 'lower', 'upper', 'std_error']
+        assert np.all(table['lower'] <= table['upper']) and np.all(table['std_error'] >= 0)
+        stats = self.optimizer.portfolio_stats(weights)
+        for metric in metrics:
+            assert np.isclose(table.loc[metric, 'estimate'], stats[metric])
+        assert table.loc['sharpe_ratio', 'lower'] <= stats['sharpe_ratio'] <= table.loc['sharpe_ratio', 'upper']
+        
+        # Each replicate matches portfolio_stats-style metrics of its resampled series
+        series = self.optimizer.returns.values @ weights
+        replicates = self.optimizer._bootstrap_metrics(series, n_bootstrap=3, block_size=5, seed=2)
+        rows = np.random.default_rng(2).integers(0, len(series), size=(-(-len(series) // 5), 1, 3))
+        rows = ((rows + np.arange(5)[:, None]) % len(series)).reshape(-1, 3)[:len(series)]
+        sample = series[rows[:, 0]]
+        cumulative = np.cumprod(1 + sample)
+        assert np.isclose(replicates['return'][0, 0], sample.mean() * 252)
+        assert np.isclose(replicates['max_drawdown'][0, 0],
+                          (cumulative / np.maximum.accumulate(cumulative) - 1).min())
+        
+        # Same seed, same intervals; reports carry the intervals
+        again = self.optimizer.bootstrap_stats(weights, n_bootstrap=500, seed=1)
+        pd.testing.assert_frame_equal(table, again)
+        report = self.optimizer.generate_report('Moderate', 10000, seed=1)
+        lower, upper = report['confidence_intervals']['sharpe_ratio']
+        assert lower <= report['sharpe_ratio'] <= upper
+
+        # Blocks keep a run of losses together; iid resampling breaks it up
+        run = np.r_[np.full(40, -0.01), np.tile([0.004, -0.002], 230)]
+        iid = self.optimizer._bootstrap_metrics(run, n_bootstrap=500, seed=3)['max_drawdown']
+        blocks = self.optimizer._bootstrap_metrics(run, n_bootstrap=500, block_size=20, seed=3)['max_drawdown']
+        assert np.median(blocks) < np.median(iid)
+
+        # Intervals are centred on the reported estimates, even with a non-sample estimator,
+        # and an unseeded report's intervals are reproduced from its seed
+        ewma = po.PortfolioOptimizer(self.test_prices, estimator='ewma', halflife=30)
+        report = ewma.generate_report('Moderate', 10000)
+        names = {'return': 'expected_return', 'volatility': 'volatility'}
+        for metric, (lower, upper) in report['confidence_intervals'].items():
+            assert lower <= report[names.get(metric, metric)] <= upper, metric
+        again = ewma.generate_report('Moderate', 10000, seed=report['seed'])
+        assert again['confidence_intervals'] == report['confidence_intervals']
+        with pytest.raises(ValueError):
+            self.optimizer.bootstrap_stats(weights, confidence=1.5)
+        print("✓ Bootstrap confidence intervals work")
+    
+    def test_large_universe_profiles(self):
+        """Test profile-based optimization and reports beyond the four default assets"""
+        rng = np.random.default_rng(0)
+        n_assets, n_days = 40, 300
+        factors = rng.standard_normal((n_days, 3)) * 0.01
+        returns = factors @ rng.standard_normal((3, n_assets)) * 0.5 + rng.standard_normal((n_days, n_assets)) * 0.01
+        prices = pd.DataFrame(100 * np.exp(np.cumsum(returns + 0.0005, axis=0)),
+                              columns=['Gold', 'Bitcoin'] + [f'T{i}' for i in range(n_assets - 2)],
+                              index=pd.date_range('2022-01-01', periods=n_days))
+        optimizer = po.PortfolioOptimizer(prices, n_factors=3)
+        
+        for profile in ['Conservative', 'Moderate', 'Aggressive']:
+            defaults = optimizer.get_profile_weights(profile)
+            lo, hi = np.array(optimizer._profile_bounds(profile)).T
+            assert np.isclose(defaults.sum(), 1)
+            assert np.all(defaults >= lo - 1e-9) and np.all(defaults <= hi + 1e-9)
+        
+        result = optimizer.optimize_sharpe('Moderate')
+        assert np.isclose(result['weights'].sum(), 1)
+        assert result['sharpe_ratio'] > optimizer.portfolio_stats(optimizer.get_profile_weights('Moderate'))['sharpe_ratio']
+        
+        report = optimizer.generate_report('Moderate', 1_000_000, seed=1)
+        assert len(report['weights_dict']) == n_assets
+        assert np.isclose(sum(report['weights_dict'].values()), 1)
+        print("✓ Risk profiles extend to larger universes")
 
 def run_tests():
     print("\n🔧 Testing portfolio_optimizer.py")
@@ -241,6 +839,28 @@ def run_tests():
         tester.test_efficient_frontier,
         tester.test_sharpe_ratio_calculation,
         tester.test_edge_cases,
+        tester.test_project_capped_simplex,
+        tester.test_projected_gradient_solver,
+        tester.test_optimize_batch,
+        tester.test_generate_reports,
+        tester.test_monte_carlo_seed_and_engines,
+        tester.test_simulation_cache,
+        tester.test_risk_table,
+        tester.test_risk_contributions,
+        tester.test_historical_simulation,
+        tester.test_incremental_update,
+        tester.test_ewma_estimator,
+        tester.test_factor_covariance,
+        tester.test_lazy_derived_statistics,
+        tester.test_portfolio_memo,
+        tester.test_risk_parity,
+        tester.test_hrp,
+        tester.test_optimize_cvar,
+        tester.test_optimize_cdar,
+        tester.test_multistart_sharpe,
+        tester.test_resampled_frontier,
+        tester.test_bootstrap_stats,
+        tester.test_large_universe_profiles,
     ]
     
     passed = 0
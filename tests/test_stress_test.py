@@ -0,0 +1,84 @@
+"""
+Tests for stress_test.py - historical and scenario stress testing
+"""
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import src.portfolio_optimizer as po
+import src.stress_test as stress
+
+
+class TestStressTest:
+    """Test suite for the stress-test module"""
+
+    def setup_method(self):
+        """Create sample data for testing"""
+        dates = pd.date_range(end=pd.Timestamp.now(), periods=500, freq='D')
+        np.random.seed(42)
+
+        self.test_prices = pd.DataFrame({
+            'Gold': 100 * np.exp(np.random.randn(500).cumsum() * 0.01),
+            'Silver': 20 * np.exp(np.random.randn(500).cumsum() * 0.02),
+            'Bitcoin': 50000 * np.exp(np.random.randn(500).cumsum() * 0.03),
+            'Ethereum': 3000 * np.exp(np.random.randn(500).cumsum() * 0.04)
+        }, index=dates)
+
+        self.optimizer = po.PortfolioOptimizer(self.test_prices)
+        self.portfolios = {profile: self.optimizer.get_profile_weights(profile)
+                           for profile in ['Conservative', 'Moderate', 'Aggressive']}
+
+    def test_rolling_window_returns(self):
+        """Cumulative-sum windows equal the direct compound return"""
+        returns = self.optimizer.returns.values
+        window_returns = stress.rolling_window_returns(returns, 20)
+        assert window_returns.shape == (len(returns) - 19, 4)
+        assert np.allclose(window_returns[37], np.prod(1 + returns[37:57], axis=0) - 1)
+        print("✓ Rolling window returns match direct products")
+
+    def test_worst_historical_windows(self):
+        """Worst windows are found for every asset and portfolio"""
+        worst = stress.worst_historical_windows(self.optimizer, self.portfolios, windows=(5, 20))
+        assert len(worst) == 2 * (4 + 3)
+
+        row = worst.loc[(20, 'Bitcoin')]
+        prices = self.test_prices['Bitcoin']
+        # 'start' is the first return of the window, so the base price is the day before
+        start = prices.index.get_loc(row['start']) - 1
+        assert np.isclose(row['worst_return'], prices.iloc[start + 20] / prices.iloc[start] - 1)
+        assert prices.index.get_loc(row['end']) == start + 20
+
+        brute = stress.rolling_window_returns(self.optimizer.returns['Bitcoin'].values, 20).min()
+        assert np.isclose(row['worst_return'], brute)
+        print("✓ Worst historical windows located")
+
+    def test_revalue_all_scenarios(self):
+        """Revaluation covers scenarios × portfolios in one product"""
+        pnl = stress.revalue(stress.SCENARIOS, self.portfolios, self.optimizer.assets, investment=100_000_000)
+        assert pnl.shape == (len(stress.SCENARIOS), 3)
+
+        shock = stress.SCENARIOS['crypto_crash_2022']
+        weights = self.portfolios['Aggressive']
+        expected = sum(shock[a] * w for a, w in zip(self.optimizer.assets, weights)) * 100_000_000
+        assert np.isclose(pnl.loc['crypto_crash_2022', 'Aggressive'], expected)
+
+        # Crypto-heavy portfolio loses more in a crypto crash
+        assert pnl.loc['crypto_crash_2022', 'Aggressive'] < pnl.loc['crypto_crash_2022', 'Conservative']
+        print("✓ Scenario revaluation works")
+
+    def test_stress_test_with_historical_scenarios(self):
+        """Historical worst windows can be replayed as shock scenarios"""
+        weights = self.portfolios['Moderate']
+        scenarios = stress.historical_scenarios(self.optimizer, weights, windows=(20,))
+        result = stress.stress_test(self.optimizer, {'Moderate': weights}, 100_000_000, scenarios=scenarios)
+
+        worst = result['worst_windows'].loc[(20, 'Moderate'), 'worst_return']
+        replayed = result['scenario_pnl_pct'].loc['worst_20d', 'Moderate'] / 100
+        # Buy-and-hold replay of the window is close to the daily-rebalanced worst return
+        assert replayed < 0
+        assert abs(replayed - worst) < 0.05
+        print("✓ Stress test complete")
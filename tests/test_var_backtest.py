@@ -0,0 +1,89 @@
+"""
+Tests for var_backtest.py - rolling VaR backtesting
+"""
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import norm
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import src.portfolio_optimizer as po
+import src.var_backtest as vb
+
+
+class TestVaRBacktest:
+    """Test suite for VaR backtesting"""
+
+    def setup_method(self):
+        """Create sample data for testing"""
+        dates = pd.date_range(end=pd.Timestamp.now(), periods=500, freq='D')
+        np.random.seed(42)
+
+        self.test_prices = pd.DataFrame({
+            'Gold': 100 * np.exp(np.random.randn(500).cumsum() * 0.01),
+            'Silver': 20 * np.exp(np.random.randn(500).cumsum() * 0.02),
+            'Bitcoin': 50000 * np.exp(np.random.randn(500).cumsum() * 0.03),
+            'Ethereum': 3000 * np.exp(np.random.randn(500).cumsum() * 0.04)
+        }, index=dates)
+
+        self.optimizer = po.PortfolioOptimizer(self.test_prices)
+        self.weights = np.array([0.30, 0.20, 0.30, 0.20])
+        self.returns = self.optimizer.returns.values @ self.weights
+
+    def test_rolling_historical_var_matches_percentile(self):
+        """Sorted-window VaR equals np.percentile recomputed per day"""
+        var = vb.rolling_historical_var(self.returns, 100, 0.95)
+        expected = [-np.percentile(self.returns[t - 100:t], 5) for t in range(100, len(self.returns))]
+        assert np.allclose(var, expected)
+
+        # First forecast matches calculate_var on the same window
+        window_optimizer = po.PortfolioOptimizer(self.test_prices.iloc[:101])
+        assert np.isclose(var[0] * 1e8, window_optimizer.calculate_var(self.weights, 1e8))
+        print("✓ Rolling historical VaR matches percentile")
+
+    def test_rolling_parametric_var(self):
+        """Cumulative-sum window moments equal direct mean/std"""
+        var = vb.rolling_parametric_var(self.returns, 60, 0.99)
+        window = self.returns[40:100]
+        expected = -(window.mean() + norm.ppf(0.01) * window.std(ddof=1))
+        assert len(var) == len(self.returns) - 60
+        assert np.isclose(var[40], expected)
+        print("✓ Rolling parametric VaR matches direct estimate")
+
+    def test_kupiec_and_christoffersen(self):
+        """Coverage tests accept a well-behaved sequence and reject a bad one"""
+        good = np.zeros(1000, dtype=bool)
+        good[::20] = True
+        lr, pvalue = vb.kupiec_test(good, 0.95)
+        assert lr < 1e-8 and pvalue > 0.99
+
+        bad = np.zeros(1000, dtype=bool)
+        bad[:150] = True
+        assert vb.kupiec_test(bad, 0.95)[1] < 0.01
+        assert vb.christoffersen_test(bad)[1] < 0.01
+
+        lr, pvalue = vb.kupiec_test(np.zeros(250, dtype=bool), 0.99)
+        assert np.isfinite(lr) and 0 <= pvalue <= 1
+        print("✓ Kupiec and Christoffersen tests behave as expected")
+
+    def test_backtest_var(self):
+        """Backtest returns exception counts and test statistics per method"""
+        results = vb.backtest_var(self.optimizer, self.weights, window=250)
+        assert set(results) == {'historical', 'parametric'}
+
+        for method, result in results.items():
+            assert len(result['var']) == len(self.returns) - 250
+            assert result['n_exceptions'] == int(result['exceptions'].sum())
+            assert 0 <= result['kupiec_pvalue'] <= 1
+            assert 0 <= result['conditional_coverage_pvalue'] <= 1
+            assert np.isclose(result['conditional_coverage_lr'],
+                              result['kupiec_lr'] + result['christoffersen_lr'])
+            print(f"  {method}: {result['n_exceptions']} exceptions "
+                  f"(expected {result['expected_exceptions']:.1f})")
+
+        with pytest.raises(ValueError):
+            vb.backtest_var(self.optimizer, self.weights, methods=('garch',))
+        print("✓ VaR backtest complete")